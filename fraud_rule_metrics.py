@@ -21,15 +21,19 @@ fraud_rule_metrics.py - 欺诈规则性能指标模块
 """
 
 import json
-import sqlite3
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from src.audit.audit_sink import AuditLogSink
+from src.audit.severity import SeverityScale
+from src.data_engineering.connection_pool import get_connection_pool
+
 
 class FraudRuleType(Enum):
     """欺诈规则类型枚举"""
@@ -58,6 +62,205 @@ class FraudRuleThreshold:
                 return level
         return "LOW"
 
+    @property
+    def severity_scale(self) -> SeverityScale:
+        """severity_levels 对应的向量化分级标尺"""
+        return SeverityScale(self.severity_levels)
+
+    def classify(self, values) -> np.ndarray:
+        """为整列数值判断严重程度（与逐个调用 get_severity 结果相同）"""
+        return self.severity_scale.classify(values)
+
+
+# 规则评估 SQL：基础查询 + 评估窗口过滤所用的日期列
+# 状态谓词与 idx_sales_orders_open 部分索引的条件文本保持一致，评估窗口走 order_date 范围查找
+RULE_QUERIES: Dict[FraudRuleType, Tuple[str, str]] = {
+    FraudRuleType.TIMING_FRAUD: (
+        """
+        SELECT
+            t1.order_id,
+            t1.order_date,
+            t2.shipping_date,
+            julianday(t2.shipping_date) - julianday(t1.order_date) as day_diff,
+            t1.profit,
+            t1.sales
+        FROM sales_orders t1
+        JOIN shipping_logs t2 ON t1.order_id = t2.order_id
+        WHERE t1.order_status NOT IN ('CANCELED', 'SUSPECTED_FRAUD', 'CANCELLED')
+        """,
+        "t1.order_date",
+    ),
+    FraudRuleType.NEGATIVE_MARGIN: (
+        """
+        SELECT
+            order_id,
+            profit,
+            sales,
+            order_status
+        FROM sales_orders
+        WHERE order_status NOT IN ('CANCELED', 'SUSPECTED_FRAUD', 'CANCELLED')
+        """,
+        "order_date",
+    ),
+    FraudRuleType.AMOUNT_ANOMALY: (
+        """
+        SELECT
+            order_id,
+            order_date,
+            category_name,
+            customer_segment,
+            sales
+        FROM sales_orders
+        WHERE order_status NOT IN ('CANCELED', 'SUSPECTED_FRAUD', 'CANCELLED')
+        """,
+        "order_date",
+    ),
+    FraudRuleType.FREQUENCY_ANOMALY: (
+        """
+        SELECT
+            order_id,
+            order_date,
+            customer_id
+        FROM sales_orders
+        WHERE order_status NOT IN ('CANCELED', 'SUSPECTED_FRAUD', 'CANCELLED')
+        """,
+        "order_date",
+    ),
+}
+
+
+# 共享评估上下文：一次读取评估周期内的有效订单（LEFT JOIN 物流，每条物流记录一行），供所有规则复用
+EVALUATION_CONTEXT_QUERY = """
+        SELECT
+            o.order_id,
+            o.order_date,
+            s.shipping_date,
+            s.log_id IS NOT NULL AS has_shipment,
+            o.customer_id,
+            o.customer_segment,
+            o.customer_country,
+            o.category_name,
+            o.sales,
+            o.profit
+        FROM sales_orders o
+        LEFT JOIN shipping_logs s ON s.order_id = o.order_id
+        WHERE o.order_status NOT IN ('CANCELED', 'SUSPECTED_FRAUD', 'CANCELLED')
+        """
+
+
+def _with_date_window(query: str, date_column: str, start_date: str = None, end_date: str = None) -> Tuple[str, tuple]:
+    """同时给出起止日期时追加参数化的评估窗口过滤"""
+    if start_date and end_date:
+        return f"{query} AND {date_column} BETWEEN ? AND ?", (start_date, end_date)
+    return query, ()
+
+
+def build_rule_query(rule_type: FraudRuleType, start_date: str = None, end_date: str = None) -> Tuple[str, tuple]:
+    """构造单条规则的评估查询"""
+    query, date_column = RULE_QUERIES[rule_type]
+    return _with_date_window(query, date_column, start_date, end_date)
+
+
+def build_context_query(start_date: str = None, end_date: str = None) -> Tuple[str, tuple]:
+    """构造共享评估上下文的查询"""
+    return _with_date_window(EVALUATION_CONTEXT_QUERY, "o.order_date", start_date, end_date)
+
+
+# 规则触发条件：度量值与 threshold_value 的比较（向量化）
+RULE_TRIGGERS = {
+    FraudRuleType.TIMING_FRAUD: np.less,  # 发货早于订单：day_diff < 阈值
+    FraudRuleType.NEGATIVE_MARGIN: np.less,  # 利润 < 阈值
+    FraudRuleType.AMOUNT_ANOMALY: np.greater_equal,  # |Z| >= 阈值
+    FraudRuleType.FREQUENCY_ANOMALY: np.greater,  # 窗口订单数 > 阈值
+}
+
+# 分组评估维度 -> 上下文列
+GROUP_BY_COLUMNS = {"month": "order_date", "region": "customer_country", "segment": "customer_segment"}
+
+
+@dataclass
+class RuleEvaluationContext:
+    """
+    一个评估周期内所有规则共享的数据
+
+    rows 为订单 × 物流记录（LEFT JOIN），日期已解析；
+    逐物流记录的规则（时间欺诈）用 has_shipment 作为评估范围，逐订单的规则用 first_of_order。
+    """
+
+    evaluation_period: str
+    rows: pd.DataFrame
+
+    def __post_init__(self):
+        self.has_shipment = self.rows["has_shipment"].to_numpy(dtype=bool)
+        self.first_of_order = ~self.rows["order_id"].duplicated().to_numpy()
+        self._group_codes = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, evaluation_period: str) -> "RuleEvaluationContext":
+        df = df.copy()
+        df["order_date"] = pd.to_datetime(df["order_date"], errors="coerce")
+        df["shipping_date"] = pd.to_datetime(df["shipping_date"], errors="coerce")
+        return cls(evaluation_period=evaluation_period, rows=df)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def group_codes(self, group_by: str) -> Tuple[np.ndarray, list]:
+        """
+        分组维度 -> (逐行整数编码, 排序后的分组标签)；缺失值编码为 -1
+
+        Args:
+            group_by: 'month'（下单月份）、'region'（客户国家）或 'segment'（客户细分）
+        """
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(f"未知的分组维度: {group_by}. 可选: {list(GROUP_BY_COLUMNS)}")
+        if group_by not in self._group_codes:
+            column = self.rows[GROUP_BY_COLUMNS[group_by]]
+            if group_by == "month":
+                column = column.dt.to_period("M")
+            codes, labels = pd.factorize(column, sort=True)
+            self._group_codes[group_by] = (codes, [str(label) for label in labels])
+        return self._group_codes[group_by]
+
+
+def confusion_matrices(
+    triggered: np.ndarray,
+    is_fraud: np.ndarray,
+    scope: np.ndarray = None,
+    groups: np.ndarray = None,
+    n_groups: int = None,
+) -> np.ndarray:
+    """
+    一次遍历计算多条规则（可按分组）的混淆矩阵
+
+    Args:
+        triggered / is_fraud: 形状 (规则数, 行数) 的布尔数组（单条规则可传一维数组）
+        scope: 同形状的布尔数组，只统计为 True 的位置（可选）
+        groups: 长度为行数的整数分组编码，所有规则共用；负数表示不属于任何分组（可选）
+        n_groups: 分组数（默认为 groups.max() + 1）
+
+    Returns:
+        形状 (规则数, 4) 的计数；给出 groups 时为 (规则数, 分组数, 4)。列顺序为 TN, FN, FP, TP
+    """
+    triggered = np.atleast_2d(triggered)
+    is_fraud = np.atleast_2d(is_fraud)
+    n_rules, n_rows = triggered.shape
+    keep = None if scope is None else np.broadcast_to(np.atleast_2d(scope), triggered.shape)
+
+    if groups is None:
+        slots, n_slots = 0, 1
+    else:
+        slots = np.asarray(groups, dtype=np.int64)
+        n_slots = n_groups if n_groups is not None else (int(slots.max()) + 1 if n_rows else 0)
+        in_group = np.broadcast_to(slots >= 0, triggered.shape)
+        keep = in_group if keep is None else keep & in_group
+
+    # 每个位置编码为 (规则序号*分组数 + 分组)*4 + 触发*2 + 欺诈，单次 bincount 得到全部计数
+    codes = (np.arange(n_rules)[:, None] * n_slots + slots) * 4 + triggered.astype(np.int64) * 2 + is_fraud
+    codes = codes.ravel() if keep is None else codes[keep]
+    counts = np.bincount(codes, minlength=n_rules * n_slots * 4).reshape(n_rules, n_slots, 4)
+    return counts if groups is not None else counts[:, 0]
+
 
 @dataclass
 class RulePerformanceMetrics:
@@ -126,6 +329,264 @@ class RulePerformanceMetrics:
             "accuracy": round(self.accuracy, 4),
         }
 
+    @classmethod
+    def from_counts(cls, rule_type: FraudRuleType, evaluation_period: str, counts) -> "RulePerformanceMetrics":
+        """由 confusion_matrices 的一行计数 (TN, FN, FP, TP) 构造"""
+        tn, fn, fp, tp = (int(c) for c in counts)
+        return cls(
+            rule_type=rule_type,
+            evaluation_period=evaluation_period,
+            true_positives=tp,
+            false_positives=fp,
+            true_negatives=tn,
+            false_negatives=fn,
+        )
+
+    @classmethod
+    def from_masks(
+        cls, rule_type: FraudRuleType, evaluation_period: str, triggered, is_fraud, scope=None
+    ) -> "RulePerformanceMetrics":
+        """由逐行的触发 / 欺诈布尔数组构造"""
+        return cls.from_counts(rule_type, evaluation_period, confusion_matrices(triggered, is_fraud, scope)[0])
+
+
+def grouped_rule_metrics(
+    rule_type: FraudRuleType, evaluation_period: str, triggered, is_fraud, groups, scope=None
+) -> Dict[str, RulePerformanceMetrics]:
+    """
+    按分组计算单条规则的性能指标
+
+    Args:
+        groups: 与掩码等长的分组标签（如月份、国家、客户细分），缺失值不计入任何分组
+
+    Returns:
+        分组标签 -> RulePerformanceMetrics（按标签排序）
+    """
+    codes, labels = pd.factorize(pd.Series(groups, copy=False), sort=True)
+    counts = confusion_matrices(triggered, is_fraud, scope, groups=codes, n_groups=len(labels))[0]
+    return {
+        str(label): RulePerformanceMetrics.from_counts(rule_type, evaluation_period, group_counts)
+        for label, group_counts in zip(labels, counts)
+    }
+
+
+# 金额异常检测：分段维度、金额列、流式读取的块大小
+AMOUNT_SEGMENT_COLUMNS = ("category_name", "customer_segment")
+AMOUNT_VALUE_COLUMN = "sales"
+AMOUNT_STREAM_CHUNKSIZE = 50_000
+
+
+class SegmentZScoreDetector:
+    """
+    按分段（默认 品类 × 客户细分）在线估计金额均值 / 方差的 Z-score 检测器
+
+    每个分段只保存 (count, mean, m2) 三个数，逐块用 Welford 在线算法的批量形式（Chan 合并公式）更新：
+    一块内先向量化求出各分段的 count / mean / m2，再与已有统计合并。因此可以处理分块读入的订单流，
+    内存只与分段数有关，与历史订单数无关。
+
+    - update(chunk)：并入一块订单；
+    - score(chunk)：按当前统计计算 Z-score（样本数少于 min_count 或标准差为 0 的分段记为 NaN）；
+    - detect(chunk)：先 update 再 score，返回 |Z| 达到阈值的订单及其严重程度（FraudRuleThreshold.classify）。
+    """
+
+    def __init__(
+        self,
+        threshold: FraudRuleThreshold,
+        segment_columns: Tuple[str, ...] = AMOUNT_SEGMENT_COLUMNS,
+        value_column: str = AMOUNT_VALUE_COLUMN,
+        min_count: int = 2,
+    ):
+        self.threshold = threshold
+        self.segment_columns = list(segment_columns)
+        self.value_column = value_column
+        self.min_count = min_count
+        self.stats = pd.DataFrame(columns=["count", "mean", "m2"], dtype=float)
+
+    @property
+    def count(self) -> int:
+        """已并入的订单数"""
+        return int(self.stats["count"].sum())
+
+    def variance(self) -> pd.Series:
+        """各分段的样本方差"""
+        return self.stats["m2"] / (self.stats["count"] - 1)
+
+    def update(self, chunk: pd.DataFrame) -> "SegmentZScoreDetector":
+        """把一块订单并入各分段的在线统计"""
+        values = pd.to_numeric(chunk[self.value_column], errors="coerce")
+        grouped = values.groupby(self._segment_keys(chunk), sort=False)
+        batch = pd.DataFrame({"count": grouped.count().astype(float), "mean": grouped.mean()})
+        batch["m2"] = grouped.var(ddof=0) * batch["count"]
+        batch = batch[batch["count"] > 0]
+
+        if self.stats.empty:
+            self.stats = batch
+            return self
+
+        old = self.stats.reindex(batch.index, fill_value=0.0)
+        n = old["count"] + batch["count"]
+        delta = batch["mean"] - old["mean"]
+        merged = pd.DataFrame(
+            {
+                "count": n,
+                "mean": old["mean"] + delta * batch["count"] / n,
+                "m2": old["m2"] + batch["m2"] + delta**2 * old["count"] * batch["count"] / n,
+            }
+        )
+        self.stats = merged.combine_first(self.stats)
+        return self
+
+    def score(self, chunk: pd.DataFrame) -> np.ndarray:
+        """按当前统计计算每行金额的 Z-score"""
+        stats = self.stats.reindex(self._segment_keys(chunk))
+        std = np.sqrt(stats["m2"] / (stats["count"] - 1)).to_numpy(dtype=float, copy=True)
+        std[(stats["count"] < self.min_count).to_numpy() | (std == 0)] = np.nan
+        values = pd.to_numeric(chunk[self.value_column], errors="coerce").to_numpy(dtype=float)
+        return (values - stats["mean"].to_numpy()) / std
+
+    def detect(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """并入一块订单并返回其中的金额异常（附 z_score 与 severity 列）"""
+        z_scores = np.abs(self.update(chunk).score(chunk))
+        flagged = z_scores >= self.threshold.threshold_value
+        anomalies = chunk.loc[flagged].copy()
+        anomalies["z_score"] = z_scores[flagged]
+        anomalies["severity"] = self.threshold.classify(anomalies["z_score"])
+        return anomalies
+
+    def _segment_keys(self, chunk: pd.DataFrame) -> pd.MultiIndex:
+        # 缺失的分段值归入空字符串分段，保证分组与 reindex 的键一致
+        return pd.MultiIndex.from_frame(chunk[self.segment_columns].fillna("").astype(str))
+
+
+# 频率异常检测：(客户编码, 日序号) 打包为一个 int64 键时日序号所占的跨度（约 2,870 年）
+FREQUENCY_DAY_SPAN = 1 << 20
+FREQUENCY_STREAM_CHUNKSIZE = 50_000
+
+
+class CustomerFrequencyCounter:
+    """
+    按客户统计滑动日窗口内订单数的计数器
+
+    每个 (客户, 日期) 是一个桶：键为 客户编码 * FREQUENCY_DAY_SPAN + 日序号，桶按键排序保存为两个 NumPy 数组。
+    同一客户的桶在键空间中连续，窗口 [d - window_days + 1, d] 的订单数 =
+    前缀和[searchsorted(d)] - 前缀和[searchsorted(d - window_days)]，整体为排序 + 二分的 O(n log n)。
+
+    update(chunk) 把一块订单合并进桶并返回本块涉及的窗口计数。prune=True 时合并后丢弃不会再落入任何窗口的旧桶，
+    按 order_date 顺序持续输入（例如每天追加新订单）时，内存只与最近 window_days 天的活跃客户数有关。
+    """
+
+    def __init__(self, threshold: FraudRuleThreshold, window_days: int = 1, prune: bool = True):
+        if window_days < 1:
+            raise ValueError(f"window_days 必须 >= 1: {window_days}")
+        self.threshold = threshold
+        self.window_days = window_days
+        self.prune = prune
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.latest_day = None
+        self._customers = pd.Index([], dtype=object)
+
+    def update(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        并入一块订单（需含 customer_id、order_date 列）
+
+        Returns:
+            本块订单所在 (客户, 窗口结束日) 的窗口订单数：customer_id, window_end, order_count
+        """
+        row_keys = self._row_keys(chunk)
+        row_keys = row_keys[row_keys >= 0]
+
+        batch_keys, batch_counts = np.unique(row_keys, return_counts=True)
+        keys, inverse = np.unique(np.concatenate([self.keys, batch_keys]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, batch_counts])).astype(np.int64)
+        self.keys = keys
+
+        window_counts = self.window_counts(batch_keys)
+        if len(batch_keys):
+            day = int((batch_keys % FREQUENCY_DAY_SPAN).max())
+            self.latest_day = day if self.latest_day is None else max(self.latest_day, day)
+            if self.prune:
+                # 窗口结束日不早于 latest_day 时，早于 latest_day - window_days + 1 的桶不会再被计入
+                keep = self.keys % FREQUENCY_DAY_SPAN > self.latest_day - self.window_days
+                self.keys, self.counts = self.keys[keep], self.counts[keep]
+        return self._frame(batch_keys, window_counts)
+
+    def window_counts(self, keys: np.ndarray) -> np.ndarray:
+        """以各键的日期为窗口结束日，计算窗口内该客户的订单数"""
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)])
+        upper = np.searchsorted(self.keys, keys, side="right")
+        lower = np.searchsorted(self.keys, keys - self.window_days, side="right")
+        return cumulative[upper] - cumulative[lower]
+
+    def order_counts(self, chunk: pd.DataFrame) -> np.ndarray:
+        """chunk 中每个订单：截至其下单日的窗口内该客户的订单数（日期无效的订单为 0）"""
+        row_keys = self._row_keys(chunk)
+        return np.where(row_keys >= 0, self.window_counts(row_keys), 0)
+
+    def detect(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """并入一块订单并返回窗口订单数超过阈值的 (客户, 窗口结束日)，附 severity 列"""
+        windows = self.update(chunk)
+        flagged = windows[windows["order_count"] > self.threshold.threshold_value].copy()
+        flagged["severity"] = self.threshold.classify(flagged["order_count"])
+        return flagged.reset_index(drop=True)
+
+    def _row_keys(self, chunk: pd.DataFrame) -> np.ndarray:
+        """每行的桶键；日期无效的行为 -1"""
+        days = pd.to_datetime(chunk["order_date"], errors="coerce").to_numpy().astype("datetime64[D]")
+        valid = ~np.isnat(days)
+        keys = np.full(len(chunk), -1, dtype=np.int64)
+        codes = self._customer_codes(chunk["customer_id"].to_numpy()[valid])
+        keys[valid] = codes * FREQUENCY_DAY_SPAN + days[valid].astype(np.int64)
+        return keys
+
+    def _customer_codes(self, customer_ids: np.ndarray) -> np.ndarray:
+        ids = pd.Index(customer_ids).astype(str)
+        codes = self._customers.get_indexer(ids)
+        if (codes < 0).any():
+            self._customers = self._customers.append(ids[codes < 0].unique())
+            codes = self._customers.get_indexer(ids)
+        return codes.astype(np.int64)
+
+    def _frame(self, keys: np.ndarray, window_counts: np.ndarray) -> pd.DataFrame:
+        days = (keys % FREQUENCY_DAY_SPAN).astype("datetime64[D]")
+        return pd.DataFrame(
+            {
+                "customer_id": np.asarray(self._customers[keys // FREQUENCY_DAY_SPAN], dtype=object),
+                "window_end": pd.to_datetime(days).strftime("%Y-%m-%d"),
+                "order_count": window_counts,
+            }
+        )
+
+
+FRAUD_RULE_METRICS_DDL = """
+    CREATE TABLE IF NOT EXISTS fraud_rule_metrics (
+        metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        evaluation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        rule_type TEXT,
+        evaluation_period TEXT,
+        true_positives INTEGER,
+        false_positives INTEGER,
+        true_negatives INTEGER,
+        false_negatives INTEGER,
+        precision REAL,
+        recall REAL,
+        f1_score REAL,
+        false_positive_rate REAL,
+        false_negative_rate REAL,
+        accuracy REAL,
+        threshold_config TEXT,
+        notes TEXT
+    )
+"""
+
+FRAUD_RULE_METRICS_INSERT_SQL = """
+    INSERT INTO fraud_rule_metrics
+    (evaluation_date, rule_type, evaluation_period, true_positives, false_positives,
+     true_negatives, false_negatives, precision, recall, f1_score,
+     false_positive_rate, false_negative_rate, accuracy, threshold_config, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 
 class FraudRuleManager:
     """欺诈规则管理器"""
@@ -186,10 +647,11 @@ class FraudRuleManager:
         self.db_audit = self.data_dir / "audit.db"
 
         self.thresholds = self.DEFAULT_THRESHOLDS.copy()
+        self.audit_sink = AuditLogSink(self.db_audit, source_system="Fraud_Rule_Manager")
 
-    def _get_conn(self, db_path: Path):
-        """获取数据库连接"""
-        return sqlite3.connect(str(db_path))
+    def _get_conn(self, db_path: Path, readonly: bool = False):
+        """获取数据库连接（来自共享连接池，close() 只归还不关闭）"""
+        return get_connection_pool().connection(db_path, readonly=readonly)
 
     def evaluate_timing_fraud_rule(self, start_date: str = None, end_date: str = None) -> RulePerformanceMetrics:
         """
@@ -201,61 +663,29 @@ class FraudRuleManager:
         - 发货日期早于订单日期1-7天 -> 标记为可疑 (需要人工审核)
         - 发货日期等于或晚于订单日期 -> 标记为正常 (TN)
         """
-        conn = self._get_conn(self.db_ops)
-
-        date_filter = ""
-        if start_date and end_date:
-            date_filter = f"WHERE t1.order_date BETWEEN '{start_date}' AND '{end_date}'"
+        conn = self._get_conn(self.db_ops, readonly=True)
 
-        query = f"""
-        SELECT
-            t1.order_id,
-            t1.order_date,
-            t2.shipping_date,
-            julianday(t2.shipping_date) - julianday(t1.order_date) as day_diff,
-            t1.profit,
-            t1.sales
-        FROM sales_orders t1
-        JOIN shipping_logs t2 ON t1.order_id = t2.order_id
-        {date_filter}
-        AND t1.order_status NOT IN ('CANCELED', 'CANCELLED', 'SUSPECTED_FRAUD')
-        """
-
-        df = pd.read_sql(query, conn)
+        query, params = build_rule_query(FraudRuleType.TIMING_FRAUD, start_date, end_date)
+        df = pd.read_sql(query, conn, params=params)
         conn.close()
 
-        if df.empty:
-            return RulePerformanceMetrics(
-                rule_type=FraudRuleType.TIMING_FRAUD, evaluation_period=f"{start_date} to {end_date}"
-            )
-
         # 转换日期
         df["order_date"] = pd.to_datetime(df["order_date"], errors="coerce")
         df["shipping_date"] = pd.to_datetime(df["shipping_date"], errors="coerce")
-        df["actual_day_diff"] = (df["shipping_date"] - df["order_date"]).dt.days
+        day_diff = (df["shipping_date"] - df["order_date"]).dt.days.to_numpy(dtype=float, na_value=np.nan)
 
         # 规则触发条件：发货早于订单 (day_diff < 0)
-        df["rule_triggered"] = df["actual_day_diff"] < 0
+        rule_triggered = day_diff < 0
 
         # 启发式标注（生产环境应使用人工标注）
         # 发货早于订单超过7天 -> 高置信度欺诈
         # 发货早于订单1-7天 -> 中等置信度
         # 发货日期等于或晚于订单 -> 正常
-        df["is_fraud"] = df["actual_day_diff"] < -7  # 启发式：超过7天认为是确认欺诈
+        is_fraud = day_diff < -7  # 启发式：超过7天认为是确认欺诈
 
-        # 计算混淆矩阵
-        tp = len(df[(df["rule_triggered"]) & (df["is_fraud"])])
-        fp = len(df[(df["rule_triggered"]) & (not df["is_fraud"])])
-        tn = len(df[(not df["rule_triggered"]) & (not df["is_fraud"])])
-        fn = len(df[(not df["rule_triggered"]) & (df["is_fraud"])])
-
-        return RulePerformanceMetrics(
-            rule_type=FraudRuleType.TIMING_FRAUD,
-            evaluation_period=f"{start_date} to {end_date}",
-            true_positives=tp,
-            false_positives=fp,
-            true_negatives=tn,
-            false_negatives=fn,
+        # 一次遍历计算混淆矩阵
+        return RulePerformanceMetrics.from_masks(
+            FraudRuleType.TIMING_FRAUD, f"{start_date} to {end_date}", rule_triggered, is_fraud
         )
 
     def evaluate_negative_margin_rule(self, start_date: str = None, end_date: str = None) -> RulePerformanceMetrics:
@@ -267,127 +697,299 @@ class FraudRuleManager:
         - 负毛利但金额 <= $1000 -> 可能是促销或错误
         - 正毛利 -> 正常 (TN)
         """
-        conn = self._get_conn(self.db_ops)
-
-        date_filter = ""
-        if start_date and end_date:
-            date_filter = f"WHERE order_date BETWEEN '{start_date}' AND '{end_date}'"
+        conn = self._get_conn(self.db_ops, readonly=True)
 
-        query = f"""
-        SELECT
-            order_id,
-            profit,
-            sales,
-            order_status
-        FROM sales_orders
-        {date_filter}
-        AND order_status NOT IN ('CANCELED', 'CANCELLED', 'SUSPECTED_FRAUD')
-        """
-
-        df = pd.read_sql(query, conn)
+        query, params = build_rule_query(FraudRuleType.NEGATIVE_MARGIN, start_date, end_date)
+        df = pd.read_sql(query, conn, params=params)
         conn.close()
 
-        if df.empty:
-            return RulePerformanceMetrics(
-                rule_type=FraudRuleType.NEGATIVE_MARGIN, evaluation_period=f"{start_date} to {end_date}"
-            )
+        profit = df["profit"].to_numpy(dtype=float, na_value=np.nan)
 
         # 规则触发条件：利润 < 0
-        df["rule_triggered"] = df["profit"] < 0
+        rule_triggered = profit < 0
 
         # 启发式标注：负毛利且金额 > $1000 认为是确认问题
-        df["is_fraud"] = df["profit"] < -1000
+        is_fraud = profit < -1000
 
-        tp = len(df[(df["rule_triggered"]) & (df["is_fraud"])])
-        fp = len(df[(df["rule_triggered"]) & (not df["is_fraud"])])
-        tn = len(df[(not df["rule_triggered"]) & (not df["is_fraud"])])
-        fn = len(df[(not df["rule_triggered"]) & (df["is_fraud"])])
-
-        return RulePerformanceMetrics(
-            rule_type=FraudRuleType.NEGATIVE_MARGIN,
-            evaluation_period=f"{start_date} to {end_date}",
-            true_positives=tp,
-            false_positives=fp,
-            true_negatives=tn,
-            false_negatives=fn,
+        return RulePerformanceMetrics.from_masks(
+            FraudRuleType.NEGATIVE_MARGIN, f"{start_date} to {end_date}", rule_triggered, is_fraud
         )
 
     def evaluate_all_rules(self, start_date: str = None, end_date: str = None) -> List[RulePerformanceMetrics]:
-        """评估所有启用的规则"""
-        results = []
-
-        for rule_type, threshold in self.thresholds.items():
-            if not threshold.enabled:
-                continue
-
-            if rule_type == FraudRuleType.TIMING_FRAUD:
-                metrics = self.evaluate_timing_fraud_rule(start_date, end_date)
-            elif rule_type == FraudRuleType.NEGATIVE_MARGIN:
-                metrics = self.evaluate_negative_margin_rule(start_date, end_date)
-            else:
+        """
+        评估所有启用的规则
+
+        评估周期内的订单只读取一次（load_evaluation_context），各规则在同一个 DataFrame 上
+        以向量化掩码求值，所有规则的混淆矩阵由一次 bincount 得出。
+        """
+        context = self.load_evaluation_context(start_date, end_date)
+        return self.evaluate_rules(context)
+
+    def load_evaluation_context(self, start_date: str = None, end_date: str = None) -> RuleEvaluationContext:
+        """读取评估周期内的有效订单，构造共享评估上下文"""
+        query, params = build_context_query(start_date, end_date)
+        conn = self._get_conn(self.db_ops, readonly=True)
+        df = pd.read_sql(query, conn, params=params)
+        conn.close()
+        return RuleEvaluationContext.from_frame(df, evaluation_period=f"{start_date} to {end_date}")
+
+    def evaluate_rules(self, context: RuleEvaluationContext, rule_types=None) -> List[RulePerformanceMetrics]:
+        """
+        在共享上下文上评估规则
+
+        Args:
+            rule_types: 要评估的规则（默认为所有启用且已实现的规则）
+        """
+        evaluated, triggered, is_fraud, scope = self._stack_rule_masks(context, rule_types)
+        if not evaluated:
+            return []
+
+        counts = confusion_matrices(triggered, is_fraud, scope)
+        return [
+            RulePerformanceMetrics.from_counts(rule_type, context.evaluation_period, rule_counts)
+            for rule_type, rule_counts in zip(evaluated, counts)
+        ]
+
+    def evaluate_rules_by_group(
+        self, context: RuleEvaluationContext, group_by: str, rule_types=None
+    ) -> Dict[str, List[RulePerformanceMetrics]]:
+        """
+        在共享上下文上按月份 / 地区 / 客户细分评估规则，所有规则与分组的计数同样由一次 bincount 得出
+
+        Returns:
+            分组标签 -> 各规则的 RulePerformanceMetrics
+        """
+        codes, labels = context.group_codes(group_by)
+        evaluated, triggered, is_fraud, scope = self._stack_rule_masks(context, rule_types)
+        if not evaluated:
+            return {label: [] for label in labels}
+
+        counts = confusion_matrices(triggered, is_fraud, scope, groups=codes, n_groups=len(labels))
+        return {
+            label: [
+                RulePerformanceMetrics.from_counts(rule_type, context.evaluation_period, counts[i, g])
+                for i, rule_type in enumerate(evaluated)
+            ]
+            for g, label in enumerate(labels)
+        }
+
+    def _stack_rule_masks(self, context: RuleEvaluationContext, rule_types=None):
+        """求值各规则的掩码并堆叠为 (规则数, 行数) 数组；返回 (已评估的规则, 触发, 欺诈, 评估范围)"""
+        if rule_types is None:
+            rule_types = [rule_type for rule_type, threshold in self.thresholds.items() if threshold.enabled]
+
+        evaluated, masks = [], []
+        for rule_type in rule_types:
+            rule_masks = self.rule_masks(rule_type, context)
+            if rule_masks is None:
                 continue  # 其他规则暂未实现
+            evaluated.append(rule_type)
+            masks.append(rule_masks)
+
+        if not evaluated:
+            return evaluated, None, None, None
+        triggered, is_fraud, scope = (np.vstack(column) for column in zip(*masks))
+        return evaluated, triggered, is_fraud, scope
+
+    def rule_masks(
+        self, rule_type: FraudRuleType, context: RuleEvaluationContext
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        规则在上下文每一行上的 (触发, 启发式欺诈标注, 评估范围) 布尔数组；未实现的规则返回 None
+
+        启发式标注与 evaluate_*_rule 一致（生产环境应使用人工标注）。
+        """
+        scores = self.rule_scores(rule_type, context)
+        if scores is None:
+            return None
+        score, is_fraud, scope = scores
+        triggered = RULE_TRIGGERS[rule_type](score, self.thresholds[rule_type].threshold_value)
+        return triggered, is_fraud, scope
+
+    def rule_scores(
+        self, rule_type: FraudRuleType, context: RuleEvaluationContext
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        规则在上下文每一行上的 (度量值, 启发式欺诈标注, 评估范围)；未实现的规则返回 None
+
+        度量值与 threshold_value 按 RULE_TRIGGERS 比较即为是否触发，回测可对同一度量值比较多个候选阈值。
+        """
+        if rule_type not in self.thresholds or rule_type not in RULE_TRIGGERS:
+            return None
+        df = context.rows
+
+        if rule_type == FraudRuleType.TIMING_FRAUD:
+            # 逐物流记录：发货日期 - 订单日期（天）；早于 7 天以上视为确认欺诈
+            day_diff = (df["shipping_date"] - df["order_date"]).dt.days.to_numpy(dtype=float, na_value=np.nan)
+            return day_diff, day_diff < -7, context.has_shipment
+
+        if rule_type == FraudRuleType.NEGATIVE_MARGIN:
+            # 逐订单：利润；亏损超过 $1000 视为确认问题
+            profit = df["profit"].to_numpy(dtype=float, na_value=np.nan)
+            return profit, profit < -1000, context.first_of_order
+
+        confirmed = self.thresholds[rule_type].severity_levels["CRITICAL"][0]
+
+        if rule_type == FraudRuleType.FREQUENCY_ANOMALY:
+            # 逐订单：下单当日所在窗口内该客户的订单数；达到 CRITICAL 下限（>= 50 单）视为确认异常
+            counter = CustomerFrequencyCounter(self.thresholds[rule_type], prune=False)
+            counter.update(df[context.first_of_order])
+            counts = counter.order_counts(df)
+            return counts, counts >= confirmed, context.first_of_order
+
+        # AMOUNT_ANOMALY 逐订单：按评估周期内各分段的统计计算 |Z|；达到 CRITICAL 下限（Z >= 5）视为确认异常
+        detector = self.amount_detector()
+        z_scores = np.abs(detector.update(df[context.first_of_order]).score(df))
+        return z_scores, z_scores >= confirmed, context.first_of_order
+
+    def frequency_counter(self, window_days: int = 1) -> CustomerFrequencyCounter:
+        """按当前阈值配置创建频率异常计数器（可长期持有，逐日 update 新订单）"""
+        return CustomerFrequencyCounter(self.thresholds[FraudRuleType.FREQUENCY_ANOMALY], window_days)
+
+    def detect_frequency_anomalies(
+        self,
+        start_date: str = None,
+        end_date: str = None,
+        window_days: int = 1,
+        chunksize: int = FREQUENCY_STREAM_CHUNKSIZE,
+        log_to_audit: bool = True,
+    ) -> pd.DataFrame:
+        """
+        分块流式扫描订单，检测客户在 window_days 天窗口内的下单频率异常
+
+        同一窗口跨块时以最后一块合并后的计数为准；log_to_audit=True 时把异常写入 audit_logs
+        （entity_type 为 Customer，严重程度按订单数分级）。
 
-            results.append(metrics)
+        Returns:
+            异常窗口（customer_id, window_end, order_count, severity）
+        """
+        counter = self.frequency_counter(window_days)
+        query, params = build_rule_query(FraudRuleType.FREQUENCY_ANOMALY, start_date, end_date)
+        conn = self._get_conn(self.db_ops, readonly=True)
+        try:
+            flagged = [
+                counter.detect(chunk)
+                for chunk in pd.read_sql(query + " ORDER BY order_date", conn, params=params, chunksize=chunksize)
+            ]
+        finally:
+            conn.close()
+
+        anomalies = pd.concat(flagged, ignore_index=True).drop_duplicates(["customer_id", "window_end"], keep="last")
+        anomalies = anomalies.reset_index(drop=True)
+        if log_to_audit:
+            self.log_frequency_anomalies(anomalies, window_days)
+        return anomalies
+
+    def log_frequency_anomalies(self, anomalies: pd.DataFrame, window_days: int = 1) -> int:
+        """把频率异常写入 audit_logs，返回写入行数"""
+        if anomalies.empty:
+            return 0
+        notes = [
+            f"{window_days} 天内（截至 {end}）下单 {count} 笔"
+            for end, count in zip(anomalies["window_end"], anomalies["order_count"])
+        ]
+        return self.audit_sink.add(
+            anomalies["customer_id"],
+            "FREQUENCY_ANOMALY",
+            anomalies["severity"].to_numpy(),
+            notes,
+            entity_type="Customer",
+        )
+
+    def amount_detector(self, segment_columns: Tuple[str, ...] = AMOUNT_SEGMENT_COLUMNS) -> SegmentZScoreDetector:
+        """按当前阈值配置创建金额异常检测器"""
+        return SegmentZScoreDetector(self.thresholds[FraudRuleType.AMOUNT_ANOMALY], segment_columns)
+
+    def detect_amount_anomalies(
+        self,
+        start_date: str = None,
+        end_date: str = None,
+        segment_columns: Tuple[str, ...] = AMOUNT_SEGMENT_COLUMNS,
+        chunksize: int = AMOUNT_STREAM_CHUNKSIZE,
+        log_to_audit: bool = True,
+    ) -> pd.DataFrame:
+        """
+        分块流式扫描订单，检测金额异常
 
-        return results
+        每块订单先并入在线统计再打分（每个订单与截至该块的历史比较），不保存历史明细。
+        分段列须为 category_name / customer_segment 的子集。log_to_audit=True 时把异常订单写入 audit_logs，
+        每个订单按自身 Z-score 分级。
+
+        Returns:
+            异常订单（order_id, order_date, 分段列, sales, z_score, severity）
+        """
+        detector = self.amount_detector(segment_columns)
+        query, params = build_rule_query(FraudRuleType.AMOUNT_ANOMALY, start_date, end_date)
+        conn = self._get_conn(self.db_ops, readonly=True)
+        try:
+            anomalies = [
+                detector.detect(chunk)
+                for chunk in pd.read_sql(query + " ORDER BY order_date", conn, params=params, chunksize=chunksize)
+            ]
+        finally:
+            conn.close()
+
+        anomalies = pd.concat(anomalies, ignore_index=True)
+        if log_to_audit and not anomalies.empty:
+            notes = [
+                f"金额 {value:.2f} 偏离分段均值 {z:.1f} 个标准差"
+                for value, z in zip(anomalies["sales"], anomalies["z_score"])
+            ]
+            self.audit_sink.add(anomalies["order_id"], "AMOUNT_ANOMALY", anomalies["severity"].to_numpy(), notes)
+        return anomalies
 
     def save_metrics_to_audit_db(self, metrics: RulePerformanceMetrics):
         """保存指标到审计数据库"""
-        conn = self._get_conn(self.db_audit)
+        self.save_metrics_bulk([metrics])
+
+    def save_metrics_bulk(
+        self, metrics_list: List[RulePerformanceMetrics], threshold_configs: List[Dict] = None, notes: str = None
+    ) -> int:
+        """
+        在一个事务内批量保存指标（回测一次写入所有 分区 × 阈值 组合）
 
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS fraud_rule_metrics (
-                metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                evaluation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                rule_type TEXT,
-                evaluation_period TEXT,
-                true_positives INTEGER,
-                false_positives INTEGER,
-                true_negatives INTEGER,
-                false_negatives INTEGER,
-                precision REAL,
-                recall REAL,
-                f1_score REAL,
-                false_positive_rate REAL,
-                false_negative_rate REAL,
-                accuracy REAL,
-                threshold_config TEXT,
-                notes TEXT
+        Args:
+            threshold_configs: 与 metrics_list 等长的阈值配置（默认为各规则的当前配置）
+            notes: 写入 notes 列的说明（如回测批次）
+
+        Returns:
+            写入行数
+        """
+        evaluation_date = datetime.now().isoformat()
+        if threshold_configs is None:
+            threshold_configs = [
+                self.thresholds[m.rule_type].__dict__ if m.rule_type in self.thresholds else None for m in metrics_list
+            ]
+
+        rows = []
+        for metrics, config in zip(metrics_list, threshold_configs):
+            data = metrics.to_dict()
+            rows.append(
+                (
+                    evaluation_date,
+                    data["rule_type"],
+                    data["evaluation_period"],
+                    data["true_positives"],
+                    data["false_positives"],
+                    data["true_negatives"],
+                    data["false_negatives"],
+                    data["precision"],
+                    data["recall"],
+                    data["f1_score"],
+                    data["false_positive_rate"],
+                    data["false_negative_rate"],
+                    data["accuracy"],
+                    json.dumps(config, default=str) if config is not None else None,
+                    notes,
+                )
             )
-        """)
-
-        data = metrics.to_dict()
-        cursor.execute(
-            """
-            INSERT INTO fraud_rule_metrics
-            (evaluation_date, rule_type, evaluation_period, true_positives, false_positives,
-             true_negatives, false_negatives, precision, recall, f1_score,
-             false_positive_rate, false_negative_rate, accuracy, threshold_config)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                datetime.now().isoformat(),
-                data["rule_type"],
-                data["evaluation_period"],
-                data["true_positives"],
-                data["false_positives"],
-                data["true_negatives"],
-                data["false_negatives"],
-                data["precision"],
-                data["recall"],
-                data["f1_score"],
-                data["false_positive_rate"],
-                data["false_negative_rate"],
-                data["accuracy"],
-                json.dumps(self.thresholds[data["rule_type"]].__dict__, default=str)
-                if data["rule_type"] in self.thresholds
-                else None,
-            ),
-        )
 
-        conn.commit()
+        conn = self._get_conn(self.db_audit)
+        with conn:
+            conn.execute(FRAUD_RULE_METRICS_DDL)
+            conn.executemany(FRAUD_RULE_METRICS_INSERT_SQL, rows)
         conn.close()
+        return len(rows)
 
     def generate_performance_report(self, metrics_list: List[RulePerformanceMetrics]) -> str:
         """生成性能报告"""
@@ -12,6 +12,7 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from src.audit.financial_control_tower import FinancialControlTower
+from src.data_engineering.profiling import add_profile_arguments, profile_options_from_args
 
 
 def run_sample_mode():
@@ -58,6 +59,16 @@ def run_sample_mode():
 def main():
     parser = argparse.ArgumentParser(description="Financial Control Tower")
     parser.add_argument("--sample", action="store_true", help="Use sample data (demo mode)")
+    parser.add_argument(
+        "--recon-engine", choices=["pandas", "sql"], default="pandas", help="Reconciliation engine (default: pandas)"
+    )
+    parser.add_argument("--parallel", action="store_true", help="Run the three audit stages concurrently")
+    parser.add_argument(
+        "--snapshot-cache",
+        action="store_true",
+        help="Reuse typed audit inputs from data/.snapshot_cache while the ERP databases are unchanged",
+    )
+    add_profile_arguments(parser)
     args = parser.parse_args()
 
     print("=" * 70)
@@ -84,8 +95,8 @@ def main():
     print("=" * 70)
 
     try:
-        tower = FinancialControlTower()
-        tower.run_full_audit()
+        tower = FinancialControlTower(snapshot_cache=args.snapshot_cache, profile=profile_options_from_args(args))
+        tower.run_full_audit(recon_engine=args.recon_engine, parallel=args.parallel)
 
         print("\n" + "=" * 70)
         print("💡 提示: 审计结果已保存到 data/audit.db")
@@ -8,81 +8,54 @@ from pathlib import Path
 
 import pandas as pd
 
+from src.audit.keyed_reconciliation import reconcile_keyed, write_demo_audit_logs
 
-def run_demo():
+
+def run_demo(data_dir: Path = None, artifacts_dir: Path = None):
     print("=" * 70)
     print("   Financial Control Tower - Quick Demo")
     print("=" * 70)
 
     # Setup paths
     project_root = Path(__file__).parent
-    data_dir = project_root / "data"
-    data_dir.mkdir(exist_ok=True)
+    sample_dir = project_root / "data" / "sample"
+    data_dir = Path(data_dir) if data_dir is not None else project_root / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
 
     # Create sample databases
     print("\n[Step 1] Creating sample databases...")
 
     # Operations DB
     conn_ops = sqlite3.connect(data_dir / "db_operations.db")
-    df_ops = pd.read_csv(project_root / "data" / "sample" / "operations_sample.csv")
+    df_ops = pd.read_csv(sample_dir / "operations_sample.csv")
     df_ops.to_sql("sales_orders", conn_ops, if_exists="replace", index=False)
     conn_ops.close()
     print("✓ Operations database created")
 
     # Finance DB
     conn_fin = sqlite3.connect(data_dir / "db_finance.db")
-    df_fin = pd.read_csv(project_root / "data" / "sample" / "finance_sample.csv")
+    df_fin = pd.read_csv(sample_dir / "finance_sample.csv")
     df_fin.to_sql("order_revenue", conn_fin, if_exists="replace", index=False)
     conn_fin.close()
     print("✓ Finance database created")
 
-    # Audit DB
-    conn_audit = sqlite3.connect(data_dir / "audit.db")
-    conn_audit.execute("""
-        CREATE TABLE IF NOT EXISTS audit_logs (
-            id INTEGER PRIMARY KEY,
-            timestamp TEXT,
-            severity TEXT,
-            description TEXT
-        )
-    """)
-
-    # Run simple reconciliation
+    # Run keyed reconciliation (hash join on order_id, vectorized tolerance check)
     print("\n[Step 2] Running reconciliation...")
 
     conn_ops = sqlite3.connect(data_dir / "db_operations.db")
     conn_fin = sqlite3.connect(data_dir / "db_finance.db")
 
-    df_ops = pd.read_sql("SELECT * FROM sales_orders", conn_ops)
-    df_fin = pd.read_sql("SELECT * FROM order_revenue", conn_fin)
-
-    # Simple matching
-    matched = 0
-    mismatched = 0
-
-    for _, fin_row in df_fin.iterrows():
-        order_id = fin_row["order_id"]
-        fin_amount = fin_row["amount"]
-
-        ops_match = df_ops[df_ops["order_id"] == order_id]
-        if not ops_match.empty:
-            ops_amount = ops_match.iloc[0]["sales"]
-            if abs(fin_amount - ops_amount) < 0.01:
-                matched += 1
-                status = "MATCHED"
-            else:
-                mismatched += 1
-                status = "MISMATCH"
-
-            conn_audit.execute(
-                "INSERT INTO audit_logs (timestamp, severity, description) VALUES (datetime('now'), ?, ?)",
-                (
-                    "INFO" if status == "MATCHED" else "WARNING",
-                    f"Order {order_id}: {status} (Ops: {ops_amount}, Fin: {fin_amount})",
-                ),
-            )
-
-    conn_audit.commit()
+    df_ops = pd.read_sql("SELECT order_id, sales FROM sales_orders", conn_ops)
+    df_fin = pd.read_sql("SELECT order_id, amount FROM order_revenue", conn_fin)
+
+    result = reconcile_keyed(df_ops, df_fin, key="order_id", left_amount="sales", right_amount="amount")
+    matched = result.matched
+    mismatched = result.mismatched
+
+    # Audit DB: one bulk insert for every order found on both sides
+    conn_audit = sqlite3.connect(data_dir / "audit.db")
+    write_demo_audit_logs(conn_audit, result)
+
     conn_ops.close()
     conn_fin.close()
     conn_audit.close()
@@ -92,8 +65,8 @@ def run_demo():
     # Generate report
     print("\n[Step 3] Generating report...")
 
-    artifacts_dir = project_root / "artifacts"
-    artifacts_dir.mkdir(exist_ok=True)
+    artifacts_dir = Path(artifacts_dir) if artifacts_dir is not None else project_root / "artifacts"
+    artifacts_dir.mkdir(parents=True, exist_ok=True)
 
     report = {
         "mode": "DEMO",
@@ -112,7 +85,7 @@ def run_demo():
     with open(artifacts_dir / "quickstart_report.json", "w") as f:
         json.dump(report, f, indent=2)
 
-    print("✓ Report saved to: artifacts/quickstart_report.json")
+    print(f"✓ Report saved to: {artifacts_dir / 'quickstart_report.json'}")
 
     print("\n" + "=" * 70)
     print("✅ Demo complete!")
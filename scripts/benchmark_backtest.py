@@ -0,0 +1,76 @@
+"""
+欺诈规则回测基准测试
+以不同进程数运行 FraudRuleBacktester，记录耗时与相对单进程的加速比
+
+用法:
+    python scripts/benchmark_backtest.py --data-dir data --workers 1,2,4,8
+    python scripts/benchmark_backtest.py --workers 1,4 --repeat 3 --output artifacts/backtest_scaling.json
+
+各月分区相互独立，理想情况下加速比随进程数线性增长，直到达到 CPU 核数或月份数；
+进程数超过 CPU 核数时不会再有收益，解读结果时请对照输出中的 cpu_count。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from fraud_rule_backtest import FraudRuleBacktester
+
+
+def run_benchmark(data_dir: Path, workers: list, start_date: str = None, end_date: str = None, repeat: int = 1) -> dict:
+    """对每个进程数运行 repeat 次回测，取最短耗时"""
+    report = {"cpu_count": os.cpu_count(), "start_date": start_date, "end_date": end_date, "runs": []}
+    for n in workers:
+        backtester = FraudRuleBacktester(data_dir=data_dir, workers=n)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = backtester.run(start_date, end_date)
+            timings.append(time.perf_counter() - start)
+        report["runs"].append(
+            {
+                "workers": n,
+                "seconds": min(timings),
+                "partitions": int(results["period"].nunique()),
+                "rows": len(results),
+            }
+        )
+
+    baseline = report["runs"][0]["seconds"]
+    for run in report["runs"]:
+        run["speedup"] = baseline / run["seconds"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="欺诈规则回测基准测试")
+    parser.add_argument("--data-dir", type=Path, default=None, help="ERP 数据库目录（默认 data/）")
+    parser.add_argument("--workers", default="1,2,4", help="逗号分隔的进程数列表，第一个为基准")
+    parser.add_argument("--start-date", default=None, help="回测起始日期（默认最早订单）")
+    parser.add_argument("--end-date", default=None, help="回测结束日期（默认最晚订单）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个进程数重复次数（取最短耗时）")
+    parser.add_argument("--output", type=Path, default=None, help="JSON 结果输出路径（可选）")
+    args = parser.parse_args()
+
+    workers = [int(n) for n in args.workers.split(",")]
+    report = run_benchmark(args.data_dir, workers, args.start_date, args.end_date, args.repeat)
+
+    print(f"CPU 核数: {report['cpu_count']}")
+    for run in report["runs"]:
+        print(f"  workers={run['workers']:<4} {run['seconds']:>8.2f}s  x{run['speedup']:.2f}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
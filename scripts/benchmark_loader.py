@@ -0,0 +1,84 @@
+"""
+ERP 数据库加载基准测试
+对同一份 CSV 计时 ERPDatabaseInitializer 的各个加载阶段
+
+用法:
+    python scripts/benchmark_loader.py path/to/DataCo.csv [--work-dir /tmp/fct_bench]
+    python scripts/benchmark_loader.py path/to/DataCo.csv --streaming --chunksize 100000
+
+峰值内存 (peak RSS) 为整个进程的最大值，对比两种模式时请分别运行。
+"""
+
+import argparse
+import contextlib
+import io
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.data_engineering.init_erp_databases import STREAM_CHUNK_SIZE, ERPDatabaseInitializer
+
+
+def run_benchmark(csv_path: Path, work_dir: Path, streaming: bool = False, chunksize: int = STREAM_CHUNK_SIZE) -> dict:
+    """在独立目录中加载 CSV 并返回各阶段耗时（秒）"""
+    raw_dir = work_dir / "raw"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy(csv_path, raw_dir / csv_path.name)
+    for db_file in work_dir.glob("*.db"):
+        db_file.unlink()
+
+    initializer = ERPDatabaseInitializer(data_dir=work_dir)
+    timings = {}
+
+    # 屏蔽加载过程中的进度输出，只保留计时结果
+    with contextlib.redirect_stdout(io.StringIO()):
+        if streaming:
+            start = time.perf_counter()
+            initializer.create_databases_streaming(chunksize)
+            timings["create_databases_streaming"] = time.perf_counter() - start
+        else:
+            start = time.perf_counter()
+            df = initializer.load_raw_data()
+            timings["load_raw_data"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            initializer.create_operations_db(df)
+            timings["create_operations_db"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            initializer.create_finance_db(df)
+            timings["create_finance_db"] = time.perf_counter() - start
+
+    timings["total"] = sum(timings.values())
+    # Linux 下 ru_maxrss 单位为 KB
+    timings["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ERP 数据库加载基准测试")
+    parser.add_argument("csv", type=Path, help="DataCo 格式的 CSV 文件")
+    parser.add_argument("--work-dir", type=Path, help="数据库输出目录（默认使用临时目录）")
+    parser.add_argument("--streaming", action="store_true", help="使用分块流式加载")
+    parser.add_argument("--chunksize", type=int, default=STREAM_CHUNK_SIZE, help="流式模式每块行数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = run_benchmark(args.csv, args.work_dir or Path(tmp), args.streaming, args.chunksize)
+
+    print(f"输入: {args.csv} ({'streaming' if args.streaming else 'in-memory'})")
+    peak_rss_mb = timings.pop("peak_rss_mb")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<28} {seconds:>8.2f}s")
+    print(f"  {'peak_rss':<28} {peak_rss_mb:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+分规模基准测试套件
+用合成 DataCo 数据（src/data_engineering/synthetic_data.py）在 10k / 1M / 10M 订单规模上依次运行
+加载、业财对账、供应链审计、报表、欺诈规则评估与 run_real，记录每一步的耗时、CPU 时间与峰值内存，
+并核对注入的异常是否被检出，结果写入 JSON
+
+用法:
+    python scripts/benchmark_suite.py --scales 10k,1m
+    python scripts/benchmark_suite.py --scales 10m --work-dir /data/fct_bench --loader streaming
+    python scripts/benchmark_suite.py --scales 10k,1m --baseline artifacts/benchmarks/benchmark_old.json
+
+每一步在新建的子进程（spawn）中执行，peak_rss_mb 只反映该步骤本身（start_rss_mb 为导入模块后的基线），
+步骤之间通过工作目录中的文件衔接。--baseline 与之前的结果逐步比较耗时，
+任一步骤超过 --max-slowdown 倍时以退出码 1 结束，可作为回归检查。
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.data_engineering.init_erp_databases import STREAM_CHUNK_SIZE
+from src.data_engineering.synthetic_data import SCALES, manifest_path, parse_scale
+
+# 审计动作 -> 清单中对应的异常类型
+AUDIT_CHECKS = {
+    "RECON_MISSING_AR": "missing_ar",
+    "RECON_AMOUNT_MISMATCH": "amount_mismatch",
+    "SC_TIMING_FRAUD": "timing_fraud",
+    "SC_NEGATIVE_MARGIN": "negative_margin",
+}
+
+
+def _peak_rss_mb() -> float:
+    # Linux 下 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load_manifest(work_dir: Path):
+    from src.data_engineering.synthetic_data import SyntheticManifest
+
+    return SyntheticManifest.load(manifest_path(work_dir / "raw" / "DataCo.csv"))
+
+
+# ---- 各步骤（在子进程中执行，返回可写入 JSON 的结果摘要） ----
+
+
+def step_generate(work_dir: Path, orders: int, seed: int) -> dict:
+    from src.data_engineering.synthetic_data import write_dataco_csv
+
+    manifest = write_dataco_csv(work_dir / "raw" / "DataCo.csv", orders, seed=seed)
+    return {
+        "rows": manifest.rows,
+        "csv_mb": Path(manifest.path).stat().st_size / 1024**2,
+        "injected": manifest.counts(),
+    }
+
+
+def step_initialize(work_dir: Path, loader: str, chunksize: int) -> dict:
+    from src.data_engineering.init_erp_databases import ERPDatabaseInitializer
+
+    for db_file in work_dir.glob("*.db*"):
+        db_file.unlink()
+    initializer = ERPDatabaseInitializer(data_dir=work_dir)
+    initializer.initialize(streaming=loader == "streaming", chunksize=chunksize)
+    with sqlite3.connect(initializer.ops_db_path) as conn:
+        orders = conn.execute("SELECT COUNT(*) FROM sales_orders").fetchone()[0]
+    return {"sales_orders": orders}
+
+
+def step_apply_finance_anomalies(work_dir: Path) -> dict:
+    from src.data_engineering.synthetic_data import apply_finance_anomalies
+
+    return apply_finance_anomalies(work_dir / "db_finance.db", _load_manifest(work_dir))
+
+
+def step_reconcile(work_dir: Path) -> dict:
+    from src.audit.financial_control_tower import FinancialControlTower
+
+    result = FinancialControlTower(data_dir=work_dir).reconcile_operations_finance()
+    return {
+        "ops_count": result.ops_count,
+        "fin_count": result.fin_count,
+        "missing_in_fin": len(result.missing_in_fin),
+        "amount_mismatch": len(result.amount_mismatch),
+    }
+
+
+def step_audit_supply_chain(work_dir: Path) -> dict:
+    from src.audit.financial_control_tower import FinancialControlTower
+
+    FinancialControlTower(data_dir=work_dir).audit_supply_chain_risks()
+    return {}
+
+
+def step_financial_statements(work_dir: Path) -> dict:
+    from src.audit.financial_control_tower import FinancialControlTower
+
+    FinancialControlTower(data_dir=work_dir).generate_financial_statements()
+    return {}
+
+
+def step_evaluate_rules(work_dir: Path) -> dict:
+    from fraud_rule_metrics import FraudRuleManager
+
+    metrics = FraudRuleManager(data_dir=work_dir).evaluate_all_rules()
+    return {"rules": [m.to_dict() for m in metrics]}
+
+
+def step_frequency_anomalies(work_dir: Path) -> dict:
+    from fraud_rule_metrics import FraudRuleManager
+
+    anomalies = FraudRuleManager(data_dir=work_dir).detect_frequency_anomalies(log_to_audit=False)
+    flagged = set(anomalies["customer_id"].astype(str))
+    injected = set(_load_manifest(work_dir).anomalies["frequency_spike"])
+    return {"flagged_customers": len(flagged), "injected_customers": len(injected), "detected": len(injected & flagged)}
+
+
+def step_erp_export(work_dir: Path, orders: int, seed: int) -> dict:
+    from src.data_engineering.synthetic_data import write_erp_export_csv
+
+    return write_erp_export_csv(work_dir / "erp_export.csv", orders, seed=seed)
+
+
+def step_run_real(work_dir: Path) -> dict:
+    from run_real import run_reconciliation
+
+    report = run_reconciliation(str(work_dir / "erp_export.csv"), str(work_dir / "run_real"))
+    return {"rows_processed": report["rows_processed"], "anomalies_found": report["anomalies_found"]}
+
+
+STEPS = {
+    "generate": step_generate,
+    "initialize": step_initialize,
+    "apply_finance_anomalies": step_apply_finance_anomalies,
+    "reconcile_operations_finance": step_reconcile,
+    "audit_supply_chain_risks": step_audit_supply_chain,
+    "generate_financial_statements": step_financial_statements,
+    "evaluate_all_rules": step_evaluate_rules,
+    "detect_frequency_anomalies": step_frequency_anomalies,
+    "erp_export": step_erp_export,
+    "run_real": step_run_real,
+}
+
+
+def measure_step(name: str, kwargs: dict) -> dict:
+    """在当前（子）进程中执行一个步骤：墙钟时间、CPU 时间、峰值内存与结果摘要"""
+    start_rss = _peak_rss_mb()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    # 屏蔽步骤内部的进度输出，只保留计时结果
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = STEPS[name](**kwargs)
+    return {
+        "step": name,
+        "wall_s": time.perf_counter() - start,
+        "cpu_s": time.process_time() - cpu_start,
+        "start_rss_mb": start_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+        "result": result,
+    }
+
+
+def run_step(name: str, **kwargs) -> dict:
+    """在新建的 spawn 子进程中执行步骤（峰值内存互不累计）"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(measure_step, name, kwargs).result()
+
+
+def check_detections(steps: dict, audit_counts: dict) -> dict:
+    """
+    对照清单核对检出数：{检查项: {"injected", "detected", "ok"}}
+
+    audit_counts 为 audit_logs 中各动作的行数（审计日志按实体与动作唯一，即检出的订单数）
+    """
+    injected = steps["generate"]["result"]["injected"]
+    checks = {}
+
+    def add(name, expected, detected):
+        checks[name] = {"injected": expected, "detected": detected, "ok": expected == detected}
+
+    reconcile = steps["reconcile_operations_finance"]["result"]
+    add("missing_ar", injected["missing_ar"], reconcile["missing_in_fin"])
+    add("amount_mismatch", injected["amount_mismatch"], reconcile["amount_mismatch"])
+    for action, anomaly in AUDIT_CHECKS.items():
+        add(action, injected[anomaly], audit_counts.get(action, 0))
+    frequency = steps["detect_frequency_anomalies"]["result"]
+    add("frequency_spike", frequency["injected_customers"], frequency["detected"])
+    export = steps["erp_export"]["result"]
+    add(
+        "run_real",
+        export["negative_amount"] + export["missing_account_code"],
+        steps["run_real"]["result"]["anomalies_found"],
+    )
+    return checks
+
+
+def run_scale(scale: str, work_dir: Path, seed: int, loader: str, chunksize: int) -> dict:
+    """在 work_dir 中按顺序运行一个规模的全部步骤"""
+    orders = parse_scale(scale)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    plan = [
+        ("generate", {"orders": orders, "seed": seed}),
+        ("initialize", {"loader": loader, "chunksize": chunksize}),
+        ("apply_finance_anomalies", {}),
+        ("reconcile_operations_finance", {}),
+        ("audit_supply_chain_risks", {}),
+        ("generate_financial_statements", {}),
+        ("evaluate_all_rules", {}),
+        ("detect_frequency_anomalies", {}),
+        ("erp_export", {"orders": orders, "seed": seed}),
+        ("run_real", {}),
+    ]
+
+    steps = {}
+    for name, kwargs in plan:
+        steps[name] = run_step(name, work_dir=work_dir, **kwargs)
+        print(
+            f"  [{scale}] {name:<30} {steps[name]['wall_s']:>9.2f}s  cpu {steps[name]['cpu_s']:>9.2f}s"
+            f"  peak {steps[name]['peak_rss_mb']:>8.1f} MB"
+        )
+
+    with sqlite3.connect(work_dir / "audit.db") as conn:
+        audit_counts = dict(conn.execute("SELECT action, COUNT(*) FROM audit_logs GROUP BY action").fetchall())
+    checks = check_detections(steps, audit_counts)
+
+    return {
+        "scale": scale,
+        "orders": orders,
+        "rows": steps["generate"]["result"]["rows"],
+        "steps": list(steps.values()),
+        "checks": checks,
+        "all_detected": all(check["ok"] for check in checks.values()),
+    }
+
+
+def compare_with_baseline(report: dict, baseline: dict, max_slowdown: float) -> list:
+    """逐步比较耗时，返回超过 max_slowdown 倍的 (规模, 步骤, 基线秒数, 当前秒数)"""
+    previous = {
+        (scale["scale"], step["step"]): step["wall_s"]
+        for scale in baseline.get("scales", [])
+        for step in scale["steps"]
+    }
+    regressions = []
+    for scale in report["scales"]:
+        for step in scale["steps"]:
+            before = previous.get((scale["scale"], step["step"]))
+            # 亚秒级步骤受进程启动等噪声影响大，不参与比较
+            if before and before >= 1.0 and step["wall_s"] > before * max_slowdown:
+                regressions.append((scale["scale"], step["step"], before, step["wall_s"]))
+    return regressions
+
+
+def run_suite(
+    scales: list, work_dir: Path, seed: int = 0, loader: str = "streaming", chunksize: int = STREAM_CHUNK_SIZE
+) -> dict:
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "cpu_count": os.cpu_count(),
+        "python": sys.version.split()[0],
+        "seed": seed,
+        "loader": loader,
+        "scales": [],
+    }
+    for scale in scales:
+        scale_dir = work_dir / scale
+        report["scales"].append(run_scale(scale, scale_dir, seed, loader, chunksize))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分规模基准测试套件（合成 DataCo 数据）")
+    parser.add_argument("--scales", default="10k,1m", help=f"逗号分隔的订单规模（{', '.join(SCALES)} 或订单数）")
+    parser.add_argument("--work-dir", type=Path, default=None, help="数据与数据库目录（默认使用临时目录，结束后删除）")
+    parser.add_argument("--seed", type=int, default=0, help="合成数据随机种子")
+    parser.add_argument("--loader", choices=["streaming", "in-memory"], default="streaming", help="数据库加载方式")
+    parser.add_argument("--chunksize", type=int, default=STREAM_CHUNK_SIZE, help="流式加载每块行数")
+    parser.add_argument(
+        "--output", type=Path, default=None, help="JSON 结果路径（默认 artifacts/benchmarks/benchmark_<时间>.json）"
+    )
+    parser.add_argument("--baseline", type=Path, default=None, help="之前的 JSON 结果，用于回归比较")
+    parser.add_argument("--max-slowdown", type=float, default=1.5, help="相对基线允许的最大耗时倍数")
+    args = parser.parse_args()
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    for scale in scales:
+        parse_scale(scale)
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="fct_bench_"))
+    try:
+        report = run_suite(scales, work_dir, args.seed, args.loader, args.chunksize)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or project_root / "artifacts" / "benchmarks" / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"结果已写入: {output}")
+
+    failed = [
+        f"{scale['scale']}/{name}: 注入 {check['injected']}，检出 {check['detected']}"
+        for scale in report["scales"]
+        for name, check in scale["checks"].items()
+        if not check["ok"]
+    ]
+    for line in failed:
+        print(f"[WARN] 检出数与注入数不一致 {line}")
+
+    regressions = []
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_with_baseline(report, baseline, args.max_slowdown)
+        for scale, step, before, after in regressions:
+            print(f"[WARN] {scale}/{step} 变慢: {before:.2f}s -> {after:.2f}s (x{after / before:.2f})")
+
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
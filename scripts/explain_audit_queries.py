@@ -0,0 +1,104 @@
+"""
+审计查询执行计划报告
+对每条审计查询执行 EXPLAIN QUERY PLAN，检查是否存在全表扫描
+
+用法:
+    python scripts/explain_audit_queries.py [--data-dir data] [--json artifacts/query_plans.json]
+    python scripts/explain_audit_queries.py --start-date 2017-01-01 --end-date 2017-12-31
+
+存在全表扫描时以退出码 1 结束，可直接用于 CI 检查。
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from fraud_rule_metrics import RULE_QUERIES, build_context_query, build_rule_query
+from src.audit.financial_control_tower import AUDIT_QUERIES, PERIOD_AUDIT_QUERIES, AuditPeriod, build_audit_query
+from src.data_engineering.indexes import explain_report
+
+# 欺诈规则评估窗口的默认示例（仅用于生成带日期参数的执行计划）
+DEFAULT_START_DATE = "2017-01-01"
+DEFAULT_END_DATE = "2017-12-31"
+
+
+def collect_audit_queries(start_date: str, end_date: str) -> Dict[str, Tuple[str, str, tuple]]:
+    """汇总所有审计查询：查询名 -> (数据库, SQL, 参数)"""
+    queries = {name: (database, sql, ()) for name, (database, sql) in AUDIT_QUERIES.items()}
+    # 月结查询：以评估窗口起始日期所在月份为示例期间
+    period = AuditPeriod(int(start_date[:4]), int(start_date[5:7]))
+    for name, (database, _sql, _alias) in PERIOD_AUDIT_QUERIES.items():
+        queries[f"{name}_period"] = (database, *build_audit_query(name, period))
+    for rule_type in RULE_QUERIES:
+        key = rule_type.value
+        queries[f"rule_{key}"] = ("operations", *build_rule_query(rule_type))
+        queries[f"rule_{key}_window"] = ("operations", *build_rule_query(rule_type, start_date, end_date))
+    queries["rule_context"] = ("operations", *build_context_query())
+    queries["rule_context_window"] = ("operations", *build_context_query(start_date, end_date))
+    return queries
+
+
+def explain_audit_queries(
+    data_dir: Path, start_date: str = DEFAULT_START_DATE, end_date: str = DEFAULT_END_DATE
+) -> Dict[str, Dict]:
+    """
+    对所有审计查询生成执行计划
+
+    Returns:
+        查询名 -> {"database": ..., "plan": [...], "full_scans": [...]}
+    """
+    conn_ops = sqlite3.connect(data_dir / "db_operations.db")
+    conn_ops.execute("ATTACH DATABASE ? AS fin", (str(data_dir / "db_finance.db"),))
+    conn_fin = sqlite3.connect(data_dir / "db_finance.db")
+
+    report = {}
+    try:
+        for name, (database, sql, params) in collect_audit_queries(start_date, end_date).items():
+            conn = conn_fin if database == "finance" else conn_ops
+            entry = explain_report(conn, {name: (sql, params)})[name]
+            report[name] = {"database": database, **entry}
+    finally:
+        conn_ops.close()
+        conn_fin.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="审计查询执行计划报告")
+    parser.add_argument("--data-dir", type=Path, default=project_root / "data", help="ERP 数据库所在目录")
+    parser.add_argument("--start-date", default=DEFAULT_START_DATE, help="欺诈规则评估窗口起始日期")
+    parser.add_argument("--end-date", default=DEFAULT_END_DATE, help="欺诈规则评估窗口结束日期")
+    parser.add_argument("--json", type=Path, help="将报告写入 JSON 文件")
+    args = parser.parse_args()
+
+    report = explain_audit_queries(args.data_dir, args.start_date, args.end_date)
+
+    offenders = []
+    for name, entry in report.items():
+        mark = "❌" if entry["full_scans"] else "✓"
+        print(f"\n{mark} {name} [{entry['database']}]")
+        for detail in entry["plan"]:
+            print(f"    {detail}")
+        if entry["full_scans"]:
+            offenders.append(name)
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n✓ 报告已写入: {args.json}")
+
+    print(f"\n共 {len(report)} 条查询，{len(offenders)} 条存在全表扫描")
+    if offenders:
+        print(f"❌ 全表扫描: {', '.join(offenders)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+合成 DataCo 数据生成
+离线生成 DataCo 格式的订单明细 CSV 及注入异常清单（<csv>.manifest.json），
+默认写入 artifacts/synthetic/raw/，可用 ERPDatabaseInitializer(data_dir=Path("artifacts/synthetic")) 加载
+
+用法:
+    python scripts/generate_synthetic_data.py --orders 1m
+    python scripts/generate_synthetic_data.py --orders 10k --seed 42 --rate negative_margin=0.05
+    python scripts/generate_synthetic_data.py --orders 1m --erp-export artifacts/erp_export.csv
+
+加载后执行 --apply-finance <db_finance.db> 把清单中的业财差异（应收缺失、金额不符）写入财务库。
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.data_engineering.synthetic_data import (
+    DEFAULT_ANOMALY_RATES,
+    GENERATE_CHUNK_ORDERS,
+    SCALES,
+    SyntheticManifest,
+    apply_finance_anomalies,
+    manifest_path,
+    parse_scale,
+    write_dataco_csv,
+    write_erp_export_csv,
+)
+
+
+def parse_rate(text: str):
+    """'名称=比例' -> (名称, 比例)"""
+    name, _, value = text.partition("=")
+    if name not in DEFAULT_ANOMALY_RATES or not value:
+        raise argparse.ArgumentTypeError(f"格式为 名称=比例，名称可选: {', '.join(DEFAULT_ANOMALY_RATES)}")
+    return name, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成 DataCo 数据生成")
+    parser.add_argument("--orders", default="10k", help=f"订单数（{', '.join(SCALES)} 或整数）")
+    parser.add_argument("--output", type=Path, default=project_root / "artifacts" / "synthetic" / "raw" / "DataCo.csv")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--rate", type=parse_rate, action="append", default=[], help="异常比例，如 timing_fraud=0.01")
+    parser.add_argument("--chunk-orders", type=int, default=GENERATE_CHUNK_ORDERS, help="每块生成的订单数")
+    parser.add_argument("--erp-export", type=Path, default=None, help="同时生成 run_real 使用的 ERP 导出 CSV")
+    parser.add_argument(
+        "--apply-finance", type=Path, default=None, help="把 --output 清单中的业财差异写入该财务库后退出"
+    )
+    args = parser.parse_args()
+
+    if args.apply_finance:
+        manifest = SyntheticManifest.load(manifest_path(args.output))
+        print(f"已写入业财差异: {apply_finance_anomalies(args.apply_finance, manifest)}")
+        return
+
+    orders = parse_scale(args.orders)
+    start = time.perf_counter()
+    manifest = write_dataco_csv(args.output, orders, args.seed, dict(args.rate), args.chunk_orders)
+    print(f"生成 {manifest.orders:,} 个订单、{manifest.rows:,} 行: {args.output} ({time.perf_counter() - start:.1f}s)")
+    for name, count in manifest.counts().items():
+        print(f"  {name:<18} {count:>10,}")
+    print(f"清单: {manifest_path(args.output)}")
+
+    if args.erp_export:
+        counts = write_erp_export_csv(args.erp_export, orders, args.seed)
+        print(f"ERP 导出: {args.erp_export} {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 """
 数据预处理脚本
 对下载的原始数据进行清洗和预处理
+
+产出的 Parquet 已去重、日期列已解析为 datetime 并按订单日期排序，
+可由 ERPDatabaseInitializer(source_format="parquet") 直接加载（见 src/data_engineering/processed_data.py）。
 """
 
 import sys
@@ -12,21 +15,43 @@ import pandas as pd
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.data_engineering.init_erp_databases import COLUMN_ALIASES, parse_dates
+from src.data_engineering.processed_data import PARQUET_ROW_GROUP_SIZE, RowDigestSet
+
+# 分块读取原始 CSV 的行数
+READ_CHUNK_SIZE = 100_000
+
+# 解析为 datetime 的列（首个为排序 / 行组统计所用的订单日期）
+DATE_COLUMNS = [*COLUMN_ALIASES["order_date"], "shipping date (DateOrders)"]
+
 
-def load_raw_data():
-    """加载原始数据"""
+def load_raw_data(chunksize: int = READ_CHUNK_SIZE):
+    """
+    分块加载原始数据，边读边去除完全重复的行（RowDigestSet 只保存每行 8 字节的摘要），
+    去重后再解析日期列
+    """
     data_dir = project_root / "data" / "raw"
     csv_files = list(data_dir.glob("*.csv"))
 
     if not csv_files:
         raise FileNotFoundError("未找到数据文件，请先运行 scripts/download_data.py")
 
-    print(f"正在加载数据: {csv_files[0]}")
-    df = pd.read_csv(csv_files[0], low_memory=False)
-    print(f"原始数据形状: {df.shape}")
+    print(f"正在加载数据: {csv_files[0]} (每块 {chunksize:,} 行)")
+    seen = RowDigestSet()
+    chunks = []
+    total_rows = 0
+    for chunk in pd.read_csv(csv_files[0], chunksize=chunksize, low_memory=False):
+        total_rows += len(chunk)
+        chunks.append(chunk[seen.add(chunk)])
+
+    df = pd.concat(chunks, ignore_index=True)
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_dates(df[col])
+    print(f"原始数据形状: ({total_rows}, {len(df.columns)})")
     print(f"列数: {len(df.columns)}")
 
-    return df, csv_files[0].name
+    return df, csv_files[0].name, total_rows - len(df)
 
 
 def explore_data(df):
@@ -54,24 +79,29 @@ def explore_data(df):
     return df
 
 
-def clean_data(df):
-    """清洗数据"""
+def clean_data(df, duplicates: int = 0):
+    """
+    清洗数据
+
+    完全重复的行已在分块加载时去除（load_raw_data），这里按订单日期排序，
+    使 Parquet 每个行组覆盖一段连续日期。
+    """
     print("\n" + "=" * 60)
     print("数据清洗")
     print("=" * 60)
 
-    original_shape = df.shape
-    print(f"清洗前数据形状: {original_shape}")
-
-    # 删除完全重复的行
-    df = df.drop_duplicates()
+    print(f"清洗前数据形状: ({len(df) + duplicates}, {df.shape[1]})")
     print(f"删除重复行后: {df.shape}")
 
     # 处理缺失值（根据实际情况调整）
     # 这里先保留所有数据，后续根据分析需求处理
 
+    order_date = next((col for col in DATE_COLUMNS if col in df.columns), None)
+    if order_date:
+        df = df.sort_values(order_date, kind="stable", na_position="last", ignore_index=True)
+
     print(f"清洗后数据形状: {df.shape}")
-    print(f"删除了 {original_shape[0] - df.shape[0]} 行")
+    print(f"删除了 {duplicates} 行")
 
     return df
 
@@ -88,7 +118,7 @@ def save_processed_data(df, original_filename):
 
     # 保存为 Parquet（更高效）
     parquet_file = output_dir / f"processed_{original_filename.replace('.csv', '.parquet')}"
-    df.to_parquet(parquet_file, index=False, engine="pyarrow")
+    df.to_parquet(parquet_file, index=False, engine="pyarrow", row_group_size=PARQUET_ROW_GROUP_SIZE)
     print(f"✓ 已保存为 Parquet 格式: {parquet_file}")
 
     return output_file, parquet_file
@@ -102,13 +132,13 @@ def main():
 
     try:
         # 加载数据
-        df, filename = load_raw_data()
+        df, filename, duplicates = load_raw_data()
 
         # 探索数据
         df = explore_data(df)
 
         # 清洗数据
-        df = clean_data(df)
+        df = clean_data(df, duplicates)
 
         # 保存处理后的数据
         save_processed_data(df, filename)
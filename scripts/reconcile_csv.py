@@ -0,0 +1,69 @@
+"""
+CSV 对 CSV 按键对账
+两个导出文件按业务键哈希连接，金额按容差比较，输出汇总与差异明细 JSON
+
+用法:
+    python scripts/reconcile_csv.py data/sample/operations_sample.csv data/sample/finance_sample.csv \\
+        --left-amount sales --right-amount amount [--key order_id] [--json artifacts/csv_reconciliation.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.audit.keyed_reconciliation import AMOUNT_TOLERANCE, reconcile_csv
+
+# 报告中列出的差异条数
+DETAIL_LIMIT = 100
+
+
+def build_report(result, left_csv: str, right_csv: str, key: str, seconds: float) -> dict:
+    """汇总 + 前 DETAIL_LIMIT 条金额不符 / 单边缺失明细"""
+    mismatches = result.pairs[~result.pairs["matched"]].drop(columns="matched")
+    return {
+        "left_file": left_csv,
+        "right_file": right_csv,
+        "key": key,
+        "seconds": round(seconds, 4),
+        "summary": result.summary(),
+        "mismatches": json.loads(mismatches.head(DETAIL_LIMIT).to_json(orient="records")),
+        "left_only": result.left_only[key].head(DETAIL_LIMIT).tolist(),
+        "right_only": result.right_only[key].head(DETAIL_LIMIT).tolist(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV 对 CSV 按键对账")
+    parser.add_argument("left_csv", help="基准文件（如业务侧订单）")
+    parser.add_argument("right_csv", help="待核对文件（如财务侧入账）")
+    parser.add_argument("--key", default="order_id", help="连接键列名（两个文件相同）")
+    parser.add_argument("--left-amount", required=True, help="基准文件的金额列")
+    parser.add_argument("--right-amount", required=True, help="待核对文件的金额列")
+    parser.add_argument("--tolerance", type=float, default=AMOUNT_TOLERANCE, help="金额容差")
+    parser.add_argument("--json", help="报告输出路径")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = reconcile_csv(args.left_csv, args.right_csv, args.key, args.left_amount, args.right_amount, args.tolerance)
+    report = build_report(result, args.left_csv, args.right_csv, args.key, time.perf_counter() - start)
+
+    summary = report["summary"]
+    print(
+        f"✓ {summary['matched']:,} matched, {summary['mismatched']:,} mismatched, "
+        f"{summary['left_only']:,} left only, {summary['right_only']:,} right only ({report['seconds']:.2f}s)"
+    )
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✓ Report saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
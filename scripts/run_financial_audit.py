@@ -1,6 +1,11 @@
 """
 财务审计快速入口脚本
-快速运行完整的财务控制塔审计流程
+按会计期间运行财务控制塔的月结流程（对账、合规审计、经营报表都只读取该月的订单）
+
+用法:
+    python scripts/run_financial_audit.py --year 2017 --month 6
+    python scripts/run_financial_audit.py            # 最近一个有订单的期间
+    python scripts/run_financial_audit.py --profile --cprofile   # 另写出按阶段的剖析 JSON 到 artifacts/
 """
 
 import sys
@@ -10,7 +15,8 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.audit.financial_control_tower import FinancialControlTower
+from src.audit.financial_control_tower import RECON_ENGINES, FinancialControlTower
+from src.data_engineering.profiling import add_profile_arguments, profile_options_from_args
 
 
 def main():
@@ -20,11 +26,14 @@ def main():
     parser = argparse.ArgumentParser(description="运行财务控制塔审计流程")
     parser.add_argument("--month", type=int, help="月份 (1-12)")
     parser.add_argument("--year", type=int, help="年份 (如 2023)")
+    parser.add_argument("--recon-engine", choices=RECON_ENGINES, default="sql", help="业财对账引擎")
+    parser.add_argument("--parallel", action="store_true", help="审计阶段并行执行")
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
 
-    tower = FinancialControlTower()
-    tower.run_monthly_close(month=args.month, year=args.year)
+    tower = FinancialControlTower(profile=profile_options_from_args(args))
+    tower.run_monthly_close(month=args.month, year=args.year, recon_engine=args.recon_engine, parallel=args.parallel)
 
 
 if __name__ == "__main__":
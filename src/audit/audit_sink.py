@@ -0,0 +1,404 @@
+"""
+审计日志缓冲写入器
+在一次审计运行内累积所有规则的发现，结束时以单个 WAL 事务写入 audit_logs
+
+审计发现以 (entity_type, entity_id, action) 为键幂等写入：
+- 每行记录 first_seen_run / last_seen_run（首次 / 最近一次发现它的审计运行）。仍在规则当前发现集合中的行
+  last_seen_run 为 NULL，表示「一直出现到该规则的 last_run」；视图 audit_findings 的 seen_through_run 列给出有效值；
+- audit_rule_state 为每条规则保存本次发现集合的摘要。集合与上次相同时整条规则不写任何发现行，
+  只把该规则的 last_run 推进到本次运行；
+- 集合变化时与库中的当前集合逐行比对，只写入新增、风险级别 / 说明变化、重新出现的发现，
+  并把不再出现的发现的 last_seen_run 落为上次运行；其余行保持不变。
+因此数据未变化时重复审计几乎不写库，数据小幅变化时写入量与变化量成正比，audit_logs 及其索引也不再随运行次数增长。
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data_engineering.connection_pool import get_connection_pool
+
+# 写入当前集合中的发现（last_seen_run 为 NULL）；已存在且内容相同、仍在当前集合中的行不改写
+AUDIT_LOG_UPSERT_SQL = """
+    INSERT INTO audit_logs (
+        audit_type, source_system, entity_type, entity_id, action, notes, risk_level, status,
+        first_seen_run, last_seen_run
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)
+    ON CONFLICT (entity_type, entity_id, action) DO UPDATE SET
+        source_system = excluded.source_system,
+        notes = excluded.notes,
+        risk_level = excluded.risk_level,
+        last_seen_run = NULL
+    WHERE audit_logs.last_seen_run IS NOT NULL
+       OR audit_logs.notes IS NOT excluded.notes
+       OR audit_logs.risk_level IS NOT excluded.risk_level
+"""
+
+# 不再出现的发现：有效最近运行（规则的 last_run）落到行上
+AUDIT_LOG_CLOSE_SQL = """
+    UPDATE audit_logs SET last_seen_run = COALESCE(?, first_seen_run)
+    WHERE action = ? AND entity_type = ? AND entity_id = ? AND last_seen_run IS NULL
+"""
+
+# audit.db 结构版本（PRAGMA user_version）：1 起当前集合的行以 last_seen_run IS NULL 标记
+AUDIT_SCHEMA_VERSION = 1
+
+# 旧版 audit.db 缺少的列
+FINDING_RUN_COLUMNS = ("first_seen_run", "last_seen_run")
+
+# 旧库按键去重时，被合并掉的历史行原样移入该表（审计轨迹不丢失）
+AUDIT_LOG_ARCHIVE_TABLE = "audit_logs_archive"
+
+# 旧库中同一键除最新一条（log_id 最大）以外的历史行
+DUPLICATE_FINDINGS_PREDICATE = (
+    "log_id NOT IN (SELECT MAX(log_id) FROM audit_logs GROUP BY entity_type, entity_id, action)"
+)
+
+# 发现的唯一键；action 在前，按规则统计 / 校验时可走索引前缀
+AUDIT_FINDING_INDEX_DDL = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_logs_finding ON audit_logs(action, entity_type, entity_id)"
+)
+
+AUDIT_RULE_STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS audit_rule_state (
+        entity_type TEXT NOT NULL,
+        action TEXT NOT NULL,
+        findings INTEGER,
+        findings_digest TEXT,
+        set_run TEXT,
+        last_run TEXT,
+        PRIMARY KEY (entity_type, action)
+    )
+"""
+
+AUDIT_RUNS_DDL = """
+    CREATE TABLE IF NOT EXISTS audit_runs (
+        run_id TEXT PRIMARY KEY,
+        source_system TEXT,
+        run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        findings INTEGER,
+        rows_written INTEGER,
+        rules_unchanged INTEGER
+    )
+"""
+
+AUDIT_FINDINGS_VIEW_DDL = """
+    CREATE VIEW IF NOT EXISTS audit_findings AS
+    SELECT
+        l.*,
+        COALESCE(l.last_seen_run, s.last_run) AS seen_through_run
+    FROM audit_logs l
+    LEFT JOIN audit_rule_state s ON s.entity_type = l.entity_type AND s.action = l.action
+"""
+
+RULE_STATE_QUERY = (
+    "SELECT findings, findings_digest, last_run FROM audit_rule_state WHERE entity_type = ? AND action = ?"
+)
+
+RULE_SET_COUNT_QUERY = "SELECT COUNT(*) FROM audit_logs WHERE action = ? AND entity_type = ? AND last_seen_run IS NULL"
+
+RULE_SET_QUERY = """
+    SELECT entity_id, notes, risk_level FROM audit_logs
+    WHERE action = ? AND entity_type = ? AND last_seen_run IS NULL
+"""
+
+RULE_STATE_UPSERT_SQL = """
+    INSERT INTO audit_rule_state (entity_type, action, findings, findings_digest, set_run, last_run)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (entity_type, action) DO UPDATE SET
+        findings = excluded.findings,
+        findings_digest = excluded.findings_digest,
+        set_run = excluded.set_run,
+        last_run = excluded.last_run
+"""
+
+# 版本 0 的库以 last_seen_run = set_run 标记当前集合，迁移为 NULL
+RULE_SET_MARKER_MIGRATE_SQL = """
+    UPDATE audit_logs SET last_seen_run = NULL
+    WHERE last_seen_run = (
+        SELECT s.set_run FROM audit_rule_state s
+        WHERE s.entity_type = audit_logs.entity_type AND s.action = audit_logs.action
+    )
+"""
+
+RULE_STATE_ADVANCE_SQL = "UPDATE audit_rule_state SET last_run = ? WHERE entity_type = ? AND action = ?"
+
+AUDIT_RUN_INSERT_SQL = """
+    INSERT INTO audit_runs (run_id, source_system, findings, rows_written, rules_unchanged) VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def new_run_id() -> str:
+    """审计运行 ID：时间戳（可排序）+ 随机后缀（同一秒内的多次运行互不冲突）"""
+    return f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+
+
+def ensure_audit_schema(conn) -> int:
+    """
+    补齐幂等写入所需的结构（可重复调用）：运行 ID 列、唯一键、规则状态表、运行记录表、audit_findings 视图
+
+    旧库中同一键的重复行只保留最新一条，之后才能建立唯一索引；其余历史行原样移入 audit_logs_archive。
+
+    Returns:
+        移入归档表的历史行数
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(audit_logs)")]
+    archived = 0
+    with conn:
+        for column in FINDING_RUN_COLUMNS:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE audit_logs ADD COLUMN {column} TEXT")
+                columns.append(column)
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(audit_logs)")}
+        if "idx_audit_logs_finding" not in indexes:
+            archived = _archive_duplicate_findings(conn, columns)
+            conn.execute(AUDIT_FINDING_INDEX_DDL)
+        conn.execute(AUDIT_RULE_STATE_DDL)
+        conn.execute(AUDIT_RUNS_DDL)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < AUDIT_SCHEMA_VERSION:
+            conn.execute(RULE_SET_MARKER_MIGRATE_SQL)
+            conn.execute("DROP VIEW IF EXISTS audit_findings")
+            conn.execute(f"PRAGMA user_version = {AUDIT_SCHEMA_VERSION}")
+        conn.execute(AUDIT_FINDINGS_VIEW_DDL)
+    if archived:
+        print(f"⚠️  audit_logs 按发现键合并: {archived:,} 条重复的历史记录已移入 {AUDIT_LOG_ARCHIVE_TABLE}")
+    return archived
+
+
+def _archive_duplicate_findings(conn, columns: List[str]) -> int:
+    """把同一键的较早记录移入归档表（表结构与 audit_logs 相同，另记归档时间），返回移动的行数"""
+    column_list = ", ".join(columns)
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {AUDIT_LOG_ARCHIVE_TABLE} AS "
+        f"SELECT {column_list}, CURRENT_TIMESTAMP AS archived_at FROM audit_logs WHERE 0"
+    )
+    conn.execute(
+        f"INSERT INTO {AUDIT_LOG_ARCHIVE_TABLE} ({column_list}, archived_at) "
+        f"SELECT {column_list}, CURRENT_TIMESTAMP FROM audit_logs WHERE {DUPLICATE_FINDINGS_PREDICATE}"
+    )  # nosec B608 - 列名来自 PRAGMA table_info
+    return conn.execute(f"DELETE FROM audit_logs WHERE {DUPLICATE_FINDINGS_PREDICATE}").rowcount  # nosec B608
+
+
+@dataclass
+class AuditFlushMetrics:
+    """单次刷写的统计"""
+
+    rows: int  # 本次提交的发现数
+    batches: int  # 本次刷写合并的规则批次数
+    seconds: float
+    run_id: str = None
+    written: int = 0  # 实际插入或改写的行数（含不再出现、被关闭的发现）
+    rules_unchanged: int = 0  # 发现集合与上次相同、未写任何行的规则数
+
+    def to_dict(self) -> Dict:
+        return {
+            "run_id": self.run_id,
+            "rows": self.rows,
+            "written": self.written,
+            "rules_unchanged": self.rules_unchanged,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 4),
+        }
+
+
+class AuditLogSink:
+    """
+    审计日志缓冲区
+
+    - add() 按列保存一批发现：entity_id 为数组，其余字段可以是标量（整批相同）或与 entity_id 等长的数组；
+    - buffering() 上下文内只累积不写库，退出时统一 flush()；上下文之外 add() 后立即写入；
+    - flush() 是一次审计运行：使用连接池中的 WAL 模式写连接，在同一事务内按规则幂等写入（见模块说明）；
+    - 线程安全：并行审计的多个阶段可同时 add()，写库始终只有 flush() 这一个写者。
+    """
+
+    def __init__(self, db_path: Path, source_system: str = "Financial_Control_Tower"):
+        self.db_path = db_path
+        self.source_system = source_system
+        self.flushes: List[AuditFlushMetrics] = []
+
+        self._batches = []
+        self._lock = threading.Lock()
+        self._buffering = 0
+        self._schema_ready = False
+
+    @contextmanager
+    def buffering(self):
+        """在上下文内累积发现，退出时一次性写入（异常退出时同样写入已累积的发现）"""
+        with self._lock:
+            self._buffering += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._buffering -= 1
+                outermost = self._buffering == 0
+            if outermost:
+                self.flush()
+
+    def add(self, entity_ids, action: str, risk_level, notes, entity_type: str = "Order") -> int:
+        """
+        加入一批审计发现
+
+        Returns:
+            本批行数
+        """
+        ids = pd.Series(entity_ids).astype(str).to_numpy()
+        batch = {
+            "entity_id": ids,
+            "entity_type": entity_type,
+            "action": action,
+            "risk_level": risk_level,
+            "notes": notes,
+        }
+        with self._lock:
+            self._batches.append(batch)
+            autoflush = self._buffering == 0
+        if autoflush:
+            self.flush()
+        return len(ids)
+
+    def flush(self, run_id: str = None) -> AuditFlushMetrics:
+        """把缓冲区作为一次审计运行写入 audit_logs（单事务），返回本次刷写统计"""
+        with self._lock:
+            batches, self._batches = self._batches, []
+
+        start = time.perf_counter()
+        rows = sum(len(batch["entity_id"]) for batch in batches)
+        metrics = AuditFlushMetrics(rows=rows, batches=len(batches), seconds=0.0, run_id=run_id or new_run_id())
+        if rows:
+            # 池化写连接已是 WAL 模式
+            conn = get_connection_pool().connection(self.db_path)
+            if not self._schema_ready:
+                ensure_audit_schema(conn)
+                self._schema_ready = True
+            with conn:
+                for (entity_type, action), findings in self._findings_by_rule(batches):
+                    written = self._write_rule(conn, metrics.run_id, entity_type, action, findings)
+                    if written is None:
+                        metrics.rules_unchanged += 1
+                    else:
+                        metrics.written += written
+                conn.execute(
+                    AUDIT_RUN_INSERT_SQL,
+                    (metrics.run_id, self.source_system, rows, metrics.written, metrics.rules_unchanged),
+                )
+
+        metrics.seconds = time.perf_counter() - start
+        if rows:
+            self.flushes.append(metrics)
+        return metrics
+
+    def metrics(self) -> Dict:
+        """累计刷写统计"""
+        return {
+            "flushes": len(self.flushes),
+            "rows": sum(m.rows for m in self.flushes),
+            "written": sum(m.written for m in self.flushes),
+            "seconds": round(sum(m.seconds for m in self.flushes), 4),
+            "last_flush": self.flushes[-1].to_dict() if self.flushes else None,
+        }
+
+    def _write_rule(self, conn, run_id: str, entity_type: str, action: str, findings: pd.DataFrame) -> Optional[int]:
+        """
+        写入一条规则本次的全部发现
+
+        发现集合与上次相同（且库中仍是那一组行）时只推进 last_run；否则与库中的当前集合比对，
+        只写入新增 / 内容变化 / 重新出现的发现，并关闭不再出现的发现。
+
+        Returns:
+            插入、改写或关闭的发现行数；集合未变化、未写任何发现行时为 None
+        """
+        digest = self._digest(findings)
+        state = conn.execute(RULE_STATE_QUERY, (entity_type, action)).fetchone()
+        last_run = None
+        if state is not None:
+            findings_count, previous_digest, last_run = state
+            # audit_logs 被外部修改（如手工删除）时摘要不再可信，退回逐行比对
+            if (
+                previous_digest == digest
+                and conn.execute(RULE_SET_COUNT_QUERY, (action, entity_type)).fetchone()[0] == findings_count
+            ):
+                conn.execute(RULE_STATE_ADVANCE_SQL, (run_id, entity_type, action))
+                return None
+
+        current = pd.DataFrame(
+            conn.execute(RULE_SET_QUERY, (action, entity_type)).fetchall(),
+            columns=["entity_id", "notes", "risk_level"],
+        )
+        merged = findings.merge(current, on="entity_id", how="outer", suffixes=("", "_db"), indicator=True)
+        present = merged["_merge"] != "right_only"
+        changed = (
+            (merged["_merge"] == "left_only")
+            | self._differs(merged["notes"], merged["notes_db"])
+            | self._differs(merged["risk_level"], merged["risk_level_db"])
+        )
+        upserts = merged[present & changed]
+        closed = merged.loc[~present, "entity_id"].tolist()
+
+        n = len(upserts)
+        cursor = conn.executemany(
+            AUDIT_LOG_UPSERT_SQL,
+            zip(
+                repeat("Automated", n),
+                repeat(self.source_system, n),
+                repeat(entity_type, n),
+                upserts["entity_id"].tolist(),
+                repeat(action, n),
+                upserts["notes"].tolist(),
+                upserts["risk_level"].tolist(),
+                repeat("Pending", n),
+                repeat(run_id, n),
+            ),
+        )
+        # DO UPDATE 的 WHERE 不成立（内容未变）的行不计入 rowcount
+        written = max(cursor.rowcount, 0)
+        if closed:
+            written += conn.executemany(
+                AUDIT_LOG_CLOSE_SQL, ((last_run, action, entity_type, entity_id) for entity_id in closed)
+            ).rowcount
+        conn.execute(RULE_STATE_UPSERT_SQL, (entity_type, action, len(findings), digest, run_id, run_id))
+        return written
+
+    def _findings_by_rule(self, batches):
+        """按 (entity_type, action) 合并各批次；同一运行内重复的实体以最后一次为准"""
+        frames = {}
+        for batch in batches:
+            n = len(batch["entity_id"])
+            frame = pd.DataFrame(
+                {
+                    "entity_id": batch["entity_id"],
+                    "notes": self._column(batch["notes"], n),
+                    "risk_level": self._column(batch["risk_level"], n),
+                }
+            )
+            frames.setdefault((batch["entity_type"], batch["action"]), []).append(frame)
+        for key, parts in frames.items():
+            findings = pd.concat(parts, ignore_index=True).drop_duplicates("entity_id", keep="last")
+            yield key, findings.reset_index(drop=True)
+
+    @staticmethod
+    def _differs(left: pd.Series, right: pd.Series) -> pd.Series:
+        """逐行比较两列；两侧都为空视为相同"""
+        return ~((left == right) | (left.isna() & right.isna()))
+
+    @staticmethod
+    def _digest(findings: pd.DataFrame) -> str:
+        """发现集合的摘要（与行顺序无关）"""
+        hashes = np.sort(pd.util.hash_pandas_object(findings, index=False).to_numpy())
+        return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+    @staticmethod
+    def _column(value, n):
+        if isinstance(value, str) or not hasattr(value, "__len__"):
+            return [value] * n
+        return pd.Series(value).astype(str).tolist()
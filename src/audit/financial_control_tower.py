@@ -3,12 +3,323 @@
 项目核心模块：自动化对账、合规审计、经营分析
 """
 
-import sqlite3
+import contextlib
+import io
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, Tuple
 
 import pandas as pd
 
+from src.audit.audit_sink import AuditLogSink
+from src.audit.severity import SeverityScale
+from src.data_engineering.connection_pool import get_connection_pool
+from src.data_engineering.profiling import ProfileOptions, RunProfiler, record_rows
+from src.data_engineering.snapshot_cache import SnapshotCache
+from src.data_engineering.summary_tables import missing_summary_objects
+
+# 对账引擎：pandas 在内存中 merge；sql 通过 ATTACH DATABASE 在 SQLite 内完成 JOIN，只返回差异行
+RECON_ENGINES = ("pandas", "sql")
+
+# 审计输入快照缓存目录（相对数据目录），见 src/data_engineering/snapshot_cache.py
+SNAPSHOT_CACHE_DIR = ".snapshot_cache"
+
+# 供应链风险按每笔订单的度量值分级（区间左闭右开），与 FraudRuleManager 中对应规则的 severity_levels 一致；
+# 对账风险（RECON_*）没有对应的阈值配置，沿用固定级别：漏记收入 HIGH、金额不符 MEDIUM
+AUDIT_SEVERITY_SCALES = {
+    # 时间倒流：按 发货日期 - 订单日期 的天数
+    "SC_TIMING_FRAUD": SeverityScale(
+        {"CRITICAL": (float("-inf"), 0), "HIGH": (0, 1), "MEDIUM": (1, 7), "LOW": (7, float("inf"))}
+    ),
+    # 负毛利：按利润
+    "SC_NEGATIVE_MARGIN": SeverityScale(
+        {"CRITICAL": (float("-inf"), -1000), "HIGH": (-1000, -500), "MEDIUM": (-500, 0), "LOW": (0, float("inf"))}
+    ),
+}
+
+# 对账时排除的业务侧订单状态
+RECON_EXCLUDED_STATUSES = "('CANCELED', 'SUSPECTED_FRAUD', 'CANCELLED')"
+
+# ---------------------------------------------------------------------------
+# 审计 SQL（模块级常量，便于 scripts/explain_audit_queries.py 统一检查执行计划）
+# 状态过滤条件须与 src/data_engineering/indexes.py 中部分索引的条件文本保持一致
+# ---------------------------------------------------------------------------
+
+# 业财对账 - pandas 引擎
+RECON_OPS_QUERY = f"""
+SELECT
+    order_id,
+    order_status,
+    sales as expected_revenue,
+    customer_name
+FROM sales_orders
+WHERE order_status NOT IN {RECON_EXCLUDED_STATUSES}
+ORDER BY order_date, order_id
+"""  # nosec B608 - constant status list
+
+RECON_FIN_QUERY = """
+SELECT
+    order_id,
+    invoice_amount as booked_revenue
+FROM accounts_receivable
+WHERE payment_status != 'Cancelled'
+"""
+
+# 业财对账 - SQL 引擎（财务库 ATTACH 为 fin）
+RECON_SQL_COUNTS_QUERY = f"""
+SELECT COUNT(*), COUNT(a.order_id)
+FROM sales_orders o
+LEFT JOIN fin.accounts_receivable a
+    ON a.order_id = o.order_id AND a.payment_status != 'Cancelled'
+WHERE o.order_status NOT IN {RECON_EXCLUDED_STATUSES}
+"""  # nosec B608 - constant status list
+
+RECON_SQL_FIN_COUNT_QUERY = "SELECT COUNT(*) FROM fin.accounts_receivable WHERE payment_status != 'Cancelled'"
+
+RECON_SQL_MISSING_QUERY = f"""
+SELECT o.order_id, o.sales AS expected_revenue, o.customer_name
+FROM sales_orders o
+LEFT JOIN fin.accounts_receivable a
+    ON a.order_id = o.order_id AND a.payment_status != 'Cancelled'
+WHERE o.order_status NOT IN {RECON_EXCLUDED_STATUSES}
+  AND a.order_id IS NULL
+ORDER BY o.order_date, o.order_id
+"""  # nosec B608 - constant status list
+
+RECON_SQL_MISMATCH_QUERY = f"""
+SELECT
+    o.order_id,
+    o.sales AS expected_revenue,
+    a.invoice_amount AS booked_revenue,
+    ABS(o.sales - a.invoice_amount) AS diff
+FROM sales_orders o
+JOIN fin.accounts_receivable a ON a.order_id = o.order_id
+WHERE o.order_status NOT IN {RECON_EXCLUDED_STATUSES}
+  AND a.payment_status != 'Cancelled'
+  AND ABS(o.sales - a.invoice_amount) > 0.01
+ORDER BY o.order_date, o.order_id
+"""  # nosec B608 - constant status list
+
+# 供应链合规审计：订单 JOIN 物流
+SUPPLY_CHAIN_QUERY = """
+SELECT
+    t1.order_id,
+    t1.order_date,
+    t2.shipping_date,
+    t1.profit,
+    t1.sales,
+    t1.order_status,
+    t1.customer_name
+FROM sales_orders t1
+JOIN shipping_logs t2 ON t1.order_id = t2.order_id
+WHERE t1.order_status NOT IN ('CANCELED', 'CANCELLED')
+"""
+
+# 经营分析：月度损益（读取预聚合的 sales_monthly_summary，见 src/data_engineering/summary_tables.py）
+PNL_QUERY = """
+SELECT
+    printf('%04d-%02d', order_year, order_month) as Month,
+    SUM(orders) as Order_Count,
+    SUM(revenue) as Revenue,
+    SUM(profit) as Net_Profit
+FROM sales_monthly_summary
+WHERE order_year > 0
+GROUP BY order_year, order_month
+ORDER BY order_year DESC, order_month DESC
+LIMIT 6
+"""
+
+# 经营分析：Top 10 盈利地区（汇总表）
+REGION_QUERY = """
+SELECT
+    customer_country as Region,
+    SUM(orders) as Orders,
+    SUM(revenue) as Revenue,
+    SUM(profit) as Profit
+FROM sales_monthly_summary
+WHERE customer_country != ''
+GROUP BY customer_country
+ORDER BY Profit DESC
+LIMIT 10
+"""
+
+# 汇总表缺失或未同步（旧库、全量加载进行中）时退回按订单明细聚合
+PNL_ORDERS_QUERY = """
+SELECT
+    strftime('%Y-%m', order_date) as Month,
+    COUNT(*) as Order_Count,
+    SUM(sales) as Revenue,
+    SUM(profit) as Net_Profit
+FROM sales_orders
+WHERE order_status NOT IN ('CANCELED', 'CANCELLED')
+    AND order_date IS NOT NULL
+GROUP BY Month
+ORDER BY Month DESC
+LIMIT 6
+"""
+
+REGION_ORDERS_QUERY = """
+SELECT
+    customer_country as Region,
+    COUNT(*) as Orders,
+    SUM(sales) as Revenue,
+    SUM(profit) as Profit
+FROM sales_orders
+WHERE order_status NOT IN ('CANCELED', 'CANCELLED')
+    AND customer_country IS NOT NULL
+    AND customer_country != ''
+GROUP BY Region
+ORDER BY Profit DESC
+LIMIT 10
+"""
+
+# 查询名 -> (涉及的数据库, SQL)；"operations+finance" 表示需要 ATTACH 财务库为 fin
+AUDIT_QUERIES = {
+    "recon_ops": ("operations", RECON_OPS_QUERY),
+    "recon_fin": ("finance", RECON_FIN_QUERY),
+    "recon_sql_counts": ("operations+finance", RECON_SQL_COUNTS_QUERY),
+    "recon_sql_fin_count": ("operations+finance", RECON_SQL_FIN_COUNT_QUERY),
+    "recon_sql_missing": ("operations+finance", RECON_SQL_MISSING_QUERY),
+    "recon_sql_mismatch": ("operations+finance", RECON_SQL_MISMATCH_QUERY),
+    "supply_chain": ("operations", SUPPLY_CHAIN_QUERY),
+    "pnl_monthly": ("operations", PNL_QUERY),
+    "top_regions": ("operations", REGION_QUERY),
+    "pnl_monthly_orders": ("operations", PNL_ORDERS_QUERY),
+    "top_regions_orders": ("operations", REGION_ORDERS_QUERY),
+}
+
+
+# ---------------------------------------------------------------------------
+# 月结（按会计期间）：在上述查询的 WHERE 中追加 order_year = ? AND order_month = ?，
+# 由 idx_sales_orders_period 定位到该月的订单，每个阶段只读取一个月的数据
+# ---------------------------------------------------------------------------
+
+# 期间模式下的财务侧：应收账款没有期间列，按所属订单的期间归属（财务库 ATTACH 为 fin）
+RECON_FIN_PERIOD_QUERY = """
+SELECT
+    a.order_id,
+    a.invoice_amount as booked_revenue
+FROM fin.accounts_receivable a
+JOIN sales_orders o ON o.order_id = a.order_id
+WHERE a.payment_status != 'Cancelled'
+"""
+
+RECON_SQL_FIN_PERIOD_COUNT_QUERY = """
+SELECT COUNT(*)
+FROM fin.accounts_receivable a
+JOIN sales_orders o ON o.order_id = a.order_id
+WHERE a.payment_status != 'Cancelled'
+"""
+
+# 查询名 -> (涉及的数据库, 基础 SQL, 期间列所在表的别名前缀)
+PERIOD_AUDIT_QUERIES = {
+    "recon_ops": ("operations", RECON_OPS_QUERY, ""),
+    "recon_fin": ("operations+finance", RECON_FIN_PERIOD_QUERY, "o."),
+    "recon_sql_counts": ("operations+finance", RECON_SQL_COUNTS_QUERY, "o."),
+    "recon_sql_fin_count": ("operations+finance", RECON_SQL_FIN_PERIOD_COUNT_QUERY, "o."),
+    "recon_sql_missing": ("operations+finance", RECON_SQL_MISSING_QUERY, "o."),
+    "recon_sql_mismatch": ("operations+finance", RECON_SQL_MISMATCH_QUERY, "o."),
+    "supply_chain": ("operations", SUPPLY_CHAIN_QUERY, "t1."),
+    "pnl_monthly": ("operations", PNL_QUERY, ""),
+    "top_regions": ("operations", REGION_QUERY, ""),
+    "pnl_monthly_orders": ("operations", PNL_ORDERS_QUERY, ""),
+    "top_regions_orders": ("operations", REGION_ORDERS_QUERY, ""),
+}
+
+# 期间过滤插入在第一个 GROUP BY / ORDER BY 之前（没有时追加到末尾）
+_TRAILING_CLAUSE = re.compile(r"^\s*(GROUP BY|ORDER BY)\b", re.MULTILINE)
+
+# 最近一个有订单的期间；{filters} 为可选的年 / 月等值条件
+LATEST_PERIOD_QUERY = """
+SELECT order_year, order_month
+FROM sales_orders
+WHERE order_year IS NOT NULL AND order_month IS NOT NULL{filters}
+ORDER BY order_year DESC, order_month DESC
+LIMIT 1
+"""
+
+
+@dataclass(frozen=True)
+class AuditPeriod:
+    """会计期间（自然月）"""
+
+    year: int
+    month: int
+
+    def __post_init__(self):
+        if not 1 <= self.month <= 12:
+            raise ValueError(f"月份须在 1-12 之间: {self.month}")
+
+    @property
+    def label(self) -> str:
+        return f"{self.year:04d}-{self.month:02d}"
+
+    @property
+    def params(self) -> Tuple[int, int]:
+        return (self.year, self.month)
+
+
+def scope_to_period(query: str, alias: str = "") -> str:
+    """在查询的 WHERE 子句末尾追加期间谓词（两个参数：年、月）"""
+    predicate = f"  AND {alias}order_year = ? AND {alias}order_month = ?\n"
+    match = _TRAILING_CLAUSE.search(query)
+    if match is None:
+        return query.rstrip() + "\n" + predicate
+    return query[: match.start()].rstrip() + "\n" + predicate + query[match.start() :].lstrip("\n")
+
+
+def build_audit_query(name: str, period: Optional[AuditPeriod] = None) -> Tuple[str, tuple]:
+    """审计查询的 (SQL, 参数)；给定期间时返回按期间过滤的版本"""
+    if period is None:
+        return AUDIT_QUERIES[name][1], ()
+    _database, query, alias = PERIOD_AUDIT_QUERIES[name]
+    return scope_to_period(query, alias), period.params
+
+
+@dataclass
+class ReconciliationResult:
+    """业财对账结果（两种引擎输出一致）"""
+
+    ops_count: int
+    fin_count: int
+    matched_count: int
+    missing_in_fin: pd.DataFrame  # order_id, expected_revenue, customer_name
+    amount_mismatch: pd.DataFrame  # order_id, expected_revenue, booked_revenue, diff
+
+
+class _StageOutputRouter(io.TextIOBase):
+    """
+    按线程分流的 stdout
+
+    并行审计时替换 sys.stdout：在 capture() 内运行的线程写入各自的缓冲区，
+    其他线程照常写到原始输出，便于阶段结束后按固定顺序回放。
+    """
+
+    def __init__(self, target):
+        self._target = target
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer or self._target).write(text)
+
+    def flush(self):
+        self._target.flush()
+
 
 class FinancialControlTower:
     """
@@ -20,9 +331,17 @@ class FinancialControlTower:
     3. 财务报表生成 (Business Analysis)
     """
 
-    def __init__(self):
+    def __init__(self, data_dir: Path = None, snapshot_cache: bool = False, profile: ProfileOptions = None):
+        """
+        Args:
+            data_dir: 数据库目录（默认 data/）
+            snapshot_cache: 为 True 时审计输入（对账两侧、订单 JOIN 物流）经 SnapshotCache 读取，
+                数据库未变化时直接从本地 Arrow 快照载入已解析的列
+            profile: 剖析选项；run_full_audit 总会按阶段记录（结果在 last_profile），
+                给出时另外写出剖析 JSON，并可开启 cProfile / tracemalloc（见 src/data_engineering/profiling.py）
+        """
         # 定义数据库路径
-        base_dir = Path(__file__).parent.parent.parent / "data"
+        base_dir = data_dir or (Path(__file__).parent.parent.parent / "data")
         self.db_ops = base_dir / "db_operations.db"
         self.db_fin = base_dir / "db_finance.db"
         self.db_audit = base_dir / "audit.db"
@@ -37,27 +356,241 @@ class FinancialControlTower:
         if not self.db_audit.exists():
             raise FileNotFoundError(f"Audit 数据库不存在: {self.db_audit}\n请先运行: python scripts/setup_project.py")
 
-    def _get_conn(self, db_path):
-        """获取数据库连接"""
-        return sqlite3.connect(str(db_path))
+        # 审计发现缓冲区：run_full_audit 期间累积，结束时单事务写入
+        self.audit_sink = AuditLogSink(self.db_audit)
+
+        self.snapshots = SnapshotCache(base_dir / SNAPSHOT_CACHE_DIR) if snapshot_cache else None
+
+        self.profile = profile
+        self.last_profile: Optional[RunProfiler] = None
+
+    def _get_conn(self, db_path, readonly: bool = False):
+        """
+        获取数据库连接（来自共享连接池，close() 只归还不关闭）
+
+        Args:
+            readonly: 为 True 时返回 query_only 连接，供审计阶段读取业务 / 财务库
+        """
+        return get_connection_pool().connection(db_path, readonly=readonly)
+
+    @contextlib.contextmanager
+    def _ops_with_finance(self):
+        """业务库只读连接，财务库 ATTACH 为 fin；退出时分离（池化连接会被复用）"""
+        conn = self._get_conn(self.db_ops, readonly=True)
+        conn.execute("ATTACH DATABASE ? AS fin", (str(self.db_fin),))
+        try:
+            yield conn
+        finally:
+            conn.execute("DETACH DATABASE fin")
+            conn.close()
+
+    def _read_audit_input(
+        self,
+        name: str,
+        db_path: Path,
+        query: str,
+        parse_dates=(),
+        params: tuple = (),
+        period: Optional[AuditPeriod] = None,
+        attach_finance: bool = False,
+    ) -> pd.DataFrame:
+        """
+        读取一份审计输入并解析日期列
+
+        启用快照缓存时以 name（月结时加上期间）为快照名：源库未变化则直接读取快照，否则查询后写入新快照。
+        连接在计算快照键之前取得（首次打开会把数据库切换为 WAL 模式并改写文件头）。
+
+        Args:
+            attach_finance: 为 True 时在 db_path（业务库）的连接上 ATTACH 财务库，两个库都计入快照键
+        """
+        sources = [db_path, self.db_fin] if attach_finance else [db_path]
+        if period is not None:
+            name = f"{name}_{period.label}"
+
+        with contextlib.ExitStack() as stack:
+            if attach_finance:
+                conn = stack.enter_context(self._ops_with_finance())
+            else:
+                conn = self._get_conn(db_path, readonly=True)
+                stack.callback(conn.close)
+
+            def load():
+                df = pd.read_sql(query, conn, params=params)
+                for column in parse_dates:
+                    df[column] = pd.to_datetime(df[column], errors="coerce")
+                return df
+
+            if self.snapshots is None:
+                return load()
+            hits = self.snapshots.hits
+            df = self.snapshots.get_or_load(name, sources, query, load, params=params)
+            if self.snapshots.hits > hits:
+                # 命中快照时没有 SQL 读取，按快照行数计入当前阶段
+                record_rows(read=len(df))
+            return df
+
+    def run_full_audit(
+        self, recon_engine: str = "pandas", parallel: bool = False, period: Optional[AuditPeriod] = None
+    ):
+        """
+        执行完整的审计流程
+
+        Args:
+            recon_engine: 业财对账引擎，'pandas' 或 'sql'（见 RECON_ENGINES）
+            parallel: 为 True 时三个阶段在线程池中并发执行；各阶段的控制台输出先分别缓存，
+                结束后按固定顺序输出
+            period: 给定时只对账、审计、报告该期间的订单（见 run_monthly_close）
+
+        三个阶段的审计发现都累积在 audit_sink 中，全部阶段结束后以一个事务写入 audit.db。
+        每个阶段与最后的写入都按阶段剖析（耗时、CPU、读写行数、SQL 语句耗时、峰值内存），结果在 last_profile。
+        """
+        if recon_engine not in RECON_ENGINES:
+            raise ValueError(f"未知的对账引擎: {recon_engine}. 可选: {list(RECON_ENGINES)}")
 
-    def run_full_audit(self):
-        """执行完整的审计流程"""
         print("\n" + "=" * 70)
         print("🗼 启动财务控制塔 (Financial Control Tower)")
         print(f"📅 审计日期: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        if period is not None:
+            print(f"🗓️  会计期间: {period.label}")
         print("=" * 70)
 
+        profiler = RunProfiler(
+            "full_audit",
+            self.profile,
+            context={
+                "data_dir": str(self.db_ops.parent),
+                "recon_engine": recon_engine,
+                "parallel": parallel,
+                "period": period.label if period is not None else None,
+                "snapshot_cache": self.snapshots is not None,
+            },
+        )
+        self.last_profile = profiler
+
         # 执行三大核心流程
-        self.reconcile_operations_finance()
-        self.audit_supply_chain_risks()
-        self.generate_financial_statements()
+        stages = [
+            profiler.wrap(
+                "reconcile_operations_finance",
+                lambda: self.reconcile_operations_finance(engine=recon_engine, period=period),
+            ),
+            profiler.wrap("audit_supply_chain_risks", lambda: self.audit_supply_chain_risks(period=period)),
+            profiler.wrap("generate_financial_statements", lambda: self.generate_financial_statements(period=period)),
+        ]
+        flushes_before = len(self.audit_sink.flushes)
+        snapshot_counts_before = (self.snapshots.hits, self.snapshots.misses) if self.snapshots is not None else None
+        with profiler.run(), self.audit_sink.buffering():
+            if parallel:
+                self._run_stages_parallel(stages)
+            else:
+                for stage in stages:
+                    stage()
+            with profiler.stage("audit_log_flush"):
+                self.audit_sink.flush()
+
+        for flush in self.audit_sink.flushes[flushes_before:]:
+            print(
+                f"\n💾 [System] {flush.rows:,} 条风险发现单事务写入 Audit DB: 新增/变更 {flush.written:,} 行, "
+                f"{flush.rules_unchanged} 条规则未变化 ({flush.seconds:.2f}s)"
+            )
+        if snapshot_counts_before is not None:
+            hits_before, misses_before = snapshot_counts_before
+            print(
+                f"🗃️  [System] 审计输入快照: 命中 {self.snapshots.hits - hits_before} / "
+                f"重建 {self.snapshots.misses - misses_before}"
+            )
+        profile_path = profiler.write()
+        if profile_path is not None:
+            print(f"\n📈 [System] 运行剖析 ({profiler.wall_s:.2f}s):")
+            for line in profiler.summary_lines():
+                print(f"   {line}")
+            print(f"   已写入: {profile_path}")
 
         print("\n" + "=" * 70)
         print("✅ 所有审计流程执行完毕")
         print("=" * 70)
 
-    def reconcile_operations_finance(self):
+    def latest_period(self, year: int = None, month: int = None) -> Optional[AuditPeriod]:
+        """业务库中最近一个有订单的期间，可限定年份或月份（无订单时为 None）"""
+        conditions = [
+            (column, value) for column, value in (("order_year", year), ("order_month", month)) if value is not None
+        ]
+        query = LATEST_PERIOD_QUERY.format(filters="".join(f" AND {column} = ?" for column, _ in conditions))
+        conn = self._get_conn(self.db_ops, readonly=True)
+        try:
+            row = conn.execute(query, [value for _, value in conditions]).fetchone()
+        finally:
+            conn.close()
+        return AuditPeriod(int(row[0]), int(row[1])) if row else None
+
+    def run_monthly_close(
+        self, month: int = None, year: int = None, recon_engine: str = "sql", parallel: bool = False
+    ) -> AuditPeriod:
+        """
+        月结：只对一个会计期间执行对账、合规审计与经营报表
+
+        每条审计查询都追加 order_year / order_month 等值条件，经 idx_sales_orders_period 只读取该月的订单，
+        耗时与该月订单数相关，与库中加载了多少年的历史无关。财务侧的应收账款按所属订单的期间归属。
+
+        Args:
+            month / year: 期间；未给出的部分取最近一个有订单的期间（只给年份时取该年最后一个有订单的月份，
+                只给月份时取有订单的最近一年）
+            recon_engine: 业财对账引擎，默认 'sql'（财务侧按 order_id 索引查找，只读取该月订单的应收）
+            parallel: 同 run_full_audit
+
+        Returns:
+            实际月结的期间
+        """
+        period = self._resolve_period(month, year)
+        self.run_full_audit(recon_engine=recon_engine, parallel=parallel, period=period)
+        return period
+
+    def _resolve_period(self, month: Optional[int], year: Optional[int]) -> AuditPeriod:
+        if month is not None:
+            AuditPeriod(year or 1, month)  # 先校验月份
+        if month is not None and year is not None:
+            return AuditPeriod(year, month)
+        period = self.latest_period(year=year, month=month)
+        if period is None:
+            raise ValueError(f"业务库中没有可月结的订单 (year={year}, month={month})")
+        return period
+
+    def _run_stages_parallel(self, stages):
+        """
+        并发执行审计阶段
+
+        I/O 在 sqlite3 内、聚合在 pandas / numpy 内都会释放 GIL，因此线程池即可让各阶段重叠，
+        总耗时接近最慢的阶段。输出按 stages 的顺序回放；任一阶段失败时，
+        先输出所有阶段已产生的内容，再抛出第一个异常。
+        阶段线程只存活于本次调用，阶段结束时关闭它在连接池中打开的只读连接（含 ATTACH 对账连接）。
+        """
+        router = _StageOutputRouter(sys.stdout)
+
+        def run_captured(stage):
+            with router.capture() as buffer:
+                try:
+                    stage()
+                except Exception as e:
+                    return buffer.getvalue(), e
+                finally:
+                    get_connection_pool().release_thread()
+                return buffer.getvalue(), None
+
+        start = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="audit-stage")
+        with contextlib.redirect_stdout(router), pool:
+            results = list(pool.map(run_captured, stages))
+        elapsed = time.perf_counter() - start
+
+        errors = []
+        for output, error in results:
+            sys.stdout.write(output)
+            if error is not None:
+                errors.append(error)
+        if errors:
+            raise errors[0]
+        print(f"\n⏱️  {len(stages)} 个审计阶段并行完成，耗时 {elapsed:.2f}s")
+
+    def reconcile_operations_finance(self, engine: str = "pandas", period: Optional[AuditPeriod] = None):
         """
         核心功能 1：业财对账 (SQL Reconciliation Logic)
 
@@ -67,53 +600,27 @@ class FinancialControlTower:
         面试要点：
         - 这是业财一体化的核心，展示你理解"数据对账"的业务逻辑
         - SQL: LEFT JOIN 找差异，WHERE NULL 找缺失
+
+        Args:
+            engine: 'pandas' 在内存中 merge；'sql' 在 SQLite 内 JOIN，只把差异行取回 Python
+            period: 只对账该期间的订单（财务侧为这些订单的应收）
         """
+        if engine not in RECON_ENGINES:
+            raise ValueError(f"未知的对账引擎: {engine}. 可选: {list(RECON_ENGINES)}")
+
         print("\n" + "=" * 70)
         print("🔍 [Process 1] 业财对账 (Reconciliation: Ops vs Finance)")
         print("=" * 70)
 
-        conn_ops = self._get_conn(self.db_ops)
-        conn_fin = self._get_conn(self.db_fin)
+        result = self._reconcile_with_sql(period) if engine == "sql" else self._reconcile_with_pandas(period)
+        missing_in_fin = result.missing_in_fin
+        amount_mismatch = result.amount_mismatch
 
-        # 1. 从业务库提取已发货订单 (Source of Truth for Revenue)
-        # 排除已取消的订单
-        query_ops = """
-        SELECT
-            order_id,
-            order_status,
-            sales as expected_revenue,
-            customer_name
-        FROM sales_orders
-        WHERE order_status NOT IN ('CANCELED', 'SUSPECTED_FRAUD', 'CANCELLED')
-        """
-        df_ops = pd.read_sql(query_ops, conn_ops)
-
-        # 2. 从财务库提取应收账款 (AR)
-        query_fin = """
-        SELECT
-            order_id,
-            invoice_amount as booked_revenue
-        FROM accounts_receivable
-        WHERE payment_status != 'Cancelled'
-        """
-        df_fin = pd.read_sql(query_fin, conn_fin)
-
-        # 3. 对账逻辑 (Python Merge 模拟 SQL Full Outer Join)
-        # 在真实 SQL 中可以是: SELECT ... FROM Ops LEFT JOIN Fin ON ... WHERE Fin.id IS NULL
-        df_recon = pd.merge(df_ops, df_fin, on="order_id", how="left", indicator=True)
-
-        # 4. 发现差异
-        # Case A: 业务发货了，财务没记账 (漏记收入 - 严重风险)
-        missing_in_fin = df_recon[df_recon["_merge"] == "left_only"]
-
-        # Case B: 金额不一致 (处理浮点数精度问题)
-        df_recon["diff"] = (df_recon["expected_revenue"] - df_recon["booked_revenue"]).abs()
-        amount_mismatch = df_recon[(df_recon["_merge"] == "both") & (df_recon["diff"] > 0.01)]
-
-        print("\n📊 对账结果：")
-        print(f"   -> 业务侧订单数: {len(df_ops):,}")
-        print(f"   -> 财务侧入账数: {len(df_fin):,}")
-        print(f"   -> 完全匹配数量: {len(df_recon[df_recon['_merge'] == 'both']):,}")
+        scope = f", 期间: {period.label}" if period is not None else ""
+        print(f"\n📊 对账结果 (引擎: {engine}{scope})：")
+        print(f"   -> 业务侧订单数: {result.ops_count:,}")
+        print(f"   -> 财务侧入账数: {result.fin_count:,}")
+        print(f"   -> 完全匹配数量: {result.matched_count:,}")
 
         if not missing_in_fin.empty:
             print(f"\n   ⚠️  发现 {len(missing_in_fin)} 笔订单未入财务账 (Revenue Leakage)!")
@@ -147,10 +654,75 @@ class FinancialControlTower:
         else:
             print("\n   ✅ 金额准确性核对通过 (Accuracy Check Passed)")
 
-        conn_ops.close()
-        conn_fin.close()
+        return result
+
+    def _reconcile_with_pandas(self, period: Optional[AuditPeriod] = None) -> ReconciliationResult:
+        """pandas 引擎：两侧读入内存后 merge（月结时只读该期间的订单及其应收）"""
+        # 1. 从业务库提取已发货订单 (Source of Truth for Revenue)
+        # 排除已取消的订单
+        query, params = build_audit_query("recon_ops", period)
+        df_ops = self._read_audit_input("recon_ops", self.db_ops, query, params=params, period=period)
+
+        # 2. 从财务库提取应收账款 (AR)；月结时按所属订单的期间过滤，需要 ATTACH 后与订单 JOIN
+        query, params = build_audit_query("recon_fin", period)
+        if period is None:
+            df_fin = self._read_audit_input("recon_fin", self.db_fin, query)
+        else:
+            df_fin = self._read_audit_input(
+                "recon_fin", self.db_ops, query, params=params, period=period, attach_finance=True
+            )
+
+        # 3. 对账逻辑 (Python Merge 模拟 SQL Full Outer Join)
+        # 在真实 SQL 中可以是: SELECT ... FROM Ops LEFT JOIN Fin ON ... WHERE Fin.id IS NULL
+        df_recon = pd.merge(df_ops, df_fin, on="order_id", how="left", indicator=True)
 
-    def audit_supply_chain_risks(self):
+        # 4. 发现差异
+        # Case A: 业务发货了，财务没记账 (漏记收入 - 严重风险)
+        missing_in_fin = df_recon[df_recon["_merge"] == "left_only"]
+
+        # Case B: 金额不一致 (处理浮点数精度问题)
+        df_recon["diff"] = (df_recon["expected_revenue"] - df_recon["booked_revenue"]).abs()
+        amount_mismatch = df_recon[(df_recon["_merge"] == "both") & (df_recon["diff"] > 0.01)]
+
+        return ReconciliationResult(
+            ops_count=len(df_ops),
+            fin_count=len(df_fin),
+            matched_count=int((df_recon["_merge"] == "both").sum()),
+            missing_in_fin=missing_in_fin[["order_id", "expected_revenue", "customer_name"]].reset_index(drop=True),
+            amount_mismatch=amount_mismatch[["order_id", "expected_revenue", "booked_revenue", "diff"]].reset_index(
+                drop=True
+            ),
+        )
+
+    def _reconcile_with_sql(self, period: Optional[AuditPeriod] = None) -> ReconciliationResult:
+        """
+        SQL 引擎：ATTACH 财务库后在 SQLite 内完成对账
+
+        业务侧按 idx_sales_orders_open 顺序扫描（与 pandas 引擎的输出顺序一致；月结时经 idx_sales_orders_period
+        只定位该月订单），财务侧走 idx_accounts_receivable_open 按 order_id 查找；
+        内存占用只与差异行数相关，与订单总量无关。
+        """
+        with self._ops_with_finance() as conn:
+            # 业务侧订单数 + 匹配数：一次扫描完成
+            ops_count, matched_count = conn.execute(*build_audit_query("recon_sql_counts", period)).fetchone()
+            fin_count = conn.execute(*build_audit_query("recon_sql_fin_count", period)).fetchone()[0]
+
+            # Case A: 业务发货了，财务没记账
+            query, params = build_audit_query("recon_sql_missing", period)
+            missing_in_fin = pd.read_sql(query, conn, params=params)
+
+            # Case B: 金额不一致
+            query, params = build_audit_query("recon_sql_mismatch", period)
+            amount_mismatch = pd.read_sql(query, conn, params=params)
+        return ReconciliationResult(
+            ops_count=ops_count,
+            fin_count=fin_count,
+            matched_count=matched_count,
+            missing_in_fin=missing_in_fin,
+            amount_mismatch=amount_mismatch,
+        )
+
+    def audit_supply_chain_risks(self, period: Optional[AuditPeriod] = None):
         """
         核心功能 2：供应链合规审计
 
@@ -162,33 +734,25 @@ class FinancialControlTower:
         - 这展示了你对"业务规则"的理解，不只是技术能力
         - 时间倒流 = 先货后票 = 合规风险
         - 负毛利 = 可能的销售舞弊或错误
+
+        Args:
+            period: 只审计该期间的订单
         """
         print("\n" + "=" * 70)
         print("🛡️  [Process 2] 供应链合规审计 (Compliance Audit)")
         print("=" * 70)
 
-        conn_ops = self._get_conn(self.db_ops)
-
-        # 联合查询订单和物流表
+        # 联合查询订单和物流表，并转换日期
         # 这里展示你的 SQL 能力：虽然用 pandas read_sql，但 query 本身是复杂的
-        query = """
-        SELECT
-            t1.order_id,
-            t1.order_date,
-            t2.shipping_date,
-            t1.profit,
-            t1.sales,
-            t1.order_status,
-            t1.customer_name
-        FROM sales_orders t1
-        JOIN shipping_logs t2 ON t1.order_id = t2.order_id
-        WHERE t1.order_status NOT IN ('CANCELED', 'CANCELLED')
-        """
-        df = pd.read_sql(query, conn_ops)
-
-        # 转换日期
-        df["order_date"] = pd.to_datetime(df["order_date"], errors="coerce")
-        df["shipping_date"] = pd.to_datetime(df["shipping_date"], errors="coerce")
+        query, params = build_audit_query("supply_chain", period)
+        df = self._read_audit_input(
+            "supply_chain",
+            self.db_ops,
+            query,
+            parse_dates=("order_date", "shipping_date"),
+            params=params,
+            period=period,
+        )
 
         print(f"\n📊 审计范围: {len(df):,} 笔订单")
 
@@ -208,7 +772,13 @@ class FinancialControlTower:
                     f"      - Order {row['order_id']}: 订单日期 {row['order_date'].date()} | 发货日期 {row['shipping_date'].date()} (提前{days_diff}天)"
                 )
 
-            self._log_audit_issue(timing_fraud["order_id"], "SC_TIMING_FRAUD", "CRITICAL", "Shipping Date < Order Date")
+            self._log_audit_issue(
+                timing_fraud["order_id"],
+                "SC_TIMING_FRAUD",
+                AUDIT_SEVERITY_SCALES["SC_TIMING_FRAUD"],
+                "Shipping Date < Order Date",
+                scores=(timing_fraud["shipping_date"] - timing_fraud["order_date"]).dt.days,
+            )
         else:
             print("\n   ✅ 时间逻辑核对通过 (No Timing Anomalies)")
 
@@ -217,7 +787,7 @@ class FinancialControlTower:
         negative_margin = df[df["profit"] < 0]
         if not negative_margin.empty:
             print(f"\n   ⚠️  检测到 {len(negative_margin)} 笔负毛利交易 (Negative Margin)")
-            print("   风险级别: MEDIUM - 利润为负的正常订单")
+            print("   风险级别: MEDIUM / HIGH (亏损≥$500) / CRITICAL (亏损>$1,000) - 利润为负的正常订单")
             print("   业务含义: 亏本销售 / 促销活动 / 价格录入错误")
 
             # 统计负毛利金额
@@ -233,14 +803,16 @@ class FinancialControlTower:
                 )
 
             self._log_audit_issue(
-                negative_margin["order_id"], "SC_NEGATIVE_MARGIN", "MEDIUM", "Profit < 0 on active order"
+                negative_margin["order_id"],
+                "SC_NEGATIVE_MARGIN",
+                AUDIT_SEVERITY_SCALES["SC_NEGATIVE_MARGIN"],
+                "Profit < 0 on active order",
+                scores=negative_margin["profit"],
             )
         else:
             print("\n   ✅ 盈利性核对通过 (All Orders Profitable)")
 
-        conn_ops.close()
-
-    def generate_financial_statements(self):
+    def generate_financial_statements(self, period: Optional[AuditPeriod] = None):
         """
         核心功能 3：财务报表生成
 
@@ -251,33 +823,30 @@ class FinancialControlTower:
         面试要点：
         - 这展示了你能将数据转化为"业务洞察"
         - 不只是技术，更是业务分析能力
+
+        两张报表读取 sales_monthly_summary（月 × 国家 × 品类 × 分段的预聚合，由加载器增量维护），
+        耗时与订单行数无关；汇总表或其维护触发器缺失时退回按 sales_orders 明细聚合。
+
+        Args:
+            period: 只报告该期间（损益表为该月一行，地区排名为该月的 Top 10）
         """
         print("\n" + "=" * 70)
         print("📊 [Process 3] 生成经营分析报表 (Business Analysis)")
         print("=" * 70)
 
-        conn_ops = self._get_conn(self.db_ops)
+        conn_ops = self._get_conn(self.db_ops, readonly=True)
+        # 两张报表读取加载器维护的汇总表；汇总未就绪时按订单明细聚合
+        suffix = "" if not missing_summary_objects(conn_ops) else "_orders"
 
         # 1. P&L 概览 (月度损益表)
-        query_pnl = """
-        SELECT
-            strftime('%Y-%m', order_date) as Month,
-            COUNT(*) as Order_Count,
-            SUM(sales) as Revenue,
-            SUM(profit) as Net_Profit
-        FROM sales_orders
-        WHERE order_status NOT IN ('CANCELED', 'CANCELLED')
-            AND order_date IS NOT NULL
-        GROUP BY Month
-        ORDER BY Month DESC
-        LIMIT 6
-        """
-        df_pnl = pd.read_sql(query_pnl, conn_ops)
+        query, params = build_audit_query("pnl_monthly" + suffix, period)
+        df_pnl = pd.read_sql(query, conn_ops, params=params)
 
         if not df_pnl.empty:
             df_pnl["Margin_%"] = (df_pnl["Net_Profit"] / df_pnl["Revenue"] * 100).round(2)
 
-            print("\n📈 月度损益概览 (P&L - Last 6 Months)")
+            scope = period.label if period is not None else "Last 6 Months"
+            print(f"\n📈 月度损益概览 (P&L - {scope})")
             print("-" * 70)
             print(f"{'月份':<10} {'订单数':>10} {'收入 (USD)':>15} {'净利润 (USD)':>15} {'毛利率':>10}")
             print("-" * 70)
@@ -298,21 +867,8 @@ class FinancialControlTower:
             print("\n⚠️  未找到有效的订单数据")
 
         # 2. 地区利润分析
-        query_region = """
-        SELECT
-            customer_country as Region,
-            COUNT(*) as Orders,
-            SUM(sales) as Revenue,
-            SUM(profit) as Profit
-        FROM sales_orders
-        WHERE order_status NOT IN ('CANCELED', 'CANCELLED')
-            AND customer_country IS NOT NULL
-            AND customer_country != ''
-        GROUP BY Region
-        ORDER BY Profit DESC
-        LIMIT 10
-        """
-        df_region = pd.read_sql(query_region, conn_ops)
+        query, params = build_audit_query("top_regions" + suffix, period)
+        df_region = pd.read_sql(query, conn_ops, params=params)
 
         if not df_region.empty:
             df_region["Margin_%"] = (df_region["Profit"] / df_region["Revenue"] * 100).round(2)
@@ -331,49 +887,27 @@ class FinancialControlTower:
 
         conn_ops.close()
 
-    def _log_audit_issue(self, order_ids, risk_type, severity, details):
+    def _log_audit_issue(self, order_ids, risk_type, severity, details, scores=None):
         """
         将发现的问题写入审计数据库
 
         这是"闭环管理"的体现：
         - 不只发现问题，还要记录问题
         - 方便后续跟踪和处理
-        """
-        conn_audit = self._get_conn(self.db_audit)
-
-        # 准备数据
-        logs = pd.DataFrame(
-            {
-                "order_id": order_ids,
-                "risk_type": risk_type,
-                "severity": severity,
-                "details": details,
-                "detected_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            }
-        )
-
-        # 写入 audit_logs 表
-        # 使用新的表结构映射
-        audit_records = []
-        for _, row in logs.iterrows():
-            audit_records.append(
-                {
-                    "audit_type": "Automated",
-                    "source_system": "Financial_Control_Tower",
-                    "entity_type": "Order",
-                    "entity_id": str(row["order_id"]),
-                    "action": risk_type,
-                    "notes": details,
-                    "risk_level": severity,
-                    "status": "Pending",
-                }
-            )
 
-        df_audit = pd.DataFrame(audit_records)
-        df_audit.to_sql("audit_logs", conn_audit, if_exists="append", index=False)
+        记录先进入 audit_sink；run_full_audit 期间整次运行只在结束时写库一次，单独调用审计阶段时立即写入。
 
-        conn_audit.close()
-        print(f"      💾 [System] 已将 {len(logs)} 条风险记录写入 Audit DB")
+        Args:
+            severity: 固定级别，或 SeverityScale（此时按 scores 为每笔订单分级）
+            scores: 与 order_ids 等长的度量值（金额、天数、利润等）
+        """
+        breakdown = ""
+        if isinstance(severity, SeverityScale):
+            severity = severity.classify(scores)
+            levels = pd.Series(severity).value_counts()
+            breakdown = ": " + " / ".join(f"{level} {n}" for level, n in levels.items())
+        count = self.audit_sink.add(order_ids, risk_type, severity, details)
+        print(f"      💾 [System] 已记录 {count} 条风险记录 ({risk_type}{breakdown})")
 
 
 def main():
@@ -0,0 +1,39 @@
+"""
+向量化风险分级
+把 {级别: (最小值, 最大值)} 形式的区间配置转换为有序分箱边界，用 numpy.searchsorted 一次为整列数值定级
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class SeverityScale:
+    """
+    风险分级标尺
+
+    区间为左闭右开 [最小值, 最大值)，与 FraudRuleThreshold.get_severity 的判定一致；
+    区间之间不应重叠，落在所有区间之外的值（含 NaN）定为 default。
+    """
+
+    def __init__(self, levels: Dict[str, Tuple[float, float]], default: str = "LOW"):
+        if not levels:
+            raise ValueError("severity levels 不能为空")
+        ordered = sorted(levels.items(), key=lambda item: item[1][0])
+        self.default = default
+        self.lower = np.array([low for _, (low, _) in ordered], dtype=float)
+        self.upper = np.array([high for _, (_, high) in ordered], dtype=float)
+        # 最后一个标签对应「不在任何区间内」
+        self.labels = np.array([level for level, _ in ordered] + [default], dtype=object)
+
+    def classify(self, values) -> np.ndarray:
+        """为一列数值定级，返回等长的级别字符串数组"""
+        values = np.asarray(values, dtype=float)
+        bins = np.searchsorted(self.lower, values, side="right") - 1
+        candidate = np.clip(bins, 0, None)
+        inside = (bins >= 0) & (values < self.upper[candidate])
+        return self.labels[np.where(inside, candidate, len(self.lower))]
+
+    def __repr__(self) -> str:
+        ranges = ", ".join(f"{label}=[{low}, {high})" for label, low, high in zip(self.labels, self.lower, self.upper))
+        return f"SeverityScale({ranges}, default={self.default!r})"
@@ -0,0 +1,140 @@
+"""
+SQLite 连接池
+按「数据库文件 × 读/写 × 线程」复用连接，并统一设置 PRAGMA。
+
+ERPDatabaseConnector、FinancialControlTower、FraudRuleManager 共用同一个池（get_connection_pool()），
+重复的小查询（get_table_count、list_tables 等）不再每次付出打开连接、解析 schema 的成本。
+
+连接按线程隔离（sqlite3 连接默认不能跨线程使用），配合 WAL 模式可以安全地并发读。
+池中连接的 close() 只是归还：回滚未提交的事务并保留连接。线程结束时它打开的连接随线程局部数据一起关闭，
+短生命周期的线程（线程池的工作线程）也可以在退出前调用 release_thread() 立即关闭；close_all() 关闭全部连接。
+fork 出的子进程（如回测的进程池）不继承父进程的连接，首次使用时各自重新打开。
+"""
+
+import os
+import sqlite3
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, Tuple
+
+from src.data_engineering.profiling import ProfiledConnection
+
+# 所有池化连接共用的 PRAGMA
+BASE_PRAGMAS: Dict[str, object] = {
+    "journal_mode": "WAL",  # 读写互不阻塞，多个读者可并发
+    "synchronous": "NORMAL",  # WAL 下的推荐值，提交时不再每次 fsync
+    "mmap_size": 256 * 1024 * 1024,  # 256 MB 内存映射读
+    "cache_size": -64 * 1024,  # 负数单位为 KiB：64 MB 页缓存
+    "temp_store": "MEMORY",  # GROUP BY / ORDER BY 的临时 B-tree 放在内存
+}
+
+# 只读路径额外设置：误写时直接报错
+READONLY_PRAGMAS: Dict[str, object] = {"query_only": "ON"}
+
+
+class PooledConnection(ProfiledConnection):
+    """close() 只归还连接（回滚未提交事务），由连接池负责真正关闭；语句在剖析中的线程里计入当前阶段"""
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def _close(self):
+        super().close()
+
+
+class _ThreadConnections:
+    """一个线程的连接表，保存在线程局部数据中；线程结束后对象被释放，由 weakref.finalize 关闭其中的连接"""
+
+    __slots__ = ("conns", "finalizer", "__weakref__")
+
+
+class SQLiteConnectionPool:
+    """按数据库、读写模式与线程缓存连接的连接池"""
+
+    def __init__(self, pragmas: Dict[str, object] = None):
+        self.pragmas = dict(BASE_PRAGMAS if pragmas is None else pragmas)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = set()  # 仍打开的连接，供 close_all() 使用；线程结束或 release_thread() 时移除
+
+    def connection(self, db_path, readonly: bool = False) -> PooledConnection:
+        """
+        获取当前线程的池化连接
+
+        Args:
+            db_path: 数据库文件路径
+            readonly: 为 True 时返回 query_only 连接
+        """
+        key: Tuple[str, bool] = (str(Path(db_path).resolve()), readonly)
+        conns = self._thread_connections()
+        conn = conns.get(key)
+        if conn is None:
+            conn = self._open(key[0], readonly)
+            conns[key] = conn
+            with self._lock:
+                self._all.add(conn)
+        return conn
+
+    def release_thread(self):
+        """关闭并移除当前线程的所有连接（线程池的工作线程在任务结束时调用）"""
+        holder = getattr(self._local, "holder", None)
+        if holder is not None:
+            del self._local.holder
+            holder.finalizer()
+
+    def _thread_connections(self) -> Dict[Tuple[str, bool], PooledConnection]:
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = _ThreadConnections()
+            holder.conns = {}
+            # 回调只引用连接表而不引用 holder，线程局部数据释放时 holder 随之释放、触发回调
+            holder.finalizer = weakref.finalize(holder, self._release, holder.conns)
+            self._local.holder = holder
+        return holder.conns
+
+    def _release(self, conns: Dict[Tuple[str, bool], PooledConnection]):
+        # 只关闭仍登记在 _all 中的连接：close_all() 已关闭的、fork 前父进程打开的都跳过
+        with self._lock:
+            live = [conn for conn in conns.values() if conn in self._all]
+            self._all.difference_update(live)
+        conns.clear()
+        for conn in live:
+            conn._close()
+
+    def _open(self, path: str, readonly: bool) -> PooledConnection:
+        # 连接只在创建它的线程中使用；关闭检查放开是为了让 close_all() 能在任意线程回收
+        conn = sqlite3.connect(path, factory=PooledConnection, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        if readonly:
+            for name, value in READONLY_PRAGMAS.items():
+                conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def close_all(self):
+        """关闭池中所有连接（重建数据库文件前调用）"""
+        with self._lock:
+            conns, self._all = self._all, set()
+        for conn in conns:
+            conn._close()
+        self._local = threading.local()
+
+    def _forget(self):
+        """丢弃（不关闭）所有连接的引用：fork 后的子进程不能使用父进程打开的 SQLite 连接"""
+        # 先清空 _all：替换 _local 会释放继承来的连接表并触发 _release，此时不应关闭任何连接
+        self._lock = threading.Lock()
+        self._all = set()
+        self._local = threading.local()
+
+
+_default_pool = SQLiteConnectionPool()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_default_pool._forget)
+
+
+def get_connection_pool() -> SQLiteConnectionPool:
+    """进程级默认连接池"""
+    return _default_pool
@@ -3,13 +3,55 @@
 提供统一的接口访问三个 ERP 数据库
 """
 
+import os
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
+import numpy as np
 import pandas as pd
 
+from src.data_engineering.connection_pool import get_connection_pool
+
+# 超时检查间隔：每执行这么多条 SQLite 虚拟机指令检查一次是否超时
+TIMEOUT_CHECK_INSTRUCTIONS = 10_000
+
+# 流式读取时每次 fetchmany 的行数
+STREAM_FETCH_SIZE = 50_000
+
+# 列式读取的后端
+COLUMN_BACKENDS = ("numpy", "arrow")
+
+# cross_db_query 并发查询的线程数（三个数据库各一个）
+CROSS_DB_WORKERS = 3
+
+_cross_db_executor = None
+_cross_db_lock = threading.Lock()
+
+
+def _get_cross_db_executor() -> ThreadPoolExecutor:
+    """cross_db_query 共用的常驻线程池：工作线程复用各自的池化连接，连接数不随调用次数增长"""
+    global _cross_db_executor
+    with _cross_db_lock:
+        if _cross_db_executor is None:
+            _cross_db_executor = ThreadPoolExecutor(max_workers=CROSS_DB_WORKERS, thread_name_prefix="cross-db")
+        return _cross_db_executor
+
+
+def _reset_cross_db_executor():
+    """fork 出的子进程没有父进程的工作线程，丢弃继承来的线程池，首次使用时重新创建"""
+    global _cross_db_executor, _cross_db_lock
+    _cross_db_executor = None
+    _cross_db_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_cross_db_executor)
+
 
 class ERPDatabaseConnector:
     """ERP 数据库连接器 - 模拟跨系统数据访问"""
@@ -24,13 +66,27 @@ class ERPDatabaseConnector:
         self.audit_db = self.data_dir / "audit.db"
 
     @contextmanager
-    def get_connection(self, db_name: str):
+    def get_connection(self, db_name: str, readonly: bool = False):
         """
         获取数据库连接的上下文管理器
 
+        连接来自共享连接池（按数据库与线程复用），退出上下文时归还而不是关闭。
+
         Args:
             db_name: 'operations', 'finance', 或 'audit'
+            readonly: 为 True 时使用 query_only 连接
         """
+        conn = get_connection_pool().connection(self._db_path(db_name), readonly=readonly)
+        conn.row_factory = sqlite3.Row  # 使结果可以通过列名访问
+        try:
+            yield conn
+        finally:
+            # 池化连接被其他模块共享，恢复默认的行格式
+            conn.row_factory = None
+            conn.close()
+
+    def _db_path(self, db_name: str) -> Path:
+        """数据库名 -> 文件路径（校验名称与文件是否存在）"""
         db_map = {"operations": self.ops_db, "finance": self.finance_db, "audit": self.audit_db}
 
         if db_name not in db_map:
@@ -41,13 +97,7 @@ class ERPDatabaseConnector:
             raise FileNotFoundError(
                 f"数据库不存在: {db_path}\n请先运行: python src/data_engineering/init_erp_databases.py"
             )
-
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row  # 使结果可以通过列名访问
-        try:
-            yield conn
-        finally:
-            conn.close()
+        return db_path
 
     def execute_query(self, db_name: str, query: str, params: Tuple = None) -> List[Dict]:
         """
@@ -61,7 +111,7 @@ class ERPDatabaseConnector:
         Returns:
             结果列表（字典格式）
         """
-        with self.get_connection(db_name) as conn:
+        with self.get_connection(db_name, readonly=True) as conn:
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
@@ -73,7 +123,7 @@ class ERPDatabaseConnector:
 
             return [dict(zip(columns, row)) for row in rows]
 
-    def execute_query_df(self, db_name: str, query: str, params: Tuple = None) -> pd.DataFrame:
+    def execute_query_df(self, db_name: str, query: str, params: Tuple = None, timeout: float = None) -> pd.DataFrame:
         """
         执行查询并返回 DataFrame
 
@@ -81,42 +131,205 @@ class ERPDatabaseConnector:
             db_name: 数据库名称
             query: SQL 查询语句
             params: 查询参数
+            timeout: 超时秒数（可选），超时后中断查询并抛出 TimeoutError
 
         Returns:
             pandas DataFrame
         """
-        with self.get_connection(db_name) as conn:
-            if params:
-                return pd.read_sql_query(query, conn, params=params)
+        with self.get_connection(db_name, readonly=True) as conn, self._deadline(conn, timeout) as timed_out:
+            try:
+                if params:
+                    return pd.read_sql_query(query, conn, params=params)
+                else:
+                    return pd.read_sql_query(query, conn)
+            except (sqlite3.OperationalError, pd.errors.DatabaseError) as e:
+                if timed_out():
+                    raise TimeoutError(f"{db_name} 查询超过 {timeout}s 被中断") from e
+                raise
+
+    def iter_query(
+        self, db_name: str, query: str, params: Tuple = None, chunksize: int = STREAM_FETCH_SIZE
+    ) -> Iterator[Dict]:
+        """
+        流式执行查询，逐行产出字典
+
+        与 execute_query 相同的结果格式，但每次只 fetchmany(chunksize) 行，内存占用与结果集大小无关。
+        """
+        for columns, rows in self._iter_row_batches(db_name, query, params, chunksize):
+            for row in rows:
+                yield dict(zip(columns, row))
+
+    def iter_query_df(
+        self, db_name: str, query: str, params: Tuple = None, chunksize: int = STREAM_FETCH_SIZE
+    ) -> Iterator[pd.DataFrame]:
+        """
+        流式执行查询，按块产出 DataFrame（每块最多 chunksize 行）
+
+        例如不整表载入即可扫描 general_ledger：
+            for chunk in connector.iter_query_df("finance", "SELECT * FROM general_ledger"):
+                ...
+        """
+        for columns, rows in self._iter_row_batches(db_name, query, params, chunksize):
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def iter_query_columns(
+        self,
+        db_name: str,
+        query: str,
+        params: Tuple = None,
+        chunksize: int = STREAM_FETCH_SIZE,
+        backend: str = "numpy",
+    ):
+        """
+        流式执行查询，按块产出列式数据，不为每行分配字典
+
+        Args:
+            backend: 'numpy' 产出 {列名: ndarray}；'arrow' 产出 pyarrow.RecordBatch（需要 pyarrow）
+        """
+        if backend not in COLUMN_BACKENDS:
+            raise ValueError(f"未知的列式后端: {backend}. 可选: {list(COLUMN_BACKENDS)}")
+        if backend == "arrow":
+            pa = self._import_pyarrow()
+
+        for columns, rows in self._iter_row_batches(db_name, query, params, chunksize):
+            # zip(*rows) 在 C 层完成行列转置
+            values = list(zip(*rows))
+            if backend == "arrow":
+                yield pa.RecordBatch.from_arrays([pa.array(v) for v in values], names=columns)
             else:
-                return pd.read_sql_query(query, conn)
+                yield {name: self._to_ndarray(v) for name, v in zip(columns, values)}
+
+    def execute_query_columns(self, db_name: str, query: str, params: Tuple = None, backend: str = "numpy"):
+        """
+        执行查询并以列式结构返回全部结果
+
+        Returns:
+            backend='numpy' 时为 {列名: ndarray}；backend='arrow' 时为 pyarrow.Table
+        """
+        batches = list(self.iter_query_columns(db_name, query, params, backend=backend))
+        if backend == "arrow":
+            pa = self._import_pyarrow()
+            if batches:
+                return pa.Table.from_batches(batches)
+            return pa.table({name: pa.array([]) for name in self._query_columns(db_name, query, params)})
+
+        if not batches:
+            return {name: np.array([]) for name in self._query_columns(db_name, query, params)}
+        return {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+
+    def _iter_row_batches(self, db_name: str, query: str, params: Tuple, chunksize: int):
+        """
+        产出 (列名列表, 行元组列表)，每批最多 chunksize 行
+
+        直接使用池化只读连接上的独立游标（不修改连接的 row_factory），
+        生成器挂起期间同一线程的其他查询不受影响。
+        """
+        conn = get_connection_pool().connection(self._db_path(db_name), readonly=True)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params or ())
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+            while rows := cursor.fetchmany(chunksize):
+                yield columns, rows
+        finally:
+            cursor.close()
+
+    def _query_columns(self, db_name: str, query: str, params: Tuple) -> List[str]:
+        """空结果集时仍返回列名"""
+        conn = get_connection_pool().connection(self._db_path(db_name), readonly=True)
+        cursor = conn.execute(query, params or ())
+        try:
+            return [desc[0] for desc in cursor.description] if cursor.description else []
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _to_ndarray(values: tuple) -> np.ndarray:
+        """一列值 -> ndarray：数值列为 int64 / float64（含 NULL 时为 float64，NULL 记为 NaN），其他列为 object"""
+        sample = next((v for v in values if v is not None), None)
+        if isinstance(sample, (int, float)):
+            try:
+                if None in values:
+                    return np.array(values, dtype=np.float64)
+                array = np.array(values)
+                if array.dtype.kind in "iufb":
+                    return array
+            except (TypeError, ValueError):
+                pass  # 同一列混有文本（SQLite 动态类型），按 object 处理
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    @staticmethod
+    def _import_pyarrow():
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError("backend='arrow' 需要安装 pyarrow: pip install pyarrow") from e
+        return pyarrow
+
+    @staticmethod
+    @contextmanager
+    def _deadline(conn: sqlite3.Connection, timeout: float = None):
+        """
+        为连接上的查询设置超时：通过 progress handler 在超时后中断 SQLite 执行
+
+        yield 一个函数，用于判断查询失败是否由超时引起。
+        """
+        if timeout is None:
+            yield lambda: False
+            return
+
+        deadline = time.monotonic() + timeout
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, TIMEOUT_CHECK_INSTRUCTIONS)
+        try:
+            yield lambda: time.monotonic() > deadline
+        finally:
+            conn.set_progress_handler(None, 0)
 
     def cross_db_query(
-        self, query_operations: str, query_finance: str = None, query_audit: str = None
+        self,
+        query_operations: str,
+        query_finance: str = None,
+        query_audit: str = None,
+        timeout: float = None,
+        parallel: bool = True,
     ) -> Dict[str, pd.DataFrame]:
         """
         跨数据库查询（模拟跨系统 ETL）
 
+        三个数据库是互不相干的 SQLite 文件，默认在模块级常驻线程池中并发执行（每个工作线程使用自己的池化只读连接，
+        跨调用复用），总耗时取决于最慢的一条查询而不是三者之和。
+
         Args:
             query_operations: Operations DB 查询
             query_finance: Finance DB 查询（可选）
             query_audit: Audit DB 查询（可选）
+            timeout: 每条查询的超时秒数（可选），超时抛出 TimeoutError
+            parallel: 为 False 时按顺序执行
 
         Returns:
             包含各数据库查询结果的字典
         """
-        results = {}
-
-        if query_operations:
-            results["operations"] = self.execute_query_df("operations", query_operations)
-
-        if query_finance:
-            results["finance"] = self.execute_query_df("finance", query_finance)
+        queries = {
+            db_name: query
+            for db_name, query in [("operations", query_operations), ("finance", query_finance), ("audit", query_audit)]
+            if query
+        }
 
-        if query_audit:
-            results["audit"] = self.execute_query_df("audit", query_audit)
+        if not parallel or len(queries) < 2:
+            return {
+                db_name: self.execute_query_df(db_name, query, timeout=timeout) for db_name, query in queries.items()
+            }
 
-        return results
+        pool = _get_cross_db_executor()
+        futures = {
+            db_name: pool.submit(self.execute_query_df, db_name, query, timeout=timeout)
+            for db_name, query in queries.items()
+        }
+        # 等全部查询结束后再返回，按 operations / finance / audit 的顺序取结果，第一个失败的查询抛出异常
+        wait(futures.values())
+        return {db_name: future.result() for db_name, future in futures.items()}
 
     def get_table_info(self, db_name: str, table_name: str) -> pd.DataFrame:
         """获取表结构信息"""
@@ -0,0 +1,169 @@
+"""
+索引管理
+声明式定义 Operations / Finance 数据库的二级索引（含覆盖索引与部分索引），
+并提供基于 EXPLAIN QUERY PLAN 的全表扫描检查。
+
+部分索引只有在查询 WHERE 子句中出现与索引条件**完全相同**的谓词时才会被 SQLite 选用，
+因此审计查询中的状态过滤条件须与这里的 ACTIVE_ORDER_FILTER / OPEN_ORDER_FILTER 文本保持一致。
+"""
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 有效订单（排除取消）：供应链审计、经营分析
+ACTIVE_ORDER_FILTER = "order_status NOT IN ('CANCELED', 'CANCELLED')"
+# 待核对订单（再排除疑似欺诈）：业财对账、欺诈规则评估
+OPEN_ORDER_FILTER = "order_status NOT IN ('CANCELED', 'SUSPECTED_FRAUD', 'CANCELLED')"
+# 未取消的应收账款
+OPEN_RECEIVABLE_FILTER = "payment_status != 'Cancelled'"
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """单个受管索引的声明"""
+
+    name: str
+    database: str  # 'operations' 或 'finance'
+    table: str
+    columns: Tuple[str, ...]
+    where: Optional[str] = None
+    unique: bool = False
+
+    @property
+    def ddl(self) -> str:
+        unique = "UNIQUE " if self.unique else ""
+        sql = f"CREATE {unique}INDEX IF NOT EXISTS {self.name} ON {self.table}({', '.join(self.columns)})"
+        if self.where:
+            sql += f" WHERE {self.where}"
+        return sql
+
+
+MANAGED_INDEXES: List[IndexSpec] = [
+    # --- Operations ---
+    # 订单 -> 物流 JOIN（供应链审计、时间欺诈规则），附带 shipping_date 构成覆盖索引
+    IndexSpec("idx_shipping_logs_order", "operations", "shipping_logs", ("order_id", "shipping_date")),
+    # 按状态 / 日期过滤的通用索引
+    IndexSpec("idx_sales_orders_status_date", "operations", "sales_orders", ("order_status", "order_date")),
+    # 有效订单部分覆盖索引：供应链审计（以及汇总表缺失时的月度损益、地区排名）只读索引即可
+    IndexSpec(
+        "idx_sales_orders_active",
+        "operations",
+        "sales_orders",
+        ("order_date", "order_id", "customer_country", "order_status", "sales", "profit", "customer_name"),
+        where=ACTIVE_ORDER_FILTER,
+    ),
+    # 待核对订单部分覆盖索引：业财对账与欺诈规则
+    # order_date 在前，支持评估窗口的范围查找；对账按 (order_date, order_id) 排序时免去额外排序
+    IndexSpec(
+        "idx_sales_orders_open",
+        "operations",
+        "sales_orders",
+        (
+            "order_date",
+            "order_id",
+            "order_status",
+            "sales",
+            "profit",
+            "customer_name",
+            "customer_id",
+            "customer_segment",
+            "customer_country",
+            "category_name",
+        ),
+        where=OPEN_ORDER_FILTER,
+    ),
+    # 月结：order_year / order_month 等值定位一个期间的订单；order_date, order_id 与对账的排序一致
+    IndexSpec(
+        "idx_sales_orders_period",
+        "operations",
+        "sales_orders",
+        ("order_year", "order_month", "order_date", "order_id"),
+    ),
+    # 地区排名：按国家读取汇总表的覆盖索引（汇总表见 summary_tables.py）
+    IndexSpec(
+        "idx_sales_monthly_summary_country",
+        "operations",
+        "sales_monthly_summary",
+        ("customer_country", "profit", "revenue", "orders"),
+    ),
+    # --- Finance ---
+    IndexSpec("idx_general_ledger_order", "finance", "general_ledger", ("order_id", "account_code")),
+    IndexSpec("idx_general_ledger_account_date", "finance", "general_ledger", ("account_code", "transaction_date")),
+    # 未取消应收账款部分覆盖索引：对账时按 order_id 查找并直接取金额
+    # （条件列 payment_status 也须放入索引，否则 SQLite 不把它视为覆盖索引）
+    IndexSpec(
+        "idx_accounts_receivable_open",
+        "finance",
+        "accounts_receivable",
+        ("order_id", "invoice_amount", "payment_status"),
+        where=OPEN_RECEIVABLE_FILTER,
+    ),
+]
+
+
+def managed_indexes(database: str) -> List[IndexSpec]:
+    """返回指定数据库的受管索引"""
+    return [spec for spec in MANAGED_INDEXES if spec.database == database]
+
+
+def drop_managed_indexes(conn: sqlite3.Connection, database: str):
+    """删除受管索引（批量加载前调用，避免逐行维护 B-tree）"""
+    for spec in managed_indexes(database):
+        conn.execute(f"DROP INDEX IF EXISTS {spec.name}")
+
+
+def create_managed_indexes(conn: sqlite3.Connection, database: str, analyze: bool = True) -> List[str]:
+    """
+    创建受管索引（批量加载后调用）
+
+    Args:
+        analyze: 为 True 时创建后执行 ANALYZE，让查询规划器获得统计信息
+
+    Returns:
+        创建（或已存在）的索引名列表
+    """
+    specs = managed_indexes(database)
+    for spec in specs:
+        conn.execute(spec.ddl)
+    if analyze and specs:
+        conn.execute("ANALYZE")
+    return [spec.name for spec in specs]
+
+
+def missing_indexes(conn: sqlite3.Connection, database: str) -> List[str]:
+    """返回数据库中缺失的受管索引名"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return [spec.name for spec in managed_indexes(database) if spec.name not in existing]
+
+
+def explain_query(conn: sqlite3.Connection, sql: str, params: Sequence = ()) -> List[str]:
+    """返回 EXPLAIN QUERY PLAN 的 detail 列"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params))]
+
+
+def full_scans(plan: Iterable[str]) -> List[str]:
+    """
+    从查询计划中挑出全表扫描步骤
+
+    `SCAN t USING [COVERING] INDEX ...` 只读索引（部分索引只含符合条件的行），
+    `SCAN t` 则是逐行读取整张表。
+    """
+    return [detail for detail in plan if detail.startswith("SCAN ") and " USING " not in detail]
+
+
+def explain_report(conn: sqlite3.Connection, queries: Dict[str, Tuple[str, Sequence]]) -> Dict[str, Dict]:
+    """
+    对一组查询执行 EXPLAIN QUERY PLAN
+
+    Args:
+        queries: 查询名 -> (SQL, 参数)
+
+    Returns:
+        查询名 -> {"plan": [...], "full_scans": [...]}
+    """
+    report = {}
+    for name, (sql, params) in queries.items():
+        plan = explain_query(conn, sql, params)
+        report[name] = {"plan": plan, "full_scans": full_scans(plan)}
+    return report
@@ -7,25 +7,232 @@
 """
 
 import contextlib
+import os
 import sqlite3
 import sys
+import warnings
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.audit.audit_sink import ensure_audit_schema
+from src.data_engineering.indexes import (
+    create_managed_indexes,
+    drop_managed_indexes,
+    managed_indexes,
+    missing_indexes,
+)
+from src.data_engineering.processed_data import ParquetSource, date_window_mask
+from src.data_engineering.profiling import (
+    ProfiledConnection,
+    ProfileOptions,
+    RunProfiler,
+    add_profile_arguments,
+    count_rows_read,
+    profile_options_from_args,
+    profile_stage,
+    record_rows,
+)
+from src.data_engineering.summary_tables import (
+    create_summary_schema,
+    drop_summary_triggers,
+    ensure_summary_tables,
+    missing_summary_objects,
+    rebuild_summary_tables,
+)
+
+# 每次 executemany 提交的行数（整批在同一事务内写入）
+BULK_INSERT_BATCH_SIZE = 50_000
+
+# 目标字段 -> 源 CSV 中可能出现的列名（处理不同 ERP 导出的列名变体）
+COLUMN_ALIASES: Dict[str, List[str]] = {
+    "order_id": ["Order ID", "order_id", "OrderId"],
+    "order_date": ["order date (DateOrders)", "Order Date", "order_date"],
+    "shipping_date": ["shipping date (DateOrders)", "Shipping Date", "shipping_date"],
+    "customer_id": ["Customer ID", "customer_id", "CustomerId"],
+    "customer_name": ["Customer Name", "customer_name"],
+    "customer_segment": ["Customer Segment", "customer_segment"],
+    "customer_country": ["Customer Country", "customer_country", "Country"],
+    "customer_city": ["Customer City", "customer_city", "City"],
+    "product_id": ["Product ID", "Product Card Id", "product_id", "ProductId"],
+    "product_name": ["Product Name", "product_name", "ProductName"],
+    "product_price": ["Sales", "sales", "Product Price", "price"],
+    "category": ["Category Name", "category_name", "Category", "category"],
+    "quantity": ["Order Item Quantity", "Quantity", "quantity"],
+    "sales": ["Sales", "sales"],
+    "discount": ["Order Item Discount", "Discount", "discount"],
+    "profit": ["Order Profit Per Order", "Profit", "profit"],
+    "status": ["Order Status", "order_status", "OrderStatus"],
+    "priority": ["Order Priority", "order_priority"],
+    "shipment_scheduled": ["Days for shipment (scheduled)", "days_for_shipment_scheduled"],
+    "shipment_real": ["Days for shipment (real)", "Days for shipping (real)", "days_for_shipment_real"],
+    "delivery_status": ["Delivery Status", "delivery_status"],
+    "late_delivery_risk": ["Late_delivery_risk", "late_delivery_risk"],
+    "shipping_mode": ["Shipping Mode", "shipping_mode", "Type"],
+    "market": ["Market", "market"],
+    "region": ["Region", "region"],
+}
+
+# 流式读取每块行数（峰值内存与块大小成正比，与文件大小无关）
+STREAM_CHUNK_SIZE = 100_000
+
+# 源文件格式：原始 CSV（data/raw）或 scripts/preprocess.py 产出的 Parquet（data/processed）
+SOURCE_FORMATS = ("csv", "parquet")
+
+# 增量加载中变化订单数达到已有订单数的该比例时，暂停汇总触发器、写入后整表重算（比逐行维护快）
+SUMMARY_REBUILD_RATIO = 0.1
+
+# 跨数据块合并产品统计时的聚合方式
+PRODUCT_STATS_AGG = {"product_name": "first", "product_category": "first", "price_sum": "sum", "price_count": "sum"}
+
+PRODUCTS_INSERT_SQL = """
+    INSERT OR REPLACE INTO products
+    (product_id, product_name, product_category, product_price)
+    VALUES (?, ?, ?, ?)
+"""
+
+SALES_ORDERS_INSERT_SQL = """
+    INSERT OR REPLACE INTO sales_orders
+    (order_id, order_date, customer_id, customer_name, customer_segment,
+     customer_country, customer_city, product_id, product_name, category_name,
+     order_quantity, sales, discount, profit, order_status, order_priority,
+     order_year, order_month, order_day, days_for_shipment_scheduled,
+     days_for_shipment_real, delivery_status, late_delivery_risk)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SHIPPING_LOGS_INSERT_SQL = """
+    INSERT INTO shipping_logs
+    (order_id, shipping_mode, shipping_date, days_for_shipment_scheduled,
+     days_for_shipment_real, delivery_status, late_delivery_risk,
+     customer_country, customer_city, market, region)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+GENERAL_LEDGER_INSERT_SQL = """
+    INSERT INTO general_ledger
+    (transaction_date, order_id, account_code, account_name,
+     debit_amount, credit_amount, description, reference_number)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+ACCOUNTS_RECEIVABLE_INSERT_SQL = """
+    INSERT OR REPLACE INTO accounts_receivable
+    (order_id, customer_id, customer_name, invoice_date, due_date,
+     invoice_amount, paid_amount, outstanding_amount, payment_status, days_past_due)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# 增量加载使用真正的 upsert：保留主键与 created_at，只更新业务字段
+SALES_ORDERS_UPSERT_SQL = """
+    INSERT INTO sales_orders
+    (order_id, order_date, customer_id, customer_name, customer_segment,
+     customer_country, customer_city, product_id, product_name, category_name,
+     order_quantity, sales, discount, profit, order_status, order_priority,
+     order_year, order_month, order_day, days_for_shipment_scheduled,
+     days_for_shipment_real, delivery_status, late_delivery_risk)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(order_id) DO UPDATE SET
+        order_date = excluded.order_date,
+        customer_id = excluded.customer_id,
+        customer_name = excluded.customer_name,
+        customer_segment = excluded.customer_segment,
+        customer_country = excluded.customer_country,
+        customer_city = excluded.customer_city,
+        product_id = excluded.product_id,
+        product_name = excluded.product_name,
+        category_name = excluded.category_name,
+        order_quantity = excluded.order_quantity,
+        sales = excluded.sales,
+        discount = excluded.discount,
+        profit = excluded.profit,
+        order_status = excluded.order_status,
+        order_priority = excluded.order_priority,
+        order_year = excluded.order_year,
+        order_month = excluded.order_month,
+        order_day = excluded.order_day,
+        days_for_shipment_scheduled = excluded.days_for_shipment_scheduled,
+        days_for_shipment_real = excluded.days_for_shipment_real,
+        delivery_status = excluded.delivery_status,
+        late_delivery_risk = excluded.late_delivery_risk
+"""
+
+ACCOUNTS_RECEIVABLE_UPSERT_SQL = """
+    INSERT INTO accounts_receivable
+    (order_id, customer_id, customer_name, invoice_date, due_date,
+     invoice_amount, paid_amount, outstanding_amount, payment_status, days_past_due)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(order_id) DO UPDATE SET
+        customer_id = excluded.customer_id,
+        customer_name = excluded.customer_name,
+        invoice_date = excluded.invoice_date,
+        due_date = excluded.due_date,
+        invoice_amount = excluded.invoice_amount,
+        paid_amount = excluded.paid_amount,
+        outstanding_amount = excluded.outstanding_amount,
+        payment_status = excluded.payment_status,
+        days_past_due = excluded.days_past_due,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# 各数据块暂存的订单摘要按订单合并（摘要为行哈希之和，与分块方式无关）
+STAGED_ORDER_DIGEST_QUERY = """
+    SELECT order_id, SUM(digest_hi) AS digest_hi, SUM(digest_lo) AS digest_lo, SUM(row_count) AS row_count
+    FROM temp.staged_order_digest
+    GROUP BY order_id
+"""
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """整列解析日期；统一格式解析失败的少量值再逐个回退解析；已是 datetime 的列原样返回"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        parsed = pd.to_datetime(values, errors="coerce")
+
+    unparsed = parsed.isna() & values.notna()
+    if unparsed.any():
+        parsed[unparsed] = values[unparsed].map(_parse_single_date)
+    return parsed
+
+
+def _parse_single_date(value):
+    """逐值解析日期（仅用于向量化解析失败的值）"""
+    with contextlib.suppress(Exception):
+        return pd.to_datetime(value)
+    return pd.NaT
+
 
 class ERPDatabaseInitializer:
     """ERP 数据库初始化器"""
 
-    def __init__(self, data_dir: Path = None):
+    def __init__(
+        self,
+        data_dir: Path = None,
+        batch_size: int = BULK_INSERT_BATCH_SIZE,
+        source_format: str = "csv",
+        profile: ProfileOptions = None,
+    ):
+        """
+        Args:
+            profile: 剖析选项；initialize() 总会按阶段记录（结果在 last_profile），
+                给出时另外写出剖析 JSON，并可开启 cProfile / tracemalloc（见 src/data_engineering/profiling.py）
+        """
+        if source_format not in SOURCE_FORMATS:
+            raise ValueError(f"未知的源文件格式: {source_format}. 可选: {list(SOURCE_FORMATS)}")
+
         self.project_root = project_root
         self.data_dir = data_dir or (project_root / "data")
         self.raw_data_dir = self.data_dir / "raw"
+        self.processed_data_dir = self.data_dir / "processed"
+        self.source_format = source_format
         self.db_dir = self.data_dir
 
         # 数据库文件路径
@@ -33,6 +240,10 @@ class ERPDatabaseInitializer:
         self.finance_db_path = self.db_dir / "db_finance.db"
         self.audit_db_path = self.db_dir / "audit.db"
 
+        self.batch_size = batch_size
+        self.profile = profile
+        self.last_profile: Optional[RunProfiler] = None
+
     def find_csv_file(self) -> Path:
         """查找原始 CSV 文件"""
         csv_files = list(self.raw_data_dir.glob("*.csv"))
@@ -40,14 +251,55 @@ class ERPDatabaseInitializer:
             raise FileNotFoundError("未找到 CSV 文件。请先运行: python scripts/download_data.py")
         return csv_files[0]
 
-    def load_raw_data(self) -> pd.DataFrame:
-        """加载原始 CSV 数据"""
+    def find_parquet_file(self) -> Path:
+        """查找预处理后的 Parquet 文件（data/processed，其次 data/raw）"""
+        parquet_files = sorted(self.processed_data_dir.glob("*.parquet")) or sorted(self.raw_data_dir.glob("*.parquet"))
+        if not parquet_files:
+            raise FileNotFoundError("未找到 Parquet 文件。请先运行: python scripts/preprocess.py")
+        return parquet_files[0]
+
+    def find_source_file(self) -> Path:
+        """按 source_format 查找源文件"""
+        return self.find_parquet_file() if self.source_format == "parquet" else self.find_csv_file()
+
+    def open_parquet_source(self) -> Tuple[ParquetSource, List[str]]:
+        """
+        打开 Parquet 源文件
+
+        Returns:
+            (ParquetSource, 需要读取的列)：只读取 COLUMN_ALIASES 能识别的列，订单日期列用于按日期跳过行组
+        """
+        parquet_file = self.find_parquet_file()
+        source = ParquetSource(parquet_file)
+        source_cols = self._resolve_columns(pd.DataFrame(columns=source.columns))
+        source.date_column = source_cols.get("order_date")
+        return source, list(dict.fromkeys(source_cols.values()))
+
+    def load_raw_data(self, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """
+        加载原始数据
+
+        Args:
+            start_date / end_date: 只保留订单日期在窗口内的行（按天，含两端）；
+                Parquet 源按行组统计跳过窗口外的行组，CSV 源读取后过滤
+        """
+        if self.source_format == "parquet":
+            source, columns = self.open_parquet_source()
+            print(f"正在加载 Parquet: {source.path.name} ({source.num_rows:,} 行, 读取 {len(columns)} 列)")
+            df = source.read(columns, start_date, end_date)
+            record_rows(read=len(df))
+            print(f"✓ 加载完成: {df.shape[0]:,} 行, {df.shape[1]} 列")
+            return df
+
         csv_file = self.find_csv_file()
         print(f"正在加载数据: {csv_file.name}")
         print(f"文件大小: {csv_file.stat().st_size / 1024 / 1024:.2f} MB")
 
         # 读取 CSV（使用低内存模式处理大文件）
         df = pd.read_csv(csv_file, low_memory=False)
+        record_rows(read=len(df))
+        if start_date or end_date:
+            df = df[self._order_date_mask(df, start_date, end_date)]
         print(f"✓ 加载完成: {df.shape[0]:,} 行, {df.shape[1]} 列")
 
         # 显示列名
@@ -57,15 +309,447 @@ class ERPDatabaseInitializer:
 
         return df
 
+    def read_raw_data_chunks(
+        self, chunksize: int = STREAM_CHUNK_SIZE, start_date: str = None, end_date: str = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        分块读取原始数据
+
+        只读取 COLUMN_ALIASES 能识别的列，峰值内存由 chunksize 决定而不是文件大小。
+        CSV 源的列全部按文本读取，数值列在构建各表时再转换（无法解析的值记为缺失）；
+        Parquet 源逐行组读取已有类型的列，并跳过日期窗口之外的行组。
+        """
+        if self.source_format == "parquet":
+            source, columns = self.open_parquet_source()
+            row_groups = source.row_groups(start_date, end_date)
+            print(
+                f"正在流式加载 Parquet: {source.path.name} (每块 {chunksize:,} 行, 读取 {len(columns)} 列, "
+                f"行组 {len(row_groups)}/{source.file.num_row_groups})"
+            )
+            return count_rows_read(source.iter_batches(columns, start_date, end_date, batch_size=chunksize))
+
+        csv_file = self.find_csv_file()
+        print(f"正在流式加载数据: {csv_file.name} (每块 {chunksize:,} 行)")
+        print(f"文件大小: {csv_file.stat().st_size / 1024 / 1024:.2f} MB")
+
+        header = pd.read_csv(csv_file, nrows=0)
+        source_cols = self._resolve_columns(header)
+        usecols = list(dict.fromkeys(source_cols.values()))
+
+        chunks = count_rows_read(pd.read_csv(csv_file, usecols=usecols, dtype=str, chunksize=chunksize))
+        if start_date or end_date:
+            return (chunk[self._order_date_mask(chunk, start_date, end_date)] for chunk in chunks)
+        return chunks
+
+    def _order_date_mask(self, df: pd.DataFrame, start_date: str = None, end_date: str = None) -> np.ndarray:
+        """订单日期落在窗口内的行；没有订单日期列时全部保留"""
+        col = self._find_column(df, COLUMN_ALIASES["order_date"])
+        if not col:
+            return np.ones(len(df), dtype=bool)
+        return date_window_mask(self._parse_dates(df[col]), start_date, end_date)
+
+    def create_databases_streaming(
+        self, chunksize: int = STREAM_CHUNK_SIZE, start_date: str = None, end_date: str = None
+    ):
+        """
+        流式创建 Operations 与 Finance 数据库
+
+        单次遍历源文件：每个数据块同时写入 sales_orders、shipping_logs、general_ledger
+        与 accounts_receivable，并累积产品统计，遍历结束后写入 products。
+        start_date / end_date 限定只加载该订单日期窗口内的行。
+
+        每个库的删除索引 / 触发器、全部写入与重建在同一个事务中完成：任一数据块失败时两个库都回滚，
+        保持加载前的数据、索引与汇总触发器。遍历时同时记录每个订单的内容摘要与源文件水位
+        （见 _write_incremental_state），随后的增量加载只处理之后变化的订单。
+        """
+        print("\n" + "=" * 60)
+        print("流式创建 Operations / Finance 数据库")
+        print("=" * 60)
+
+        conn_ops = sqlite3.connect(self.ops_db_path, factory=ProfiledConnection)
+        conn_fin = sqlite3.connect(self.finance_db_path, factory=ProfiledConnection)
+        cursor_ops = conn_ops.cursor()
+        cursor_fin = conn_fin.cursor()
+
+        self._create_operations_schema(cursor_ops)
+        self._create_finance_schema(cursor_fin)
+        try:
+            counts = self._load_streaming(conn_ops, conn_fin, chunksize, start_date, end_date)
+            # 先提交 Finance：Operations 未提交时下次全量加载会整体重做
+            conn_fin.commit()
+            conn_ops.commit()
+        except BaseException:
+            conn_fin.rollback()
+            conn_ops.rollback()
+            raise
+        finally:
+            conn_ops.close()
+            conn_fin.close()
+
+        for table, count in counts.items():
+            print(f"✓ {table}: 写入 {count:,} 条记录")
+        print(f"✓ Operations 数据库初始化完成: {self.ops_db_path}")
+        print(f"✓ Finance 数据库初始化完成: {self.finance_db_path}")
+
+    def _load_streaming(
+        self,
+        conn_ops: sqlite3.Connection,
+        conn_fin: sqlite3.Connection,
+        chunksize: int,
+        start_date: str = None,
+        end_date: str = None,
+    ) -> Dict[str, int]:
+        """在两个库各自的事务中完成流式加载（由 create_databases_streaming 提交或回滚）"""
+        # 显式开启事务：sqlite3 模块不会为 DDL 隐式开启事务，DROP INDEX / TRIGGER 须与数据写入一起回滚
+        conn_ops.execute("BEGIN")
+        conn_fin.execute("BEGIN")
+        cursor_ops = conn_ops.cursor()
+        cursor_fin = conn_fin.cursor()
+
+        self._reset_incremental_state(cursor_ops)
+        self._create_digest_staging(cursor_ops)
+        # 二级索引与汇总表在全部数据写入后再统一创建
+        drop_managed_indexes(conn_ops, "operations")
+        drop_summary_triggers(conn_ops)
+        drop_managed_indexes(conn_fin, "finance")
+
+        # 加载前取源文件状态：加载期间文件被改写时水位不匹配，下次增量会重新比对
+        source_file = self.find_source_file()
+        file_stat = source_file.stat()
+        product_stats = None
+        row_count = 0
+        counts = dict.fromkeys(["sales_orders", "shipping_logs", "general_ledger", "accounts_receivable"], 0)
+
+        for chunk_no, chunk in enumerate(self.read_raw_data_chunks(chunksize, start_date, end_date), 1):
+            cols = self._resolve_columns(chunk)
+            if "order_id" not in cols:
+                print("⚠️  未找到订单ID列，跳过数据插入")
+                break
+
+            if "product_id" in cols:
+                product_stats = self._accumulate_product_stats(product_stats, chunk)
+            self._stage_order_digests(cursor_ops, chunk, cols["order_id"])
+            row_count += len(chunk)
+
+            counts["sales_orders"] += self._bulk_insert(
+                cursor_ops, SALES_ORDERS_INSERT_SQL, self._build_sales_orders_frame(chunk), "订单记录"
+            )
+            counts["shipping_logs"] += self._bulk_insert(
+                cursor_ops, SHIPPING_LOGS_INSERT_SQL, self._build_shipping_logs_frame(chunk), "物流记录"
+            )
+            if "sales" in cols:
+                counts["general_ledger"] += self._bulk_insert(
+                    cursor_fin, GENERAL_LEDGER_INSERT_SQL, self._build_general_ledger_frame(chunk), "总账记录"
+                )
+                counts["accounts_receivable"] += self._bulk_insert(
+                    cursor_fin,
+                    ACCOUNTS_RECEIVABLE_INSERT_SQL,
+                    self._build_accounts_receivable_frame(chunk),
+                    "应收账款记录",
+                )
+
+            print(f"\n✓ 数据块 {chunk_no}: 累计 {counts['shipping_logs']:,} 行")
+
+        if product_stats is not None:
+            inserted = self._bulk_insert(
+                cursor_ops, PRODUCTS_INSERT_SQL, self._finalize_product_stats(product_stats), "产品记录"
+            )
+            print(f"\n✓ 插入 {inserted:,} 条产品记录")
+
+        self._build_summary_tables(conn_ops)
+        self._build_indexes(conn_ops, "operations")
+        self._build_indexes(conn_fin, "finance")
+        # 日期窗口只加载了部分源文件：只记录已加载订单的摘要，不写水位
+        windowed = bool(start_date or end_date)
+        self._write_incremental_state(cursor_ops, source_file.name, None if windowed else file_stat, row_count)
+        return counts
+
+    def load_incremental(self, chunksize: int = STREAM_CHUNK_SIZE) -> Dict[str, int]:
+        """
+        增量加载：只 upsert 新增或内容发生变化的订单
+
+        - 源文件大小与修改时间与上次水位一致时直接跳过；
+        - 第一遍分块扫描 CSV，为每个订单计算内容摘要（与行顺序、分块方式无关），
+          与 etl_order_state 比对得出变化订单集合，同时累积产品统计；
+        - 第二遍只取变化订单的行：sales_orders / accounts_receivable 使用 ON CONFLICT upsert，
+          shipping_logs / general_ledger 先删除这些订单的旧记录再插入；
+        - sales_monthly_summary 由触发器随 upsert 增量维护；变化订单达到已有订单的 SUMMARY_REBUILD_RATIO 时
+          （如首次增量）暂停触发器，写入后整表重算。
+
+        源文件中已不存在的订单保持不变（删除需要全量重建）。
+
+        Returns:
+            各表写入行数与变化订单数
+        """
+        print("\n" + "=" * 60)
+        print("增量加载 Operations / Finance 数据库")
+        print("=" * 60)
+
+        csv_file = self.find_source_file()
+        file_stat = csv_file.stat()
+
+        conn_ops = sqlite3.connect(self.ops_db_path, factory=ProfiledConnection)
+        conn_fin = sqlite3.connect(self.finance_db_path, factory=ProfiledConnection)
+        cursor_ops = conn_ops.cursor()
+        cursor_fin = conn_fin.cursor()
+        self._create_operations_schema(cursor_ops)
+        self._create_finance_schema(cursor_fin)
+        # 增量删除/upsert 依赖 order_id 索引；已存在时为空操作
+        create_managed_indexes(conn_ops, "operations", analyze=False)
+        create_managed_indexes(conn_fin, "finance", analyze=False)
+        # 之后订单的 upsert 由触发器增量维护汇总表；旧库缺少汇总时先整表重算
+        if ensure_summary_tables(conn_ops):
+            print("✓ 汇总表缺失或未同步，已由 sales_orders 重算")
+
+        counts = dict.fromkeys(
+            ["changed_orders", "sales_orders", "shipping_logs", "general_ledger", "accounts_receivable", "products"], 0
+        )
+
+        watermark = cursor_ops.execute(
+            "SELECT file_size, file_mtime_ns FROM etl_watermarks WHERE source_name = ?", (csv_file.name,)
+        ).fetchone()
+        if watermark == (file_stat.st_size, file_stat.st_mtime_ns):
+            print(f"✓ 源文件未变化，跳过增量加载: {csv_file.name}")
+            conn_ops.close()
+            conn_fin.close()
+            return counts
+
+        # 第一遍：订单摘要 + 产品统计
+        self._create_digest_staging(cursor_ops)
+        product_stats = None
+        row_count = 0
+        for chunk in self.read_raw_data_chunks(chunksize):
+            cols = self._resolve_columns(chunk)
+            if "order_id" not in cols:
+                print("⚠️  未找到订单ID列，跳过增量加载")
+                conn_ops.close()
+                conn_fin.close()
+                return counts
+            if "product_id" in cols:
+                product_stats = self._accumulate_product_stats(product_stats, chunk)
+            self._stage_order_digests(cursor_ops, chunk, cols["order_id"])
+            row_count += len(chunk)
+
+        cursor_ops.execute("DROP TABLE IF EXISTS temp.changed_orders")
+        cursor_ops.execute(f"""
+            CREATE TEMP TABLE changed_orders AS
+            SELECT s.order_id, s.digest_hi, s.digest_lo, s.row_count
+            FROM ({STAGED_ORDER_DIGEST_QUERY}) s
+            LEFT JOIN etl_order_state e ON e.order_id = s.order_id
+            WHERE e.order_id IS NULL
+               OR e.digest_hi != s.digest_hi
+               OR e.digest_lo != s.digest_lo
+               OR e.row_count != s.row_count
+        """)
+        changed_ids = {row[0] for row in cursor_ops.execute("SELECT order_id FROM temp.changed_orders")}
+        counts["changed_orders"] = len(changed_ids)
+        print(f"✓ 扫描 {row_count:,} 行，发现 {len(changed_ids):,} 个新增/变化订单")
+
+        if changed_ids:
+            existing_orders = cursor_ops.execute("SELECT COUNT(*) FROM sales_orders").fetchone()[0]
+            rebuild_summary = len(changed_ids) >= SUMMARY_REBUILD_RATIO * existing_orders
+            if rebuild_summary:
+                drop_summary_triggers(conn_ops)
+
+            # 清除变化订单在非主键表中的旧记录
+            cursor_fin.execute("DROP TABLE IF EXISTS temp.changed_orders")
+            cursor_fin.execute("CREATE TEMP TABLE changed_orders (order_id TEXT PRIMARY KEY)")
+            cursor_fin.executemany("INSERT INTO temp.changed_orders VALUES (?)", ((oid,) for oid in changed_ids))
+            cursor_ops.execute("DELETE FROM shipping_logs WHERE order_id IN (SELECT order_id FROM temp.changed_orders)")
+            cursor_fin.execute(
+                "DELETE FROM general_ledger WHERE order_id IN (SELECT order_id FROM temp.changed_orders)"
+            )
+
+            # 第二遍：只写入变化订单的行
+            for chunk in self.read_raw_data_chunks(chunksize):
+                cols = self._resolve_columns(chunk)
+                chunk = chunk[self._text_column(chunk, cols["order_id"]).isin(changed_ids).to_numpy()]
+                if chunk.empty:
+                    continue
+
+                counts["sales_orders"] += self._bulk_insert(
+                    cursor_ops, SALES_ORDERS_UPSERT_SQL, self._build_sales_orders_frame(chunk), "订单记录"
+                )
+                counts["shipping_logs"] += self._bulk_insert(
+                    cursor_ops, SHIPPING_LOGS_INSERT_SQL, self._build_shipping_logs_frame(chunk), "物流记录"
+                )
+                if "sales" in cols:
+                    counts["general_ledger"] += self._bulk_insert(
+                        cursor_fin, GENERAL_LEDGER_INSERT_SQL, self._build_general_ledger_frame(chunk), "总账记录"
+                    )
+                    counts["accounts_receivable"] += self._bulk_insert(
+                        cursor_fin,
+                        ACCOUNTS_RECEIVABLE_UPSERT_SQL,
+                        self._build_accounts_receivable_frame(chunk),
+                        "应收账款记录",
+                    )
+
+            if rebuild_summary:
+                self._build_summary_tables(conn_ops)
+
+            cursor_ops.execute("""
+                INSERT INTO etl_order_state (order_id, digest_hi, digest_lo, row_count)
+                SELECT order_id, digest_hi, digest_lo, row_count FROM temp.changed_orders WHERE true
+                ON CONFLICT(order_id) DO UPDATE SET
+                    digest_hi = excluded.digest_hi,
+                    digest_lo = excluded.digest_lo,
+                    row_count = excluded.row_count,
+                    updated_at = CURRENT_TIMESTAMP
+            """)
+
+        if product_stats is not None:
+            changed_products = self._changed_products(conn_ops, self._finalize_product_stats(product_stats))
+            counts["products"] = self._bulk_insert(cursor_ops, PRODUCTS_INSERT_SQL, changed_products, "产品记录")
+
+        self._write_watermark(cursor_ops, csv_file.name, file_stat, row_count, len(changed_ids))
+
+        # 先提交 Finance：若随后失败，订单状态未推进，下次增量会安全地重做这些订单
+        conn_fin.commit()
+        conn_ops.commit()
+        conn_ops.close()
+        conn_fin.close()
+
+        print()
+        for table, count in counts.items():
+            print(f"✓ {table}: {count:,}")
+        return counts
+
+    def seed_incremental_state(self, chunksize: int = STREAM_CHUNK_SIZE, start_date: str = None, end_date: str = None):
+        """
+        为内存全量加载补记增量状态
+
+        内存加载读取的列类型与分块读取不同，订单摘要须按 load_incremental 的方式重新分块扫描源文件计算。
+        """
+        source_file = self.find_source_file()
+        file_stat = source_file.stat()
+        conn = sqlite3.connect(self.ops_db_path, factory=ProfiledConnection)
+        cursor = conn.cursor()
+        self._reset_incremental_state(cursor)
+        self._create_digest_staging(cursor)
+        row_count = 0
+        for chunk in self.read_raw_data_chunks(chunksize, start_date, end_date):
+            cols = self._resolve_columns(chunk)
+            if "order_id" not in cols:
+                break
+            self._stage_order_digests(cursor, chunk, cols["order_id"])
+            row_count += len(chunk)
+        windowed = bool(start_date or end_date)
+        self._write_incremental_state(cursor, source_file.name, None if windowed else file_stat, row_count)
+        conn.commit()
+        conn.close()
+
+    def _create_digest_staging(self, cursor: sqlite3.Cursor):
+        """创建暂存各数据块订单摘要的临时表"""
+        cursor.execute("DROP TABLE IF EXISTS temp.staged_order_digest")
+        cursor.execute(
+            "CREATE TEMP TABLE staged_order_digest (order_id TEXT, digest_hi INTEGER, digest_lo INTEGER, row_count INTEGER)"
+        )
+
+    def _stage_order_digests(self, cursor: sqlite3.Cursor, chunk: pd.DataFrame, order_id_col: str):
+        """暂存一个数据块的订单摘要（跨块的同一订单在 STAGED_ORDER_DIGEST_QUERY 中合并）"""
+        digests = self._order_digests(chunk, order_id_col)
+        cursor.executemany("INSERT INTO temp.staged_order_digest VALUES (?, ?, ?, ?)", self._frame_rows(digests))
+
+    def _write_incremental_state(
+        self, cursor: sqlite3.Cursor, source_name: str, file_stat: Optional[os.stat_result], row_count: int
+    ):
+        """
+        全量加载后写入暂存的订单摘要与源文件水位
+
+        摘要与 load_incremental 第一遍的计算方式相同，因此源文件未变化的订单在下次增量时不会被视为变化。
+        file_stat 为 None（只加载了部分源文件）时不写水位。
+        """
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO etl_order_state (order_id, digest_hi, digest_lo, row_count)
+            SELECT order_id, digest_hi, digest_lo, row_count FROM ({STAGED_ORDER_DIGEST_QUERY})
+        """)
+        orders = cursor.rowcount
+        if file_stat is not None:
+            self._write_watermark(cursor, source_name, file_stat, row_count, orders)
+        print(
+            f"✓ 增量状态: 记录 {orders:,} 个订单摘要" + ("" if file_stat is not None else "（日期窗口加载，未写水位）")
+        )
+
+    def _write_watermark(
+        self, cursor: sqlite3.Cursor, source_name: str, file_stat: os.stat_result, row_count: int, changed_orders: int
+    ):
+        """记录本次加载的源文件大小、修改时间与行数"""
+        max_order_date = cursor.execute("SELECT MAX(order_date) FROM sales_orders").fetchone()[0]
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO etl_watermarks
+            (source_name, file_size, file_mtime_ns, row_count, changed_orders, max_order_date, loaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """,
+            (source_name, file_stat.st_size, file_stat.st_mtime_ns, row_count, changed_orders, max_order_date),
+        )
+
+    def _order_digests(self, chunk: pd.DataFrame, order_id_col: str) -> pd.DataFrame:
+        """
+        计算数据块内每个订单的内容摘要
+
+        行哈希拆成高/低两段 31 位整数后按订单求和：求和与行顺序无关，跨块的同一订单
+        可以在 SQL 中继续 SUM 合并，且不会超出 SQLite 的 64 位整数范围。
+        """
+        chunk = chunk[chunk[order_id_col].notna()]
+        row_hash = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        return (
+            pd.DataFrame(
+                {
+                    "order_id": self._text_column(chunk, order_id_col),
+                    "digest_hi": (row_hash >> np.uint64(33)).astype(np.int64),
+                    "digest_lo": (row_hash & np.uint64(0x7FFFFFFF)).astype(np.int64),
+                    "row_count": 1,
+                }
+            )
+            .groupby("order_id", sort=False, as_index=False)
+            .sum()
+        )
+
+    def _changed_products(self, conn: sqlite3.Connection, products_df: pd.DataFrame) -> pd.DataFrame:
+        """与 products 表比对，只返回新增或名称/类别/价格发生变化的产品"""
+        current = pd.read_sql("SELECT product_id, product_name, product_category, product_price FROM products", conn)
+        merged = products_df.merge(current, on="product_id", how="left", suffixes=("", "_db"), indicator=True)
+
+        changed = merged["_merge"] == "left_only"
+        for col in ("product_name", "product_category"):
+            changed |= merged[col].fillna("") != merged[f"{col}_db"].fillna("")
+        price_diff = (merged["product_price"] - merged["product_price_db"]).abs()
+        changed |= price_diff.gt(1e-9) | (merged["product_price"].isna() != merged["product_price_db"].isna())
+
+        return products_df[changed.to_numpy()]
+
     def create_operations_db(self, df: pd.DataFrame):
         """创建运营数据库 (Operations DB)"""
         print("\n" + "=" * 60)
         print("创建 Operations 数据库 (db_operations.db)")
         print("=" * 60)
 
-        conn = sqlite3.connect(self.ops_db_path)
+        conn = sqlite3.connect(self.ops_db_path, factory=ProfiledConnection)
         cursor = conn.cursor()
 
+        self._create_operations_schema(cursor)
+        self._reset_incremental_state(cursor)
+        drop_managed_indexes(conn, "operations")
+        drop_summary_triggers(conn)
+        conn.commit()
+        print("✓ Operations 数据库表结构创建完成")
+
+        # 插入数据
+        self._insert_products_data(cursor, df)
+        self._insert_sales_orders_data(cursor, df)
+        self._insert_shipping_logs_data(cursor, df)
+
+        # 数据写入完成后再重算汇总、建索引
+        self._build_summary_tables(conn)
+        self._build_indexes(conn, "operations")
+
+        conn.commit()
+        conn.close()
+        print(f"✓ Operations 数据库初始化完成: {self.ops_db_path}")
+
+    def _create_operations_schema(self, cursor: sqlite3.Cursor):
+        """创建 Operations 数据库表结构"""
         # 1. 产品表 (products)
         print("\n创建 products 表...")
         cursor.execute("""
@@ -133,287 +817,203 @@ class ERPDatabaseInitializer:
             )
         """)
 
-        conn.commit()
-        print("✓ Operations 数据库表结构创建完成")
+        # 4. 增量加载状态 (etl_watermarks / etl_order_state)
+        print("创建 etl_watermarks / etl_order_state 表...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS etl_watermarks (
+                source_name TEXT PRIMARY KEY,
+                file_size INTEGER,
+                file_mtime_ns INTEGER,
+                row_count INTEGER,
+                changed_orders INTEGER,
+                max_order_date DATE,
+                loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS etl_order_state (
+                order_id TEXT PRIMARY KEY,
+                digest_hi INTEGER,
+                digest_lo INTEGER,
+                row_count INTEGER,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
-        # 插入数据
-        self._insert_products_data(cursor, df)
-        self._insert_sales_orders_data(cursor, df)
-        self._insert_shipping_logs_data(cursor, df)
+        # 5. 月 × 国家 × 品类 × 分段汇总 (sales_monthly_summary)
+        print("创建 sales_monthly_summary 表...")
+        create_summary_schema(cursor)
 
-        conn.commit()
-        conn.close()
-        print(f"✓ Operations 数据库初始化完成: {self.ops_db_path}")
+    def _reset_incremental_state(self, cursor: sqlite3.Cursor):
+        """全量加载前清空增量状态（加载完成后由 _write_incremental_state 重新写入）"""
+        cursor.execute("DELETE FROM etl_watermarks")
+        cursor.execute("DELETE FROM etl_order_state")
 
     def _insert_products_data(self, cursor: sqlite3.Cursor, df: pd.DataFrame):
         """插入产品数据"""
         print("\n插入 products 数据...")
 
-        # 智能映射列名（处理不同的列名变体）
-        product_cols = {
-            "id": ["Product ID", "Product Card Id", "product_id", "ProductId"],
-            "name": ["Product Name", "product_name", "ProductName"],
-            "category": ["Category Name", "category_name", "Category", "category"],
-            "price": ["Sales", "sales", "Product Price", "price"],
-            "cost": ["Order Item Product Price", "Cost", "cost"],
-            "margin": ["Order Profit Per Order", "Profit", "profit", "margin"],
-        }
-
-        # 查找实际存在的列
-        product_id_col = self._find_column(df, product_cols["id"])
-        product_name_col = self._find_column(df, product_cols["name"])
-        category_col = self._find_column(df, product_cols["category"])
-
-        if not product_id_col:
+        if not self._find_column(df, COLUMN_ALIASES["product_id"]):
             print("⚠️  未找到产品ID列，跳过产品数据插入")
             return
 
-        # 获取唯一产品
-        if product_name_col:
-            products_df = df[[product_id_col, product_name_col, category_col]].drop_duplicates(subset=[product_id_col])
-        else:
-            products_df = df[[product_id_col]].drop_duplicates()
-            products_df[product_name_col] = None
-            products_df[category_col] = None
-
-        # 计算价格和成本（从订单数据聚合）
-        sales_col = self._find_column(df, product_cols["price"])
-        if sales_col:
-            price_df = df.groupby(product_id_col)[sales_col].mean().reset_index()
-            price_df.columns = [product_id_col, "avg_price"]
-            products_df = products_df.merge(price_df, on=product_id_col, how="left")
-        else:
-            products_df["avg_price"] = None
-
-        # 插入数据
-        inserted = 0
-        for _, row in products_df.iterrows():
-            try:
-                cursor.execute(
-                    """
-                    INSERT OR REPLACE INTO products
-                    (product_id, product_name, product_category, product_price)
-                    VALUES (?, ?, ?, ?)
-                """,
-                    (
-                        str(row[product_id_col]),
-                        str(row[product_name_col]) if product_name_col and pd.notna(row[product_name_col]) else None,
-                        str(row[category_col]) if category_col and pd.notna(row[category_col]) else None,
-                        float(row["avg_price"]) if "avg_price" in row and pd.notna(row["avg_price"]) else None,
-                    ),
-                )
-                inserted += 1
-            except Exception as e:
-                print(f"⚠️  插入产品失败: {e}")
-
-        print(f"✓ 插入 {inserted:,} 条产品记录")
+        products_df = self._finalize_product_stats(self._accumulate_product_stats(None, df))
+        inserted = self._bulk_insert(cursor, PRODUCTS_INSERT_SQL, products_df, "产品记录")
+        print(f"\n✓ 插入 {inserted:,} 条产品记录")
+
+    def _accumulate_product_stats(self, stats: Optional[pd.DataFrame], df: pd.DataFrame) -> pd.DataFrame:
+        """
+        累积产品统计：首次出现的名称/类别 + 销售额合计与计数
+
+        结果规模与产品数量相关，与订单行数无关，因此可以跨数据块累积。
+        """
+        cols = self._resolve_columns(df)
+        df = df[df[cols["product_id"]].notna()]
+        price = (
+            pd.to_numeric(df[cols["product_price"]], errors="coerce")
+            if "product_price" in cols
+            else pd.Series(np.nan, index=df.index)
+        )
+
+        chunk_stats = (
+            pd.DataFrame(
+                {
+                    "product_id": self._text_column(df, cols["product_id"]),
+                    "product_name": self._text_column(df, cols.get("product_name")),
+                    "product_category": self._text_column(df, cols.get("category")),
+                    "price_sum": price.fillna(0.0),
+                    "price_count": price.notna().astype(int),
+                }
+            )
+            .groupby("product_id", sort=False)
+            .agg(PRODUCT_STATS_AGG)
+        )
+
+        if stats is None:
+            return chunk_stats
+        return pd.concat([stats, chunk_stats]).groupby(level=0, sort=False).agg(PRODUCT_STATS_AGG)
+
+    def _finalize_product_stats(self, stats: pd.DataFrame) -> pd.DataFrame:
+        """将累积统计转换为 products 表行（价格 = 订单销售额均值）"""
+        price = stats["price_sum"] / stats["price_count"].where(stats["price_count"] > 0)
+        return pd.DataFrame(
+            {
+                "product_id": stats.index,
+                "product_name": stats["product_name"].to_numpy(),
+                "product_category": stats["product_category"].to_numpy(),
+                "product_price": price.to_numpy(),
+            }
+        )
 
     def _insert_sales_orders_data(self, cursor: sqlite3.Cursor, df: pd.DataFrame):
         """插入销售订单数据"""
         print("\n插入 sales_orders 数据...")
 
-        # 智能列名映射
-        col_mapping = {
-            "order_id": ["Order ID", "order_id", "OrderId"],
-            "order_date": ["order date (DateOrders)", "Order Date", "order_date"],
-            "customer_id": ["Customer ID", "customer_id", "CustomerId"],
-            "customer_name": ["Customer Name", "customer_name"],
-            "customer_segment": ["Customer Segment", "customer_segment"],
-            "customer_country": ["Customer Country", "customer_country", "Country"],
-            "customer_city": ["Customer City", "customer_city", "City"],
-            "product_id": ["Product ID", "Product Card Id", "product_id"],
-            "product_name": ["Product Name", "product_name"],
-            "category": ["Category Name", "category_name", "Category"],
-            "quantity": ["Order Item Quantity", "Quantity", "quantity"],
-            "sales": ["Sales", "sales"],
-            "discount": ["Order Item Discount", "Discount", "discount"],
-            "profit": ["Order Profit Per Order", "Profit", "profit"],
-            "status": ["Order Status", "order_status", "OrderStatus"],
-            "priority": ["Order Priority", "order_priority"],
-            "shipment_scheduled": ["Days for shipment (scheduled)", "days_for_shipment_scheduled"],
-            "shipment_real": ["Days for shipment (real)", "days_for_shipment_real"],
-            "delivery_status": ["Delivery Status", "delivery_status"],
-            "late_delivery_risk": ["Late_delivery_risk", "late_delivery_risk"],
-        }
-
-        # 构建实际列名映射
-        actual_cols = {}
-        for key, possible_names in col_mapping.items():
-            found = self._find_column(df, possible_names)
-            if found:
-                actual_cols[key] = found
-
-        if "order_id" not in actual_cols:
+        if not self._find_column(df, COLUMN_ALIASES["order_id"]):
             print("⚠️  未找到订单ID列，跳过订单数据插入")
             return
 
-        # 准备插入数据
-        inserted = 0
-        batch_size = 1000
-
-        for i in range(0, len(df), batch_size):
-            batch = df.iloc[i : i + batch_size]
-            values_list = []
-
-            for _, row in batch.iterrows():
-                try:
-                    # 提取日期信息
-                    order_date = None
-                    if "order_date" in actual_cols:
-                        date_val = row[actual_cols["order_date"]]
-                        if pd.notna(date_val):
-                            with contextlib.suppress(BaseException):
-                                order_date = pd.to_datetime(date_val).date()
-
-                    # 提取年月日
-                    order_year = order_date.year if order_date else None
-                    order_month = order_date.month if order_date else None
-                    order_day = order_date.day if order_date else None
-
-                    values = (
-                        str(row[actual_cols["order_id"]]),
-                        order_date,
-                        str(row[actual_cols.get("customer_id", "order_id")])
-                        if "customer_id" in actual_cols
-                        else str(row[actual_cols["order_id"]]),
-                        str(row[actual_cols.get("customer_name", "")]) if "customer_name" in actual_cols else None,
-                        str(row[actual_cols.get("customer_segment", "")])
-                        if "customer_segment" in actual_cols
-                        else None,
-                        str(row[actual_cols.get("customer_country", "")])
-                        if "customer_country" in actual_cols
-                        else None,
-                        str(row[actual_cols.get("customer_city", "")]) if "customer_city" in actual_cols else None,
-                        str(row[actual_cols.get("product_id", "")]) if "product_id" in actual_cols else None,
-                        str(row[actual_cols.get("product_name", "")]) if "product_name" in actual_cols else None,
-                        str(row[actual_cols.get("category", "")]) if "category" in actual_cols else None,
-                        int(row[actual_cols.get("quantity", 0)])
-                        if "quantity" in actual_cols and pd.notna(row[actual_cols["quantity"]])
-                        else 0,
-                        float(row[actual_cols.get("sales", 0)])
-                        if "sales" in actual_cols and pd.notna(row[actual_cols["sales"]])
-                        else 0.0,
-                        float(row[actual_cols.get("discount", 0)])
-                        if "discount" in actual_cols and pd.notna(row[actual_cols["discount"]])
-                        else 0.0,
-                        float(row[actual_cols.get("profit", 0)])
-                        if "profit" in actual_cols and pd.notna(row[actual_cols["profit"]])
-                        else 0.0,
-                        str(row[actual_cols.get("status", "")]) if "status" in actual_cols else None,
-                        str(row[actual_cols.get("priority", "")]) if "priority" in actual_cols else None,
-                        order_year,
-                        order_month,
-                        order_day,
-                        int(row[actual_cols.get("shipment_scheduled", 0)])
-                        if "shipment_scheduled" in actual_cols and pd.notna(row[actual_cols["shipment_scheduled"]])
-                        else None,
-                        int(row[actual_cols.get("shipment_real", 0)])
-                        if "shipment_real" in actual_cols and pd.notna(row[actual_cols["shipment_real"]])
-                        else None,
-                        str(row[actual_cols.get("delivery_status", "")]) if "delivery_status" in actual_cols else None,
-                        int(row[actual_cols.get("late_delivery_risk", 0)])
-                        if "late_delivery_risk" in actual_cols and pd.notna(row[actual_cols["late_delivery_risk"]])
-                        else 0,
-                    )
-                    values_list.append(values)
-                except Exception:  # nosec B112
-                    continue
-
-            # 批量插入
-            if values_list:
-                cursor.executemany(
-                    """
-                    INSERT OR REPLACE INTO sales_orders
-                    (order_id, order_date, customer_id, customer_name, customer_segment,
-                     customer_country, customer_city, product_id, product_name, category_name,
-                     order_quantity, sales, discount, profit, order_status, order_priority,
-                     order_year, order_month, order_day, days_for_shipment_scheduled,
-                     days_for_shipment_real, delivery_status, late_delivery_risk)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    values_list,
-                )
-                inserted += len(values_list)
-                print(f"  已插入 {inserted:,} / {len(df):,} 条订单记录...", end="\r")
-
+        orders_df = self._build_sales_orders_frame(df)
+        inserted = self._bulk_insert(cursor, SALES_ORDERS_INSERT_SQL, orders_df, "订单记录")
         print(f"\n✓ 插入 {inserted:,} 条销售订单记录")
 
+    def _build_sales_orders_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """整列构建 sales_orders 行（日期、年月日等派生列均为向量化计算）"""
+        cols = self._resolve_columns(df)
+        df = df[df[cols["order_id"]].notna()]
+        order_date = self._parse_dates(df[cols["order_date"]]) if "order_date" in cols else None
+        order_id = self._text_column(df, cols["order_id"])
+
+        return pd.DataFrame(
+            {
+                "order_id": order_id,
+                "order_date": self._date_text(order_date, df.index),
+                "customer_id": self._text_column(df, cols["customer_id"]) if "customer_id" in cols else order_id,
+                "customer_name": self._text_column(df, cols.get("customer_name")),
+                "customer_segment": self._text_column(df, cols.get("customer_segment")),
+                "customer_country": self._text_column(df, cols.get("customer_country")),
+                "customer_city": self._text_column(df, cols.get("customer_city")),
+                "product_id": self._text_column(df, cols.get("product_id")),
+                "product_name": self._text_column(df, cols.get("product_name")),
+                "category_name": self._text_column(df, cols.get("category")),
+                "order_quantity": self._numeric_column(df, cols.get("quantity"), default=0, integer=True),
+                "sales": self._numeric_column(df, cols.get("sales"), default=0.0),
+                "discount": self._numeric_column(df, cols.get("discount"), default=0.0),
+                "profit": self._numeric_column(df, cols.get("profit"), default=0.0),
+                "order_status": self._text_column(df, cols.get("status")),
+                "order_priority": self._text_column(df, cols.get("priority")),
+                "order_year": self._date_part(order_date, "year", df.index),
+                "order_month": self._date_part(order_date, "month", df.index),
+                "order_day": self._date_part(order_date, "day", df.index),
+                "days_for_shipment_scheduled": self._numeric_column(df, cols.get("shipment_scheduled"), integer=True),
+                "days_for_shipment_real": self._numeric_column(df, cols.get("shipment_real"), integer=True),
+                "delivery_status": self._text_column(df, cols.get("delivery_status")),
+                "late_delivery_risk": self._numeric_column(df, cols.get("late_delivery_risk"), default=0, integer=True),
+            }
+        )
+
     def _insert_shipping_logs_data(self, cursor: sqlite3.Cursor, df: pd.DataFrame):
         """插入物流日志数据"""
         print("\n插入 shipping_logs 数据...")
 
-        # 查找相关列
-        order_id_col = self._find_column(df, ["Order ID", "order_id", "OrderId"])
-        shipping_mode_col = self._find_column(df, ["Shipping Mode", "shipping_mode", "Type"])
-        order_date_col = self._find_column(df, ["order date (DateOrders)", "Order Date", "order_date"])
-
-        if not order_id_col:
+        if not self._find_column(df, COLUMN_ALIASES["order_id"]):
             print("⚠️  未找到订单ID列，跳过物流日志插入")
             return
 
-        # 准备数据
-        inserted = 0
-        batch_size = 1000
-
-        for i in range(0, len(df), batch_size):
-            batch = df.iloc[i : i + batch_size]
-            values_list = []
-
-            for _, row in batch.iterrows():
-                try:
-                    order_date = None
-                    if order_date_col:
-                        date_val = row[order_date_col]
-                        if pd.notna(date_val):
-                            with contextlib.suppress(BaseException):
-                                order_date = pd.to_datetime(date_val).date()
-
-                    values = (
-                        str(row[order_id_col]),
-                        str(row[shipping_mode_col]) if shipping_mode_col and pd.notna(row[shipping_mode_col]) else None,
-                        order_date,
-                        int(row.get("Days for shipment (scheduled)", 0))
-                        if pd.notna(row.get("Days for shipment (scheduled)", 0))
-                        else None,
-                        int(row.get("Days for shipment (real)", 0))
-                        if pd.notna(row.get("Days for shipment (real)", 0))
-                        else None,
-                        str(row.get("Delivery Status", "")) if pd.notna(row.get("Delivery Status", "")) else None,
-                        int(row.get("Late_delivery_risk", 0)) if pd.notna(row.get("Late_delivery_risk", 0)) else 0,
-                        str(row.get("Customer Country", "")) if pd.notna(row.get("Customer Country", "")) else None,
-                        str(row.get("Customer City", "")) if pd.notna(row.get("Customer City", "")) else None,
-                        str(row.get("Market", "")) if pd.notna(row.get("Market", "")) else None,
-                        str(row.get("Region", "")) if pd.notna(row.get("Region", "")) else None,
-                    )
-                    values_list.append(values)
-                except Exception:  # nosec B112 - data loading fallback
-                    continue
-
-            if values_list:
-                cursor.executemany(
-                    """
-                    INSERT INTO shipping_logs
-                    (order_id, shipping_mode, shipping_date, days_for_shipment_scheduled,
-                     days_for_shipment_real, delivery_status, late_delivery_risk,
-                     customer_country, customer_city, market, region)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    values_list,
-                )
-                inserted += len(values_list)
-                print(f"  已插入 {inserted:,} / {len(df):,} 条物流记录...", end="\r")
-
+        logs_df = self._build_shipping_logs_frame(df)
+        inserted = self._bulk_insert(cursor, SHIPPING_LOGS_INSERT_SQL, logs_df, "物流记录")
         print(f"\n✓ 插入 {inserted:,} 条物流日志记录")
 
+    def _build_shipping_logs_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """整列构建 shipping_logs 行（源文件没有发货日期列时以订单日期代替）"""
+        cols = self._resolve_columns(df)
+        df = df[df[cols["order_id"]].notna()]
+        date_col = cols.get("shipping_date", cols.get("order_date"))
+        shipping_date = self._parse_dates(df[date_col]) if date_col else None
+
+        return pd.DataFrame(
+            {
+                "order_id": self._text_column(df, cols["order_id"]),
+                "shipping_mode": self._text_column(df, cols.get("shipping_mode")),
+                "shipping_date": self._date_text(shipping_date, df.index),
+                "days_for_shipment_scheduled": self._numeric_column(df, cols.get("shipment_scheduled"), integer=True),
+                "days_for_shipment_real": self._numeric_column(df, cols.get("shipment_real"), integer=True),
+                "delivery_status": self._text_column(df, cols.get("delivery_status")),
+                "late_delivery_risk": self._numeric_column(df, cols.get("late_delivery_risk"), default=0, integer=True),
+                "customer_country": self._text_column(df, cols.get("customer_country")),
+                "customer_city": self._text_column(df, cols.get("customer_city")),
+                "market": self._text_column(df, cols.get("market")),
+                "region": self._text_column(df, cols.get("region")),
+            }
+        )
+
     def create_finance_db(self, df: pd.DataFrame):
         """创建财务数据库 (Finance DB)"""
         print("\n" + "=" * 60)
         print("创建 Finance 数据库 (db_finance.db)")
         print("=" * 60)
 
-        conn = sqlite3.connect(self.finance_db_path)
+        conn = sqlite3.connect(self.finance_db_path, factory=ProfiledConnection)
         cursor = conn.cursor()
 
+        self._create_finance_schema(cursor)
+        drop_managed_indexes(conn, "finance")
+        conn.commit()
+        print("✓ Finance 数据库表结构创建完成")
+
+        # 插入数据
+        self._insert_general_ledger_data(cursor, df)
+        self._insert_accounts_receivable_data(cursor, df)
+
+        # 数据写入完成后再建索引
+        self._build_indexes(conn, "finance")
+
+        conn.commit()
+        conn.close()
+        print(f"✓ Finance 数据库初始化完成: {self.finance_db_path}")
+
+    def _create_finance_schema(self, cursor: sqlite3.Cursor):
+        """创建 Finance 数据库表结构"""
         # 1. 总账表 (general_ledger)
         print("\n创建 general_ledger 表...")
         cursor.execute("""
@@ -451,197 +1051,117 @@ class ERPDatabaseInitializer:
             )
         """)
 
-        conn.commit()
-        print("✓ Finance 数据库表结构创建完成")
-
-        # 插入数据
-        self._insert_general_ledger_data(cursor, df)
-        self._insert_accounts_receivable_data(cursor, df)
-
-        conn.commit()
-        conn.close()
-        print(f"✓ Finance 数据库初始化完成: {self.finance_db_path}")
-
     def _insert_general_ledger_data(self, cursor: sqlite3.Cursor, df: pd.DataFrame):
         """插入总账数据（从订单数据生成）"""
         print("\n插入 general_ledger 数据...")
 
-        order_id_col = self._find_column(df, ["Order ID", "order_id", "OrderId"])
-        order_date_col = self._find_column(df, ["order date (DateOrders)", "Order Date", "order_date"])
-        sales_col = self._find_column(df, ["Sales", "sales"])
-        profit_col = self._find_column(df, ["Order Profit Per Order", "Profit", "profit"])
-
-        if not order_id_col or not sales_col:
+        if not self._find_column(df, COLUMN_ALIASES["order_id"]) or not self._find_column(df, COLUMN_ALIASES["sales"]):
             print("⚠️  缺少必要列，跳过总账数据插入")
             return
 
-        inserted = 0
-        batch_size = 1000
-
-        for i in range(0, len(df), batch_size):
-            batch = df.iloc[i : i + batch_size]
-            values_list = []
-
-            for _, row in batch.iterrows():
-                try:
-                    transaction_date = None
-                    if order_date_col:
-                        date_val = row[order_date_col]
-                        if pd.notna(date_val):
-                            with contextlib.suppress(BaseException):
-                                transaction_date = pd.to_datetime(date_val).date()
-
-                    sales = float(row[sales_col]) if pd.notna(row[sales_col]) else 0.0
-                    profit = float(row[profit_col]) if profit_col and pd.notna(row[profit_col]) else 0.0
-                    cost = sales - profit
-
-                    order_id = str(row[order_id_col])
-
-                    # 创建两条总账记录：收入（贷方）和成本（借方）
-                    # 收入记录
-                    values_list.append(
-                        (
-                            transaction_date,
-                            order_id,
-                            "4000",  # 收入账户代码
-                            "Sales Revenue",
-                            0.0,  # 借方
-                            sales,  # 贷方
-                            f"Sales for Order {order_id}",
-                            order_id,
-                        )
-                    )
-
-                    # 成本记录
-                    if cost > 0:
-                        values_list.append(
-                            (
-                                transaction_date,
-                                order_id,
-                                "5000",  # 成本账户代码
-                                "Cost of Goods Sold",
-                                cost,  # 借方
-                                0.0,  # 贷方
-                                f"COGS for Order {order_id}",
-                                order_id,
-                            )
-                        )
-
-                except Exception:  # nosec B112 - ledger generation fallback
-                    continue
-
-            if values_list:
-                cursor.executemany(
-                    """
-                    INSERT INTO general_ledger
-                    (transaction_date, order_id, account_code, account_name,
-                     debit_amount, credit_amount, description, reference_number)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    values_list,
-                )
-                inserted += len(values_list)
-                print(f"  已插入 {inserted:,} 条总账记录...", end="\r")
-
+        ledger_df = self._build_general_ledger_frame(df)
+        inserted = self._bulk_insert(cursor, GENERAL_LEDGER_INSERT_SQL, ledger_df, "总账记录")
         print(f"\n✓ 插入 {inserted:,} 条总账记录")
 
+    def _build_general_ledger_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        整列构建总账分录
+
+        每笔订单生成一条收入记录（贷方），成本为正时再生成一条成本记录（借方），
+        两条记录按原始行顺序交错排列。
+        """
+        cols = self._resolve_columns(df)
+        df = df[df[cols["order_id"]].notna()]
+        transaction_date = self._parse_dates(df[cols["order_date"]]) if "order_date" in cols else None
+
+        order_id = self._text_column(df, cols["order_id"])
+        date_text = self._date_text(transaction_date, df.index)
+        sales = self._numeric_column(df, cols["sales"], default=0.0)
+        profit = self._numeric_column(df, cols.get("profit"), default=0.0)
+        cost = sales - profit
+        position = np.arange(len(df)) * 2
+
+        # 收入记录（4000 - 贷方）
+        revenue = pd.DataFrame(
+            {
+                "transaction_date": date_text,
+                "order_id": order_id,
+                "account_code": "4000",
+                "account_name": "Sales Revenue",
+                "debit_amount": 0.0,
+                "credit_amount": sales,
+                "description": "Sales for Order " + order_id,
+                "reference_number": order_id,
+                "_position": position,
+            }
+        )
+
+        # 成本记录（5000 - 借方），仅在成本为正时生成
+        cogs = pd.DataFrame(
+            {
+                "transaction_date": date_text,
+                "order_id": order_id,
+                "account_code": "5000",
+                "account_name": "Cost of Goods Sold",
+                "debit_amount": cost,
+                "credit_amount": 0.0,
+                "description": "COGS for Order " + order_id,
+                "reference_number": order_id,
+                "_position": position + 1,
+            }
+        )[(cost > 0).to_numpy()]
+
+        ledger_df = pd.concat([revenue, cogs], ignore_index=True)
+        return ledger_df.sort_values("_position", kind="stable").drop(columns="_position")
+
     def _insert_accounts_receivable_data(self, cursor: sqlite3.Cursor, df: pd.DataFrame):
         """插入应收账款数据"""
         print("\n插入 accounts_receivable 数据...")
 
-        order_id_col = self._find_column(df, ["Order ID", "order_id", "OrderId"])
-        order_date_col = self._find_column(df, ["order date (DateOrders)", "Order Date", "order_date"])
-        sales_col = self._find_column(df, ["Sales", "sales"])
-        customer_id_col = self._find_column(df, ["Customer ID", "customer_id", "CustomerId"])
-        customer_name_col = self._find_column(df, ["Customer Name", "customer_name"])
-        order_status_col = self._find_column(df, ["Order Status", "order_status", "OrderStatus"])
-
-        if not order_id_col or not sales_col:
+        if not self._find_column(df, COLUMN_ALIASES["order_id"]) or not self._find_column(df, COLUMN_ALIASES["sales"]):
             print("⚠️  缺少必要列，跳过应收账款数据插入")
             return
 
-        inserted = 0
-        batch_size = 1000
-
-        for i in range(0, len(df), batch_size):
-            batch = df.iloc[i : i + batch_size]
-            values_list = []
-
-            for _, row in batch.iterrows():
-                try:
-                    invoice_date = None
-                    if order_date_col:
-                        date_val = row[order_date_col]
-                        if pd.notna(date_val):
-                            with contextlib.suppress(BaseException):
-                                invoice_date = pd.to_datetime(date_val).date()
-
-                    # 假设账期为30天
-                    due_date = None
-                    if invoice_date:
-                        from datetime import timedelta
-
-                        due_date = invoice_date + timedelta(days=30)
-
-                    invoice_amount = float(row[sales_col]) if pd.notna(row[sales_col]) else 0.0
-                    order_status = (
-                        str(row[order_status_col])
-                        if order_status_col and pd.notna(row[order_status_col])
-                        else "Unknown"
-                    )
-
-                    # 根据订单状态判断支付状态
-                    if "Complete" in order_status or "Completed" in order_status:
-                        paid_amount = invoice_amount
-                        outstanding_amount = 0.0
-                        payment_status = "Paid"
-                    elif "Cancel" in order_status or "Cancelled" in order_status:
-                        paid_amount = 0.0
-                        outstanding_amount = 0.0
-                        payment_status = "Cancelled"
-                    else:
-                        paid_amount = 0.0
-                        outstanding_amount = invoice_amount
-                        payment_status = "Outstanding"
-
-                    values = (
-                        str(row[order_id_col]),
-                        str(row[customer_id_col]) if customer_id_col and pd.notna(row[customer_id_col]) else None,
-                        str(row[customer_name_col]) if customer_name_col and pd.notna(row[customer_name_col]) else None,
-                        invoice_date,
-                        due_date,
-                        invoice_amount,
-                        paid_amount,
-                        outstanding_amount,
-                        payment_status,
-                        0,  # days_past_due
-                    )
-                    values_list.append(values)
-                except Exception:  # nosec B112 - AR data loading fallback
-                    continue
-
-            if values_list:
-                cursor.executemany(
-                    """
-                    INSERT OR REPLACE INTO accounts_receivable
-                    (order_id, customer_id, customer_name, invoice_date, due_date,
-                     invoice_amount, paid_amount, outstanding_amount, payment_status, days_past_due)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    values_list,
-                )
-                inserted += len(values_list)
-                print(f"  已插入 {inserted:,} 条应收账款记录...", end="\r")
-
+        ar_df = self._build_accounts_receivable_frame(df)
+        inserted = self._bulk_insert(cursor, ACCOUNTS_RECEIVABLE_INSERT_SQL, ar_df, "应收账款记录")
         print(f"\n✓ 插入 {inserted:,} 条应收账款记录")
 
+    def _build_accounts_receivable_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """整列构建应收账款（账期 30 天，支付状态由订单状态推导）"""
+        cols = self._resolve_columns(df)
+        df = df[df[cols["order_id"]].notna()]
+        invoice_date = self._parse_dates(df[cols["order_date"]]) if "order_date" in cols else None
+        due_date = invoice_date.dt.normalize() + pd.Timedelta(days=30) if invoice_date is not None else None
+
+        invoice_amount = self._numeric_column(df, cols["sales"], default=0.0)
+        order_status = self._text_column(df, cols.get("status")).fillna("Unknown")
+
+        # 根据订单状态判断支付状态
+        is_paid = order_status.str.contains("Complete", regex=False).to_numpy(dtype=bool)
+        is_cancelled = ~is_paid & order_status.str.contains("Cancel", regex=False).to_numpy(dtype=bool)
+
+        return pd.DataFrame(
+            {
+                "order_id": self._text_column(df, cols["order_id"]),
+                "customer_id": self._text_column(df, cols.get("customer_id")),
+                "customer_name": self._text_column(df, cols.get("customer_name")),
+                "invoice_date": self._date_text(invoice_date, df.index),
+                "due_date": self._date_text(due_date, df.index),
+                "invoice_amount": invoice_amount,
+                "paid_amount": np.where(is_paid, invoice_amount, 0.0),
+                "outstanding_amount": np.where(is_paid | is_cancelled, 0.0, invoice_amount),
+                "payment_status": np.select([is_paid, is_cancelled], ["Paid", "Cancelled"], "Outstanding"),
+                "days_past_due": 0,
+            }
+        )
+
     def create_audit_db(self):
         """创建审计数据库 (Audit DB) - 空表结构"""
         print("\n" + "=" * 60)
         print("创建 Audit 数据库 (audit.db)")
         print("=" * 60)
 
-        conn = sqlite3.connect(self.audit_db_path)
+        conn = sqlite3.connect(self.audit_db_path, factory=ProfiledConnection)
         cursor = conn.cursor()
 
         # 1. 审计日志表 (audit_logs)
@@ -661,7 +1181,9 @@ class ERPDatabaseInitializer:
                 auditor_name TEXT,
                 notes TEXT,
                 risk_level TEXT,
-                status TEXT DEFAULT 'Pending'
+                status TEXT DEFAULT 'Pending',
+                first_seen_run TEXT,
+                last_seen_run TEXT
             )
         """)
 
@@ -692,6 +1214,8 @@ class ERPDatabaseInitializer:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_risk_flags_status ON risk_flags(status)")
 
         conn.commit()
+        # 发现唯一键、规则状态表、运行记录表与 audit_findings 视图
+        ensure_audit_schema(conn)
         conn.close()
         print("✓ Audit 数据库表结构创建完成（空表）")
         print(f"✓ Audit 数据库初始化完成: {self.audit_db_path}")
@@ -707,17 +1231,97 @@ class ERPDatabaseInitializer:
 
         return None
 
-    def verify_databases(self):
-        """验证数据库创建成功"""
+    def _resolve_columns(self, df: pd.DataFrame) -> Dict[str, str]:
+        """按 COLUMN_ALIASES 解析源列名，只返回实际存在的字段"""
+        resolved = {}
+        for key, possible_names in COLUMN_ALIASES.items():
+            found = self._find_column(df, possible_names)
+            if found:
+                resolved[key] = found
+        return resolved
+
+    def _text_column(self, df: pd.DataFrame, col: Optional[str]) -> pd.Series:
+        """整列转为文本，缺失值（或缺失的源列）记为 None"""
+        if not col:
+            return pd.Series(None, index=df.index, dtype=object)
+        values = df[col]
+        return values.astype(str).astype(object).where(values.notna(), None)
+
+    def _numeric_column(self, df: pd.DataFrame, col: Optional[str], default=None, integer: bool = False) -> pd.Series:
+        """整列转为数值，无法解析的值使用默认值；integer=True 时按 int() 语义截断"""
+        if not col:
+            return pd.Series(default, index=df.index, dtype=object if default is None else None)
+        values = pd.to_numeric(df[col], errors="coerce")
+        if integer:
+            values = np.trunc(values).astype("Int64")
+        return values if default is None else values.fillna(default)
+
+    def _parse_dates(self, values: pd.Series) -> pd.Series:
+        """整列解析日期（见 parse_dates）"""
+        return parse_dates(values)
+
+    def _date_text(self, dates: Optional[pd.Series], index: pd.Index) -> pd.Series:
+        """日期列格式化为 YYYY-MM-DD 文本，NaT 记为 None"""
+        if dates is None:
+            return pd.Series(None, index=index, dtype=object)
+        text = np.datetime_as_string(dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]"), unit="D")
+        return pd.Series(text, index=index, dtype=object).where(dates.notna(), None)
+
+    def _date_part(self, dates: Optional[pd.Series], part: str, index: pd.Index) -> pd.Series:
+        """提取日期的年/月/日分量"""
+        if dates is None:
+            return pd.Series(None, index=index, dtype=object)
+        return getattr(dates.dt, part).astype("Int64")
+
+    def _frame_rows(self, frame: pd.DataFrame) -> Iterator[Tuple]:
+        """按列将 DataFrame 转换为 Python 原生类型的元组流（NaN/NA -> None）"""
+        columns = [frame[col].astype(object).where(frame[col].notna(), None).tolist() for col in frame.columns]
+        return zip(*columns)
+
+    def _bulk_insert(self, cursor: sqlite3.Cursor, sql: str, frame: pd.DataFrame, label: str) -> int:
+        """分批 executemany 写入（调用方负责在整个加载结束后统一提交事务）"""
+        total = len(frame)
+        inserted = 0
+        for start in range(0, total, self.batch_size):
+            batch = frame.iloc[start : start + self.batch_size]
+            cursor.executemany(sql, self._frame_rows(batch))
+            inserted += len(batch)
+            print(f"  已插入 {inserted:,} / {total:,} 条{label}...", end="\r")
+        return inserted
+
+    def _build_summary_tables(self, conn: sqlite3.Connection):
+        """批量加载结束后重算汇总表并创建维护触发器（见 src/data_engineering/summary_tables.py）"""
+        with profile_stage("build_summary_tables"):
+            groups = rebuild_summary_tables(conn)
+        print(f"\n✓ 重算 sales_monthly_summary: {groups:,} 个汇总组")
+
+    def _build_indexes(self, conn: sqlite3.Connection, database: str):
+        """批量加载结束后创建受管索引（见 src/data_engineering/indexes.py）"""
+        with profile_stage(f"build_indexes({database})"):
+            names = create_managed_indexes(conn, database)
+        print(f"\n✓ 创建 {len(names)} 个索引: {', '.join(names)}")
+
+    def verify_databases(self) -> bool:
+        """
+        验证数据库创建成功：打印各表记录数并检查受管索引是否齐全
+
+        Returns:
+            三个数据库均存在且受管索引无缺失时为 True
+        """
         print("\n" + "=" * 60)
         print("验证数据库")
         print("=" * 60)
 
-        databases = [(self.ops_db_path, "Operations"), (self.finance_db_path, "Finance"), (self.audit_db_path, "Audit")]
+        databases = [
+            (self.ops_db_path, "Operations", "operations"),
+            (self.finance_db_path, "Finance", "finance"),
+            (self.audit_db_path, "Audit", "audit"),
+        ]
 
-        for db_path, db_name in databases:
+        ok = True
+        for db_path, db_name, db_key in databases:
             if db_path.exists():
-                conn = sqlite3.connect(db_path)
+                conn = sqlite3.connect(db_path, factory=ProfiledConnection)
                 cursor = conn.cursor()
 
                 # 获取所有表
@@ -730,12 +1334,47 @@ class ERPDatabaseInitializer:
                     count = cursor.fetchone()[0]
                     print(f"  - {table[0]}: {count:,} 条记录")
 
+                # 受管索引
+                missing = missing_indexes(conn, db_key)
+                for spec in managed_indexes(db_key):
+                    mark = "❌" if spec.name in missing else "✓"
+                    print(f"  {mark} 索引 {spec.name} ON {spec.table}({', '.join(spec.columns)})")
+                ok = ok and not missing
+
+                # 汇总表与维护触发器
+                if db_key == "operations":
+                    missing_summary = missing_summary_objects(conn)
+                    for name in missing_summary:
+                        print(f"  ❌ 汇总对象 {name} 缺失")
+                    ok = ok and not missing_summary
+
                 conn.close()
             else:
                 print(f"\n❌ {db_name} DB 不存在: {db_path}")
+                ok = False
+
+        return ok
+
+    def initialize(
+        self,
+        streaming: bool = False,
+        chunksize: int = STREAM_CHUNK_SIZE,
+        incremental: bool = False,
+        start_date: str = None,
+        end_date: str = None,
+    ):
+        """
+        执行完整的初始化流程
+
+        Args:
+            streaming: 为 True 时分块读取源文件，单次遍历写入所有表（适用于超大导出文件）
+            chunksize: 流式/增量模式下每块的行数
+            incremental: 为 True 时只 upsert 新增或变化的订单（见 load_incremental）
+            start_date / end_date: 只加载订单日期在窗口内的行（不能与 incremental 同时使用）
+        """
+        if incremental and (start_date or end_date):
+            raise ValueError("增量加载不支持日期窗口：水位按整个源文件记录")
 
-    def initialize(self):
-        """执行完整的初始化流程"""
         print("=" * 60)
         print("ERP 数据库初始化 - 企业级架构")
         print("=" * 60)
@@ -745,16 +1384,37 @@ class ERPDatabaseInitializer:
         print("  3. audit.db          - 审计数据（审计日志、风险标记）")
         print()
 
-        # 加载原始数据
-        df = self.load_raw_data()
-
-        # 创建三个数据库
-        self.create_operations_db(df)
-        self.create_finance_db(df)
-        self.create_audit_db()
-
-        # 验证
-        self.verify_databases()
+        mode = "incremental" if incremental else "streaming" if streaming else "in-memory"
+        profiler = RunProfiler(
+            "initialize",
+            self.profile,
+            context={"data_dir": str(self.data_dir), "mode": mode, "source_format": self.source_format},
+        )
+        self.last_profile = profiler
+
+        # 加载原始数据并创建三个数据库
+        with profiler.run():
+            if incremental:
+                with profiler.stage("load_incremental"):
+                    self.load_incremental(chunksize)
+            elif streaming:
+                with profiler.stage("create_databases_streaming"):
+                    self.create_databases_streaming(chunksize, start_date, end_date)
+            else:
+                with profiler.stage("load_raw_data"):
+                    df = self.load_raw_data(start_date, end_date)
+                with profiler.stage("create_operations_db"):
+                    self.create_operations_db(df)
+                with profiler.stage("create_finance_db"):
+                    self.create_finance_db(df)
+                with profiler.stage("seed_incremental_state"):
+                    self.seed_incremental_state(chunksize, start_date, end_date)
+            with profiler.stage("create_audit_db"):
+                self.create_audit_db()
+
+            # 验证
+            with profiler.stage("verify_databases"):
+                self.verify_databases()
 
         print("\n" + "=" * 60)
         print("✓ ERP 数据库初始化完成！")
@@ -763,13 +1423,39 @@ class ERPDatabaseInitializer:
         print(f"  - Operations: {self.ops_db_path}")
         print(f"  - Finance: {self.finance_db_path}")
         print(f"  - Audit: {self.audit_db_path}")
+        profile_path = profiler.write()
+        if profile_path is not None:
+            print(f"\n📈 运行剖析 ({profiler.wall_s:.2f}s):")
+            for line in profiler.summary_lines():
+                print(f"  {line}")
+            print(f"  已写入: {profile_path}")
         print("\n现在可以使用 SQL 查询跨数据库进行审计分析！")
 
 
 def main():
     """主函数"""
-    initializer = ERPDatabaseInitializer()
-    initializer.initialize()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="初始化 ERP 数据库")
+    parser.add_argument("--streaming", action="store_true", help="分块流式加载（适用于超大 CSV）")
+    parser.add_argument("--incremental", action="store_true", help="增量加载：只 upsert 新增或变化的订单")
+    parser.add_argument("--chunksize", type=int, default=STREAM_CHUNK_SIZE, help="流式/增量模式每块行数")
+    parser.add_argument(
+        "--source", choices=SOURCE_FORMATS, default="csv", help="源文件格式：原始 CSV 或预处理后的 Parquet"
+    )
+    parser.add_argument("--start-date", default=None, help="只加载该日期及之后的订单 (YYYY-MM-DD)")
+    parser.add_argument("--end-date", default=None, help="只加载该日期及之前的订单 (YYYY-MM-DD)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    initializer = ERPDatabaseInitializer(source_format=args.source, profile=profile_options_from_args(args))
+    initializer.initialize(
+        streaming=args.streaming,
+        chunksize=args.chunksize,
+        incremental=args.incremental,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
 
 
 if __name__ == "__main__":
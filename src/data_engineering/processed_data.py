@@ -0,0 +1,160 @@
+"""
+预处理数据（Parquet）的读写
+scripts/preprocess.py 产出已去重、日期已解析并按订单日期排序的 Parquet，ERPDatabaseInitializer 直接读取：
+- 列裁剪：只读取调用方需要的列；
+- 按行组 (row group) 分批读取，文件以内存映射打开，峰值内存取决于批大小而不是文件大小；
+- 谓词下推：根据行组中订单日期列的 min/max 统计跳过日期窗口之外的行组，剩余行组内再逐行过滤。
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Parquet 行组大小：数据按订单日期排序后，每个行组覆盖一段连续日期，日期窗口查询可跳过大部分行组
+PARQUET_ROW_GROUP_SIZE = 50_000
+
+# 分批读取时每批的最大行数
+PARQUET_BATCH_SIZE = 100_000
+
+
+def _import_parquet():
+    try:
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("读取 Parquet 需要安装 pyarrow: pip install pyarrow") from e
+    return pyarrow.parquet
+
+
+def date_window(start_date: str = None, end_date: str = None) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+    """日期窗口 [start_date, end_date]（按天，含两端）-> 时间戳区间 [lower, upper)"""
+    lower = pd.Timestamp(start_date).normalize() if start_date else None
+    upper = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1) if end_date else None
+    return lower, upper
+
+
+def date_window_mask(dates: pd.Series, start_date: str = None, end_date: str = None) -> np.ndarray:
+    """已解析的日期列落在窗口内的行；日期缺失的行不在任何窗口内"""
+    lower, upper = date_window(start_date, end_date)
+    mask = np.array(dates.notna(), dtype=bool)
+    if lower is not None:
+        mask &= (dates >= lower).to_numpy()
+    if upper is not None:
+        mask &= (dates < upper).to_numpy()
+    return mask
+
+
+class RowDigestSet:
+    """
+    行摘要集合，用于分块去重
+
+    每行内容哈希为 64 位摘要（pd.util.hash_pandas_object），已出现的摘要保存在有序 uint64 数组中，
+    每块用 np.searchsorted 整列判重。每行只占 8 字节，远小于保留原始行或 Python 集合。
+    数值列统一按 float64 计算摘要：逐块推断类型时，同一列可能一块为 int、另一块因缺失值为 float。
+    """
+
+    def __init__(self):
+        self.digests = np.empty(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+    def add(self, chunk: pd.DataFrame) -> np.ndarray:
+        """登记一块数据，返回其中首次出现（不与之前任何一行重复）的行掩码"""
+        numeric = chunk.select_dtypes("number").columns
+        digests = pd.util.hash_pandas_object(chunk.astype(dict.fromkeys(numeric, "float64")), index=False).to_numpy()
+        # 块内重复：只保留第一次出现
+        first = ~pd.Series(digests, copy=False).duplicated().to_numpy()
+        # 跨块重复：与已登记的摘要比对
+        seen = np.zeros(len(digests), dtype=bool)
+        if len(self.digests):
+            positions = np.minimum(np.searchsorted(self.digests, digests), len(self.digests) - 1)
+            seen = self.digests[positions] == digests
+        new = first & ~seen
+        # 新摘要互不相同且都不在集合中：排序后按插入位置合并，保持有序
+        added = np.sort(digests[new])
+        self.digests = np.insert(self.digests, np.searchsorted(self.digests, added), added)
+        return new
+
+
+class ParquetSource:
+    """
+    预处理 Parquet 文件的读取器
+
+    Args:
+        path: Parquet 文件路径
+        date_column: 用于日期窗口过滤的列；为 datetime 类型时可按行组统计信息跳过行组
+    """
+
+    def __init__(self, path: Path, date_column: str = None):
+        pq = _import_parquet()
+        self.path = Path(path)
+        self.file = pq.ParquetFile(self.path, memory_map=True)
+        self.columns: List[str] = self.file.schema_arrow.names
+        self.date_column = date_column
+
+    @property
+    def num_rows(self) -> int:
+        return self.file.metadata.num_rows
+
+    def row_groups(self, start_date: str = None, end_date: str = None) -> List[int]:
+        """与日期窗口相交的行组；没有日期窗口或统计信息不可用时返回全部行组"""
+        all_groups = list(range(self.file.num_row_groups))
+        lower, upper = date_window(start_date, end_date)
+        if self.date_column is None or (lower is None and upper is None):
+            return all_groups
+
+        index = self.columns.index(self.date_column)
+        selected = []
+        for group in all_groups:
+            stats = self.file.metadata.row_group(group).column(index).statistics
+            # 文本日期列的 min/max 是字典序，不能用于按时间跳过
+            if stats is None or not stats.has_min_max or not isinstance(stats.min, datetime):
+                selected.append(group)
+                continue
+            if (upper is not None and pd.Timestamp(stats.min) >= upper) or (
+                lower is not None and pd.Timestamp(stats.max) < lower
+            ):
+                continue
+            selected.append(group)
+        return selected
+
+    def iter_batches(
+        self,
+        columns: Sequence[str] = None,
+        start_date: str = None,
+        end_date: str = None,
+        batch_size: int = PARQUET_BATCH_SIZE,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        按批产出 DataFrame（每批最多 batch_size 行），只读取 columns 与日期窗口相交的行组
+
+        日期窗口按天计、含两端；过滤后为空的批不产出。
+        """
+        columns = list(columns) if columns is not None else list(self.columns)
+        filtering = self.date_column is not None and (start_date or end_date)
+        read_columns = columns + [self.date_column] if filtering and self.date_column not in columns else columns
+
+        row_groups = self.row_groups(start_date, end_date)
+        if not row_groups:
+            return
+        for batch in self.file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=read_columns):
+            df = batch.to_pandas()
+            if filtering:
+                dates = df[self.date_column]
+                if not pd.api.types.is_datetime64_any_dtype(dates):
+                    dates = pd.to_datetime(dates, errors="coerce")
+                df = df.loc[date_window_mask(dates, start_date, end_date), columns].reset_index(drop=True)
+            if not df.empty:
+                yield df
+
+    def read(self, columns: Sequence[str] = None, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """一次读取（列裁剪 + 行组跳过同 iter_batches）"""
+        batches = list(self.iter_batches(columns, start_date, end_date))
+        if batches:
+            return pd.concat(batches, ignore_index=True)
+        schema = self.file.schema_arrow
+        names = list(columns) if columns is not None else self.columns
+        return schema.empty_table().select(names).to_pandas()
@@ -0,0 +1,442 @@
+"""
+运行剖析
+按阶段记录墙钟时间、CPU 时间、读写行数、SQL 语句耗时与峰值内存，结束后写出 JSON（默认 artifacts/）。
+
+- RunProfiler.run() 包住一次运行（加载、审计），RunProfiler.stage(name) 包住其中的阶段；阶段可以嵌套，
+  嵌套阶段名为 "父/子"，父阶段的各项统计包含子阶段；
+- SQL 统计来自 ProfiledConnection：连接池与加载器的连接都使用它，当前线程处于某个阶段内时，
+  游标的 execute / executemany / fetch* 计时并计数（读取行数为 fetch 到的行，写入行数为 rowcount），
+  按语句文本归并到最内层阶段；不在阶段内时只多一次线程局部变量检查。直接迭代游标读取的行不计入；
+- 不经过 SQL 的读取（CSV 分块、快照缓存）由调用方用 record_rows 计入当前阶段；
+- 阶段栈按线程保存：并行审计时每个工作线程在自己的阶段内执行，互不干扰。cpu_s 为执行阶段的线程的 CPU 时间，
+  峰值内存（ru_maxrss）与 tracemalloc 是进程级统计，并行阶段之间无法区分；
+- 可选 cProfile（每个顶层阶段一个 Profile，JSON 中保留累计耗时最高的函数，另存 .prof 文件）
+  与 tracemalloc（Python 分配的峰值，含 numpy 数组）。两者都有明显开销，只在排查时开启。
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import re
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 剖析文件的默认目录（与 run_real 的报告同在 artifacts/）
+PROFILE_DIR = Path(__file__).parent.parent.parent / "artifacts"
+
+# JSON 中每个阶段保留的 SQL 语句数（按累计耗时排序）与语句文本长度
+PROFILE_TOP_STATEMENTS = 20
+SQL_TEXT_LIMIT = 300
+
+# cProfile 模式下每个阶段保留的函数数（按累计耗时排序）
+CPROFILE_TOP_FUNCTIONS = 25
+
+_WHITESPACE = re.compile(r"\s+")
+_local = threading.local()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # Linux 下 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _stack() -> list:
+    """当前线程的阶段栈（外层在前）"""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+@dataclass
+class ProfileOptions:
+    """剖析选项：output_dir 为 None 时只在内存中保留结果，不写文件"""
+
+    output_dir: Optional[Path] = PROFILE_DIR
+    cprofile: bool = False
+    tracemalloc: bool = False
+
+
+@dataclass
+class SQLStatementStats:
+    """一条 SQL 语句（按规整后的文本归并）在一个阶段内的累计统计"""
+
+    sql: str
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0  # 单次 execute 的最长耗时（不含之后的 fetch）
+    rows_read: int = 0
+    rows_written: int = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "seconds": round(self.seconds, 6),
+            "max_seconds": round(self.max_seconds, 6),
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+        }
+
+
+@dataclass
+class StageProfile:
+    """一个阶段的统计（包含其子阶段）"""
+
+    name: str
+    depth: int
+    thread: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    rows_read: int = 0
+    rows_written: int = 0
+    sql_calls: int = 0
+    sql_s: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    rss_growth_mb: Optional[float] = None  # 阶段内进程峰值内存的增长
+    python_peak_mb: Optional[float] = None  # tracemalloc 峰值
+    cprofile_top: Optional[List[Dict]] = None
+    statements: Dict[str, SQLStatementStats] = field(default_factory=dict)
+    stats: Optional[pstats.Stats] = field(default=None, repr=False)
+
+    def statement(self, sql: str) -> SQLStatementStats:
+        key = _WHITESPACE.sub(" ", sql).strip()
+        stats = self.statements.get(key)
+        if stats is None:
+            stats = self.statements[key] = SQLStatementStats(key[:SQL_TEXT_LIMIT])
+        return stats
+
+    def to_dict(self) -> Dict:
+        statements = sorted(self.statements.values(), key=lambda s: s.seconds, reverse=True)
+        result = {
+            "name": self.name,
+            "depth": self.depth,
+            "thread": self.thread,
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "sql_calls": self.sql_calls,
+            "sql_s": round(self.sql_s, 6),
+            "peak_rss_mb": self.peak_rss_mb,
+            "rss_growth_mb": self.rss_growth_mb,
+            "statements": [s.to_dict() for s in statements[:PROFILE_TOP_STATEMENTS]],
+            "statements_omitted": max(len(statements) - PROFILE_TOP_STATEMENTS, 0),
+        }
+        if self.python_peak_mb is not None:
+            result["python_peak_mb"] = round(self.python_peak_mb, 3)
+        if self.cprofile_top is not None:
+            result["cprofile_top"] = self.cprofile_top
+        return result
+
+
+class RunProfiler:
+    """
+    一次运行的剖析器
+
+    用法:
+        profiler = RunProfiler("full_audit", ProfileOptions(cprofile=True))
+        with profiler.run():
+            with profiler.stage("reconcile"):
+                ...
+        profiler.write()  # artifacts/profile_full_audit_<时间>.json
+    """
+
+    def __init__(self, name: str, options: ProfileOptions = None, context: Dict = None):
+        self.name = name
+        self.options = options or ProfileOptions(output_dir=None)
+        self.context = dict(context or {})
+        self.stages: List[StageProfile] = []
+        self.started_at = None
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_rss_mb = None
+        self.path: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+
+    @contextlib.contextmanager
+    def run(self):
+        """包住整次运行：记录总耗时、进程 CPU 时间与峰值内存"""
+        if self.options.tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.started_at = datetime.now()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_s = time.perf_counter() - start
+            self.cpu_s = time.process_time() - cpu_start
+            self.peak_rss_mb = _peak_rss_mb()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """在当前线程中记录一个阶段；SQL 与 record_rows 归入最内层阶段"""
+        stack = _stack()
+        parents = [entry for profiler, entry in stack if profiler is self]
+        if parents:
+            name = f"{parents[-1].name}/{name}"
+        profile = StageProfile(name, len(parents), threading.current_thread().name)
+        with self._lock:
+            self.stages.append(profile)
+
+        profiler = self._start_cprofile() if not parents else None
+        if tracemalloc.is_tracing() and self.options.tracemalloc:
+            # 子阶段重置峰值前先把到目前为止的峰值记到父阶段上
+            if parents:
+                parent = parents[-1]
+                parent.python_peak_mb = max(parent.python_peak_mb or 0.0, tracemalloc.get_traced_memory()[1] / 1024**2)
+            tracemalloc.reset_peak()
+
+        rss_start = _peak_rss_mb()
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+        stack.append((self, profile))
+        try:
+            yield profile
+        finally:
+            stack.pop()
+            profile.wall_s = time.perf_counter() - start
+            profile.cpu_s = time.thread_time() - cpu_start
+            profile.peak_rss_mb = _peak_rss_mb()
+            if rss_start is not None:
+                profile.rss_growth_mb = profile.peak_rss_mb - rss_start
+            if tracemalloc.is_tracing() and self.options.tracemalloc:
+                peak = tracemalloc.get_traced_memory()[1] / 1024**2
+                profile.python_peak_mb = max(profile.python_peak_mb or 0.0, peak)
+                if parents:
+                    parent = parents[-1]
+                    parent.python_peak_mb = max(parent.python_peak_mb or 0.0, profile.python_peak_mb)
+            if profiler is not None:
+                self._stop_cprofile(profiler, profile)
+
+    def wrap(self, name: str, fn):
+        """把无参函数包装为在阶段 name 中执行（供线程池中的阶段使用）"""
+
+        def run():
+            with self.stage(name):
+                return fn()
+
+        return run
+
+    def _start_cprofile(self) -> Optional[cProfile.Profile]:
+        if not self.options.cprofile:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ 同一时刻只能有一个 profiler（并行阶段中的第二个起跳过）
+            return None
+        return profiler
+
+    def _stop_cprofile(self, profiler: cProfile.Profile, profile: StageProfile):
+        profiler.disable()
+        profile.stats = pstats.Stats(profiler, stream=io.StringIO())
+        profile.stats.sort_stats("cumulative")
+        top = []
+        for func in profile.stats.fcn_list[:CPROFILE_TOP_FUNCTIONS]:
+            primitive_calls, calls, tottime, cumtime, _ = profile.stats.stats[func]
+            top.append(
+                {
+                    "function": pstats.func_std_string(func),
+                    "calls": calls,
+                    "primitive_calls": primitive_calls,
+                    "tottime": round(tottime, 6),
+                    "cumtime": round(cumtime, 6),
+                }
+            )
+        profile.cprofile_top = top
+
+    def to_dict(self) -> Dict:
+        top_level = [stage for stage in self.stages if stage.depth == 0]
+        return {
+            "name": self.name,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "context": self.context,
+            "options": {"cprofile": self.options.cprofile, "tracemalloc": self.options.tracemalloc},
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "peak_rss_mb": self.peak_rss_mb,
+            "totals": {
+                "rows_read": sum(stage.rows_read for stage in top_level),
+                "rows_written": sum(stage.rows_written for stage in top_level),
+                "sql_calls": sum(stage.sql_calls for stage in top_level),
+                "sql_s": round(sum(stage.sql_s for stage in top_level), 6),
+            },
+            "stages": [stage.to_dict() for stage in self.stages],
+        }
+
+    def write(self, output_dir: Path = None) -> Optional[Path]:
+        """
+        写出 profile_<name>_<时间>.json（cProfile 模式下另存每个阶段的 .prof）
+
+        Returns:
+            JSON 路径；output_dir 与 options.output_dir 都为 None 时不写文件，返回 None
+        """
+        output_dir = output_dir or self.options.output_dir
+        if output_dir is None:
+            return None
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = (self.started_at or datetime.now()).strftime("%Y%m%d_%H%M%S_%f")
+        self.path = output_dir / f"profile_{self.name}_{stamp}.json"
+        report = self.to_dict()
+        for stage, entry in zip(self.stages, report["stages"]):
+            if stage.stats is not None:
+                prof_path = self.path.with_name(f"{self.path.stem}.{stage.name.replace('/', '.')}.prof")
+                stage.stats.dump_stats(prof_path)
+                entry["cprofile_file"] = prof_path.name
+        self.path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        return self.path
+
+    def summary_lines(self) -> List[str]:
+        """顶层阶段的单行摘要，供运行结束时打印"""
+        lines = []
+        for stage in self.stages:
+            if stage.depth:
+                continue
+            lines.append(
+                f"{stage.name:<32} {stage.wall_s:>8.2f}s  cpu {stage.cpu_s:>7.2f}s  "
+                f"SQL {stage.sql_calls:>5} 次 {stage.sql_s:>7.2f}s  读 {stage.rows_read:>10,}  写 {stage.rows_written:>10,}"
+            )
+        return lines
+
+
+def add_profile_arguments(parser):
+    """命令行剖析参数：--profile [目录]、--cprofile、--tracemalloc（后两者隐含 --profile）"""
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=str(PROFILE_DIR),
+        default=None,
+        metavar="DIR",
+        help="写出按阶段的剖析 JSON（默认目录 artifacts/）",
+    )
+    parser.add_argument("--cprofile", action="store_true", help="剖析时对每个阶段运行 cProfile")
+    parser.add_argument("--tracemalloc", action="store_true", help="剖析时记录每个阶段的 Python 内存峰值")
+
+
+def profile_options_from_args(args) -> Optional[ProfileOptions]:
+    """由 add_profile_arguments 的参数得到 ProfileOptions；未要求剖析时为 None"""
+    if args.profile is None and not (args.cprofile or args.tracemalloc):
+        return None
+    return ProfileOptions(Path(args.profile or PROFILE_DIR), cprofile=args.cprofile, tracemalloc=args.tracemalloc)
+
+
+def profile_stage(name: str):
+    """在当前线程最内层剖析器中开始子阶段；当前线程没有剖析中的运行时为空操作"""
+    stack = _stack()
+    if not stack:
+        return contextlib.nullcontext()
+    return stack[-1][0].stage(name)
+
+
+def record_rows(read: int = 0, written: int = 0):
+    """把不经过 SQL 的读写行数（CSV 分块、快照等）计入当前线程的各层阶段"""
+    for _, stage in _stack():
+        stage.rows_read += read
+        stage.rows_written += written
+
+
+def count_rows_read(frames: Iterable) -> Iterator:
+    """逐块产出 frames，并把每块的行数计入消费方线程的当前阶段"""
+    for frame in frames:
+        record_rows(read=len(frame))
+        yield frame
+
+
+def _record_sql(stack: list, sql: str, seconds: float, read: int = 0, written: int = 0, call: bool = False):
+    for _, stage in stack:
+        stage.rows_read += read
+        stage.rows_written += written
+        stage.sql_s += seconds
+        stage.sql_calls += call
+    stats = stack[-1][1].statement(sql)
+    stats.calls += call
+    stats.seconds += seconds
+    stats.rows_read += read
+    stats.rows_written += written
+    if call:
+        stats.max_seconds = max(stats.max_seconds, seconds)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """剖析中的线程里为语句计时、计数；execute 之后的 fetch 计入同一条语句"""
+
+    _profile_sql = None
+    _profile_stack = None
+
+    def _timed(self, method, sql, *args):
+        stack = _stack()
+        if not stack:
+            self._profile_stack = None
+            return method(sql, *args)
+        # 记录当时的阶段栈：之后的 fetch 即使在阶段结束后发生，也计入发出语句的阶段
+        self._profile_stack, self._profile_sql = list(stack), sql
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            _record_sql(self._profile_stack, sql, time.perf_counter() - start, written=max(self.rowcount, 0), call=True)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def _fetch(self, method, *args):
+        if self._profile_stack is None:
+            return method(*args)
+        start = time.perf_counter()
+        rows = method(*args)
+        count = len(rows) if isinstance(rows, list) else int(rows is not None)
+        _record_sql(self._profile_stack, self._profile_sql, time.perf_counter() - start, read=count)
+        return rows
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """游标为 ProfiledCursor 的连接（sqlite3.connect(path, factory=ProfiledConnection)）"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # Connection.execute 在 C 层直接创建游标、不经过 cursor()，这里改为经过 ProfiledCursor
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
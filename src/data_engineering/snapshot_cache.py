@@ -0,0 +1,142 @@
+"""
+审计输入快照缓存
+把审计读取的查询结果（已转换类型、已解析日期的 DataFrame）以 Arrow IPC 文件持久化到本地，
+再次审计时通过内存映射直接读取列式数据，省去 SQL 读取与日期解析。
+
+每个快照以「源数据库文件的 (mtime_ns, size) + 查询文本与参数」为键，键写在快照的 schema metadata 中。
+源库（含 WAL 模式下的 -wal 文件）发生任何写入后键不再匹配，快照在下一次读取时自动重建。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Sequence
+
+import pandas as pd
+
+# 快照格式版本：快照内容的生成方式变化时递增，旧快照随之失效
+SNAPSHOT_FORMAT_VERSION = 1
+
+# 快照键在 Arrow schema metadata 中的字段名
+SNAPSHOT_KEY_FIELD = b"snapshot_key"
+
+# 快照文件扩展名（Arrow IPC 文件格式，可内存映射）
+SNAPSHOT_SUFFIX = ".arrow"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise ImportError("快照缓存需要安装 pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+class SnapshotCache:
+    """
+    基于源文件状态失效的列式快照缓存
+
+    用法:
+        cache = SnapshotCache(data_dir / ".snapshot_cache")
+        df = cache.get_or_load("supply_chain", [db_ops], SUPPLY_CHAIN_QUERY, lambda: read_and_parse())
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.pa = _import_pyarrow()
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def source_state(sources: Sequence[Path]) -> list:
+        """
+        源数据库的 [路径, mtime_ns, size]
+
+        WAL 模式下未检查点的写入在 -wal 文件中，一并计入；空的 -wal 文件不含数据
+        （每个进程首次打开连接时都会重新创建），不计入。
+        """
+        state = []
+        for source in sources:
+            for path in (Path(source), Path(f"{source}-wal")):
+                if path.exists():
+                    stat = path.stat()
+                    if stat.st_size or path == Path(source):
+                        state.append([str(path.resolve()), stat.st_mtime_ns, stat.st_size])
+        return state
+
+    def snapshot_key(self, sources: Sequence[Path], query: str, params: Sequence = ()) -> str:
+        """快照键：格式版本 + 源文件状态 + 查询文本与参数的摘要"""
+        payload = json.dumps([SNAPSHOT_FORMAT_VERSION, self.source_state(sources), query, list(params)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}{SNAPSHOT_SUFFIX}"
+
+    def get_or_load(
+        self,
+        name: str,
+        sources: Sequence[Path],
+        query: str,
+        loader: Callable[[], pd.DataFrame],
+        params: Sequence = (),
+    ) -> pd.DataFrame:
+        """
+        返回快照 name；不存在或已失效时调用 loader() 重新读取并写入快照
+
+        Args:
+            name: 快照名（同时是文件名）
+            sources: 查询读取的数据库文件，任何一个变化都会使快照失效
+            query: 生成快照的查询文本，查询变化同样使快照失效
+            loader: 从数据库读取并完成类型转换的函数
+            params: 查询参数，同样计入快照键
+        """
+        key = self.snapshot_key(sources, query, params)
+        df = self.read(name, key)
+        if df is not None:
+            with self._lock:
+                self.hits += 1
+            return df
+
+        df = loader()
+        # 读取期间源库发生变化时无法确定结果对应哪个版本，不写快照
+        if self.snapshot_key(sources, query, params) == key:
+            self.write(name, key, df)
+        with self._lock:
+            self.misses += 1
+        return df
+
+    def read(self, name: str, key: str):
+        """键匹配时以内存映射读取快照，否则返回 None（文件缺失 / 失效 / 损坏）"""
+        path = self.path(name)
+        if not path.exists():
+            return None
+        try:
+            with self.pa.memory_map(str(path)) as source:
+                reader = self.pa.ipc.open_file(source)
+                metadata = reader.schema.metadata or {}
+                if metadata.get(SNAPSHOT_KEY_FIELD) != key.encode("ascii"):
+                    return None
+                return reader.read_all().to_pandas()
+        except (OSError, self.pa.ArrowInvalid):
+            return None
+
+    def write(self, name: str, key: str, df: pd.DataFrame):
+        """写入快照：先写临时文件再原子替换，并发读取方不会看到半个文件"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        table = self.pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SNAPSHOT_KEY_FIELD: key})
+
+        path = self.path(name)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with self.pa.OSFile(str(tmp), "wb") as sink, self.pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+
+    def clear(self):
+        """删除所有快照"""
+        for path in self.cache_dir.glob(f"*{SNAPSHOT_SUFFIX}"):
+            path.unlink()
@@ -0,0 +1,153 @@
+"""
+汇总表管理
+Operations 数据库中按「月 × 国家 × 品类 × 客户分段」预聚合的有效订单汇总（sales_monthly_summary），
+供月度损益与地区排名直接读取，报表耗时只与维度组合数有关、与订单行数无关。
+
+维护方式与受管索引相同：
+- 全量 / 流式加载前删除维护触发器（REPLACE 写入不逐行维护汇总），写入完成后整表重算并重建触发器；
+- 之后 sales_orders 上的 INSERT / UPDATE / DELETE（增量加载的 upsert、人工修正）由触发器在同一事务内
+  从旧行所在组减去、向新行所在组加上，只改动受影响的几个汇总行。
+
+注意：INSERT OR REPLACE 删除旧行时不触发 DELETE 触发器（除非开启 recursive_triggers），
+因此加载器之外改写订单应使用 UPDATE 或 ON CONFLICT upsert。
+"""
+
+import sqlite3
+from typing import List
+
+from src.data_engineering.indexes import ACTIVE_ORDER_FILTER
+
+SUMMARY_TABLE = "sales_monthly_summary"
+
+# 汇总维度及缺失值的占位（作为主键的一部分不能为 NULL）：年 / 月为 0 表示订单日期缺失
+SUMMARY_DIMENSIONS = (
+    ("order_year", "0"),
+    ("order_month", "0"),
+    ("customer_country", "''"),
+    ("category_name", "''"),
+    ("customer_segment", "''"),
+)
+
+SUMMARY_TABLE_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+        order_year INTEGER NOT NULL,
+        order_month INTEGER NOT NULL,
+        customer_country TEXT NOT NULL,
+        category_name TEXT NOT NULL,
+        customer_segment TEXT NOT NULL,
+        orders INTEGER NOT NULL,
+        revenue REAL NOT NULL,
+        profit REAL NOT NULL,
+        PRIMARY KEY (order_year, order_month, customer_country, category_name, customer_segment)
+    ) WITHOUT ROWID
+"""
+
+_KEY_COLUMNS = ", ".join(column for column, _ in SUMMARY_DIMENSIONS)
+
+
+def _key_values(row: str = "") -> str:
+    """维度取值表达式（row 为 'NEW.' / 'OLD.' 或空）"""
+    return ", ".join(f"COALESCE({row}{column}, {default})" for column, default in SUMMARY_DIMENSIONS)
+
+
+def _key_match(row: str) -> str:
+    return " AND ".join(f"{column} = COALESCE({row}{column}, {default})" for column, default in SUMMARY_DIMENSIONS)
+
+
+def _active(row: str) -> str:
+    return ACTIVE_ORDER_FILTER.replace("order_status", f"{row}order_status")
+
+
+def _add_row(row: str) -> str:
+    """把一行订单计入所在的组（不存在时插入）"""
+    return f"""
+        INSERT INTO {SUMMARY_TABLE} ({_KEY_COLUMNS}, orders, revenue, profit)
+        SELECT {_key_values(row)}, 1, COALESCE({row}sales, 0.0), COALESCE({row}profit, 0.0)
+        WHERE {_active(row)}
+        ON CONFLICT ({_KEY_COLUMNS}) DO UPDATE SET
+            orders = orders + 1,
+            revenue = revenue + excluded.revenue,
+            profit = profit + excluded.profit;"""
+
+
+def _remove_row(row: str) -> str:
+    """从所在的组中减去一行订单，组内不再有订单时删除该组"""
+    return f"""
+        UPDATE {SUMMARY_TABLE} SET
+            orders = orders - 1,
+            revenue = revenue - COALESCE({row}sales, 0.0),
+            profit = profit - COALESCE({row}profit, 0.0)
+        WHERE {_key_match(row)} AND {_active(row)};
+        DELETE FROM {SUMMARY_TABLE} WHERE {_key_match(row)} AND orders <= 0;"""
+
+
+# 触发器名 -> DDL；UPDATE 只在影响汇总的列变化时触发
+_WATCHED_COLUMNS = ", ".join([column for column, _ in SUMMARY_DIMENSIONS] + ["sales", "profit", "order_status"])
+
+SUMMARY_TRIGGERS = {
+    "trg_sales_orders_summary_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sales_orders_summary_insert AFTER INSERT ON sales_orders
+        BEGIN{_add_row("NEW.")}
+        END""",
+    "trg_sales_orders_summary_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sales_orders_summary_delete AFTER DELETE ON sales_orders
+        BEGIN{_remove_row("OLD.")}
+        END""",
+    "trg_sales_orders_summary_update": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sales_orders_summary_update AFTER UPDATE OF {_WATCHED_COLUMNS} ON sales_orders
+        BEGIN{_remove_row("OLD.")}{_add_row("NEW.")}
+        END""",
+}
+
+SUMMARY_REBUILD_SQL = f"""
+    INSERT INTO {SUMMARY_TABLE} ({_KEY_COLUMNS}, orders, revenue, profit)
+    SELECT {_key_values()}, COUNT(*), TOTAL(sales), TOTAL(profit)
+    FROM sales_orders
+    WHERE {ACTIVE_ORDER_FILTER}
+    GROUP BY {_KEY_COLUMNS}
+"""
+
+
+def create_summary_schema(conn: sqlite3.Connection):
+    """创建汇总表（已存在时为空操作）"""
+    conn.execute(SUMMARY_TABLE_DDL)
+
+
+def drop_summary_triggers(conn: sqlite3.Connection):
+    """删除维护触发器（批量加载前调用，加载结束后由 rebuild_summary_tables 重建）"""
+    for name in SUMMARY_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_summary_tables(conn: sqlite3.Connection) -> int:
+    """
+    由 sales_orders 整表重算汇总并创建维护触发器（批量加载后调用）
+
+    Returns:
+        汇总行数（维度组合数）
+    """
+    create_summary_schema(conn)
+    conn.execute(f"DELETE FROM {SUMMARY_TABLE}")
+    conn.execute(SUMMARY_REBUILD_SQL)
+    for ddl in SUMMARY_TRIGGERS.values():
+        conn.execute(ddl)
+    return conn.execute(f"SELECT COUNT(*) FROM {SUMMARY_TABLE}").fetchone()[0]
+
+
+def missing_summary_objects(conn: sqlite3.Connection) -> List[str]:
+    """返回缺失的汇总表 / 维护触发器名；为空时汇总与 sales_orders 保持同步"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    return [name for name in (SUMMARY_TABLE, *SUMMARY_TRIGGERS) if name not in existing]
+
+
+def ensure_summary_tables(conn: sqlite3.Connection) -> bool:
+    """
+    增量加载前调用：汇总表或触发器缺失（旧库、中断的全量加载）时整表重算
+
+    Returns:
+        是否执行了重算
+    """
+    if not missing_summary_objects(conn):
+        return False
+    rebuild_summary_tables(conn)
+    return True
@@ -0,0 +1,616 @@
+"""
+合成 DataCo 数据
+离线、整列生成与 DataCo Smart Supply Chain 数据集同构的订单明细 CSV（不需要 Kaggle 下载），
+并按比例注入已知异常，注入的订单 / 客户记录在清单（manifest）中，作为审计与欺诈规则结果的对照：
+
+- missing_ar / amount_mismatch：财务侧应收缺失 / 入账金额不符。财务库由同一份明细派生，
+  这两类异常在加载后由 apply_finance_anomalies 写入财务库；
+- timing_fraud：发货日期早于订单日期（1-14 天）；
+- negative_margin：有效订单亏损（正常订单的利润率均为正）；
+- frequency_spike：个别客户在同一天集中下单 12-40 笔。
+
+注入异常的订单状态都是未取消、未标记欺诈的状态，审计查询一定能覆盖到它们。
+按订单分块生成、逐块追加写入，峰值内存只与块大小相关；相同 seed 生成的数据相同。
+安装了 pyarrow 时用 pyarrow.csv 写出（比 DataFrame.to_csv 快一个数量级），否则退回 pandas。
+另有 write_erp_export_csv 生成 scripts/run_real.py 使用的 ERP 导出格式（负金额 / 缺失科目）。
+"""
+
+import json
+import sqlite3
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 基准规模（订单数）
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# 各类异常占订单数的比例（frequency_spike 为集中下单的订单占比）
+DEFAULT_ANOMALY_RATES = {
+    "missing_ar": 0.005,
+    "amount_mismatch": 0.005,
+    "timing_fraud": 0.002,
+    "negative_margin": 0.01,
+    "frequency_spike": 0.002,
+}
+
+# ERP 导出中各类异常占行数的比例
+DEFAULT_EXPORT_ANOMALY_RATES = {"negative_amount": 0.001, "missing_account_code": 0.001}
+
+# 每块生成的订单数
+GENERATE_CHUNK_ORDERS = 100_000
+
+# 订单日期范围：起始日期 + 月数
+DEFAULT_START_DATE = "2015-01-01"
+DEFAULT_MONTHS = 36
+
+# 与原始数据集相同的列及顺序
+DATACO_COLUMNS = [
+    "Type",
+    "Days for shipping (real)",
+    "Days for shipment (scheduled)",
+    "Benefit per order",
+    "Sales per customer",
+    "Delivery Status",
+    "Late_delivery_risk",
+    "Category Id",
+    "Category Name",
+    "Customer City",
+    "Customer Country",
+    "Customer Email",
+    "Customer Fname",
+    "Customer Id",
+    "Customer Lname",
+    "Customer Password",
+    "Customer Segment",
+    "Customer State",
+    "Customer Street",
+    "Customer Zipcode",
+    "Department Id",
+    "Department Name",
+    "Latitude",
+    "Longitude",
+    "Market",
+    "Order City",
+    "Order Country",
+    "Order Customer Id",
+    "order date (DateOrders)",
+    "Order Id",
+    "Order Item Cardprod Id",
+    "Order Item Discount",
+    "Order Item Discount Rate",
+    "Order Item Id",
+    "Order Item Product Price",
+    "Order Item Profit Ratio",
+    "Order Item Quantity",
+    "Sales",
+    "Order Item Total",
+    "Order Profit Per Order",
+    "Order Region",
+    "Order State",
+    "Order Status",
+    "Order Zipcode",
+    "Product Card Id",
+    "Product Category Id",
+    "Product Description",
+    "Product Image",
+    "Product Name",
+    "Product Price",
+    "Product Status",
+    "shipping date (DateOrders)",
+    "Shipping Mode",
+]
+
+# 取值分布（近似原始数据集）
+PAYMENT_TYPES = (["DEBIT", "TRANSFER", "PAYMENT", "CASH"], [0.38, 0.28, 0.23, 0.11])
+ORDER_STATUSES = (
+    [
+        "COMPLETE",
+        "PENDING_PAYMENT",
+        "PROCESSING",
+        "PENDING",
+        "CLOSED",
+        "ON_HOLD",
+        "SUSPECTED_FRAUD",
+        "CANCELED",
+        "PAYMENT_REVIEW",
+    ],
+    [0.33, 0.22, 0.12, 0.11, 0.11, 0.05, 0.023, 0.02, 0.017],
+)
+# 注入异常的订单使用的状态（不会被审计查询的状态过滤排除）
+OPEN_STATUSES = ["COMPLETE", "PENDING_PAYMENT", "PROCESSING", "PENDING", "CLOSED"]
+SHIPPING_MODES = (["Standard Class", "Second Class", "First Class", "Same Day"], [0.6, 0.19, 0.15, 0.06])
+SCHEDULED_DAYS = np.array([4, 2, 1, 0])
+SEGMENTS = (["Consumer", "Corporate", "Home Office"], [0.52, 0.30, 0.18])
+CUSTOMER_LOCATIONS = [
+    # (国家, 州, 城市, 权重)
+    ("EE. UU.", "CA", "Los Angeles", 0.12),
+    ("EE. UU.", "NY", "Brooklyn", 0.12),
+    ("EE. UU.", "IL", "Chicago", 0.10),
+    ("EE. UU.", "TX", "Houston", 0.08),
+    ("EE. UU.", "FL", "Miami", 0.10),
+    ("EE. UU.", "NJ", "Newark", 0.10),
+    ("Puerto Rico", "PR", "Caguas", 0.38),
+]
+ORDER_LOCATIONS = [
+    # (市场, 区域, 国家, 城市)
+    ("LATAM", "Central America", "México", "Santo Domingo"),
+    ("LATAM", "South America", "Brasil", "São Paulo"),
+    ("LATAM", "Caribbean", "República Dominicana", "Santo Domingo"),
+    ("Europe", "Western Europe", "Francia", "Paris"),
+    ("Europe", "Western Europe", "Alemania", "Berlin"),
+    ("Europe", "Northern Europe", "Reino Unido", "London"),
+    ("Europe", "Southern Europe", "Italia", "Roma"),
+    ("USCA", "US Center ", "Estados Unidos", "Chicago"),
+    ("USCA", "West of USA ", "Estados Unidos", "Los Angeles"),
+    ("USCA", "East of USA", "Estados Unidos", "New York City"),
+    ("Pacific Asia", "Southeast Asia", "Indonesia", "Jakarta"),
+    ("Pacific Asia", "Oceania", "Australia", "Sydney"),
+    ("Pacific Asia", "Eastern Asia", "China", "Shanghai"),
+    ("Africa", "West Africa", "Nigeria", "Lagos"),
+    ("Africa", "North Africa", "Egipto", "El Cairo"),
+]
+CATEGORIES = [
+    # (品类, 部门)
+    ("Cleats", "Apparel"),
+    ("Men's Footwear", "Apparel"),
+    ("Women's Apparel", "Golf"),
+    ("Indoor/Outdoor Games", "Fan Shop"),
+    ("Fishing", "Fan Shop"),
+    ("Water Sports", "Fan Shop"),
+    ("Camping & Hiking", "Fan Shop"),
+    ("Cardio Equipment", "Footwear"),
+    ("Shop By Sport", "Golf"),
+    ("Electronics", "Outdoors"),
+    ("Accessories", "Outdoors"),
+    ("Golf Balls", "Golf"),
+]
+PRICE_POINTS = np.array([9.99, 19.99, 24.99, 29.99, 39.99, 49.98, 59.99, 99.99, 129.99, 199.99, 299.98, 399.98, 499.99])
+DISCOUNT_RATES = np.array([0.0, 0.01, 0.02, 0.04, 0.05, 0.06, 0.09, 0.1, 0.13, 0.15, 0.17, 0.18, 0.2, 0.25])
+FIRST_NAMES = np.array(["Mary", "Robert", "David", "James", "Maria", "John", "Michael", "Linda", "Jennifer", "Ana"])
+LAST_NAMES = np.array(
+    ["Smith", "Johnson", "Garcia", "Brown", "Jones", "Miller", "Davis", "Rodriguez", "Lopez", "Wilson"]
+)
+N_PRODUCTS = 120
+
+# 集中下单：每次 12-40 笔（频率规则阈值为单日 10 笔）
+SPIKE_ORDERS = (12, 41)
+# 时间欺诈：发货提前 1-14 天（欺诈规则把提前 7 天以上视为确认欺诈）
+TIMING_LEAD_DAYS = (1, 15)
+# 负毛利：利润率 -5% 至 -150%
+NEGATIVE_PROFIT_RATIO = (0.05, 1.5)
+
+# ERP 导出（run_real）的科目
+EXPORT_ACCOUNTS = np.array(["1100", "1200", "4000", "5000", "6100"])
+EXPORT_DESCRIPTIONS = np.array(["Cash", "Accounts Receivable", "Sales Revenue", "Cost of Goods Sold", "Freight"])
+
+
+@dataclass
+class SyntheticManifest:
+    """
+    生成结果与注入异常清单
+
+    anomalies: 异常类型 -> 订单号列表（frequency_spike 为客户号列表）；
+    booked_amounts: 与 anomalies["amount_mismatch"] 一一对应的财务侧入账金额。
+    """
+
+    path: str
+    orders: int
+    rows: int
+    seed: int
+    rates: Dict[str, float]
+    anomalies: Dict[str, List[str]] = field(default_factory=dict)
+    booked_amounts: List[float] = field(default_factory=list)
+
+    def counts(self) -> Dict[str, int]:
+        return {name: len(ids) for name, ids in self.anomalies.items()}
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def save(self, path: Path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: Path) -> "SyntheticManifest":
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+def manifest_path(csv_path: Path) -> Path:
+    """CSV 对应的清单文件：<文件名>.manifest.json"""
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.name + ".manifest.json")
+
+
+def parse_scale(value: str) -> int:
+    """'10k' / '1m' / '10m' 或整数 -> 订单数"""
+    text = str(value).strip().lower()
+    if text in SCALES:
+        return SCALES[text]
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    number = text[:-1] if multiplier > 1 else text
+    try:
+        return int(float(number) * multiplier)
+    except ValueError:
+        raise ValueError(f"无法识别的规模: {value}（示例: 10k, 1m, 10m, 5000）") from None
+
+
+class DataCoGenerator:
+    """
+    DataCo 格式订单明细生成器
+
+    客户、产品目录与订单都由 seed 决定；每个订单 1-4 个明细行，同一订单的明细共享订单级字段。
+    """
+
+    def __init__(
+        self,
+        orders: int,
+        seed: int = 0,
+        rates: Optional[Dict[str, float]] = None,
+        start_date: str = DEFAULT_START_DATE,
+        months: int = DEFAULT_MONTHS,
+        chunk_orders: int = GENERATE_CHUNK_ORDERS,
+    ):
+        self.orders = orders
+        self.seed = seed
+        self.rates = {**DEFAULT_ANOMALY_RATES, **(rates or {})}
+        unknown = set(self.rates) - set(DEFAULT_ANOMALY_RATES)
+        if unknown:
+            raise ValueError(f"未知的异常类型: {sorted(unknown)}")
+        if sum(rate for name, rate in self.rates.items() if name != "frequency_spike") >= 1:
+            raise ValueError("各类异常比例之和须小于 1")
+
+        self.chunk_orders = chunk_orders
+        self.start = np.datetime64(pd.Timestamp(start_date), "m")
+        end = np.datetime64(pd.Timestamp(start_date) + pd.DateOffset(months=months), "m")
+        self.span_minutes = int((end - self.start).astype(np.int64))
+
+        catalog_rng = np.random.default_rng([seed, 0])
+        # 约三个订单对应一个客户（与原始数据集相近）
+        self.n_customers = max(orders // 3, 100)
+        self.customer_segment = self._draw(catalog_rng, SEGMENTS, self.n_customers)
+        weights = np.array([loc[3] for loc in CUSTOMER_LOCATIONS])
+        self.customer_location = catalog_rng.choice(
+            len(CUSTOMER_LOCATIONS), self.n_customers, p=weights / weights.sum()
+        )
+        self.customer_names = catalog_rng.integers(0, len(FIRST_NAMES) * len(LAST_NAMES), self.n_customers)
+        self.customer_zip = catalog_rng.integers(600, 99999, self.n_customers)
+        self.product_category = np.arange(N_PRODUCTS) % len(CATEGORIES)
+        self.product_price = catalog_rng.choice(PRICE_POINTS, N_PRODUCTS)
+
+    @staticmethod
+    def _draw(rng: np.random.Generator, choices: Tuple[List[str], List[float]], size: int) -> np.ndarray:
+        """按分布抽取取值下标"""
+        values, weights = choices
+        weights = np.asarray(weights, dtype=float)
+        return rng.choice(len(values), size, p=weights / weights.sum())
+
+    def chunks(self) -> Iterator[Tuple[pd.DataFrame, Dict[str, List]]]:
+        """逐块产出 (明细 DataFrame, 本块注入的异常)"""
+        item_offset = 0
+        for chunk_no, start in enumerate(range(0, self.orders, self.chunk_orders)):
+            n = min(self.chunk_orders, self.orders - start)
+            rng = np.random.default_rng([self.seed, 1, chunk_no])
+            frame, anomalies = self._chunk(rng, start, n, item_offset)
+            item_offset += len(frame)
+            yield frame, anomalies
+
+    def _chunk(self, rng: np.random.Generator, start: int, n: int, item_offset: int):
+        # ---- 订单级字段 ----
+        order_id = np.arange(start + 1, start + n + 1)
+        customer = rng.integers(0, self.n_customers, n)
+        order_time = self.start + rng.integers(0, self.span_minutes, n).astype("timedelta64[m]")
+        status = self._draw(rng, ORDER_STATUSES, n)
+        mode = self._draw(rng, SHIPPING_MODES, n)
+        scheduled = SCHEDULED_DAYS[mode]
+        real = np.clip(scheduled + rng.integers(-1, 3, n), 0, 6)
+        profit_ratio = rng.uniform(0.02, 0.5, n)
+        order_location = rng.integers(0, len(ORDER_LOCATIONS), n)
+        payment = self._draw(rng, PAYMENT_TYPES, n)
+
+        # ---- 注入异常：一次均匀抽样按比例切成互不重叠的区间 ----
+        anomalies = {name: [] for name in self.rates}
+        u = rng.random(n)
+        masks, lower = {}, 0.0
+        for name in ("missing_ar", "amount_mismatch", "timing_fraud", "negative_margin"):
+            masks[name] = (u >= lower) & (u < lower + self.rates[name])
+            lower += self.rates[name]
+        injected = u < lower
+
+        lead = rng.integers(*TIMING_LEAD_DAYS, n)
+        real = np.where(masks["timing_fraud"], -lead, real)
+        profit_ratio = np.where(masks["negative_margin"], -rng.uniform(*NEGATIVE_PROFIT_RATIO, n), profit_ratio)
+
+        # 集中下单：从其余订单中抽出若干组，改为同一客户在同一天下单
+        spike_target = int(round(self.rates["frequency_spike"] * n))
+        candidates = rng.permutation(np.flatnonzero(~injected))
+        taken = 0
+        spike = np.zeros(n, dtype=bool)
+        while spike_target > 0 and taken + SPIKE_ORDERS[0] <= min(spike_target, len(candidates)):
+            size = min(int(rng.integers(*SPIKE_ORDERS)), len(candidates) - taken)
+            members = candidates[taken : taken + size]
+            taken += size
+            burst_customer = rng.integers(0, self.n_customers)
+            day = self.start + np.timedelta64(int(rng.integers(0, self.span_minutes // 1440)) * 1440, "m")
+            customer[members] = burst_customer
+            order_time[members] = day + rng.integers(0, 1440, size).astype("timedelta64[m]")
+            spike[members] = True
+            anomalies["frequency_spike"].append(str(burst_customer + 1))
+        injected |= spike
+        status = np.where(injected, rng.integers(0, len(OPEN_STATUSES), n) + len(ORDER_STATUSES[0]), status)
+
+        # ---- 展开为明细行 ----
+        items = rng.integers(1, 5, n)
+        rows = int(items.sum())
+        order_index = np.repeat(np.arange(n), items)
+        product = rng.integers(0, N_PRODUCTS, rows)
+        price = self.product_price[product]
+        quantity = rng.integers(1, 6, rows)
+        sales = np.round(price * quantity, 2)
+        discount_rate = rng.choice(DISCOUNT_RATES, rows)
+        discount = np.round(sales * discount_rate, 2)
+        total = np.round(sales - discount, 2)
+        item_ratio = np.round(profit_ratio[order_index], 2)
+        profit = np.round(total * item_ratio, 2)
+
+        # 应收缺失 / 金额不符：以订单最后一个明细（加载后留在 sales_orders / 应收中的行）为准
+        last_item = np.cumsum(items) - 1
+        anomalies["missing_ar"] = [str(i) for i in order_id[masks["missing_ar"]]]
+        mismatch = np.flatnonzero(masks["amount_mismatch"])
+        anomalies["amount_mismatch"] = [str(i) for i in order_id[mismatch]]
+        delta = rng.uniform(1.0, 50.0, len(mismatch)) * rng.choice([-1.0, 1.0], len(mismatch))
+        booked = np.round(np.maximum(sales[last_item[mismatch]] + delta, 0.0), 2)
+        # 入账金额恰好与业务金额相同（业务金额很小且差额为负）时改为加上差额
+        booked = np.where(np.abs(booked - sales[last_item[mismatch]]) < 1.0, sales[last_item[mismatch]] + 1.0, booked)
+        anomalies["booked_amounts"] = np.round(booked, 2).tolist()
+        anomalies["timing_fraud"] = [str(i) for i in order_id[masks["timing_fraud"]]]
+        anomalies["negative_margin"] = [str(i) for i in order_id[masks["negative_margin"]]]
+
+        frame = self._frame(
+            order_index=order_index,
+            order_id=order_id,
+            customer=customer,
+            order_time=order_time,
+            shipping_time=order_time + real.astype("timedelta64[D]"),
+            status=status,
+            mode=mode,
+            scheduled=scheduled,
+            real=real,
+            order_location=order_location,
+            payment=payment,
+            product=product,
+            price=price,
+            quantity=quantity,
+            sales=sales,
+            discount=discount,
+            discount_rate=discount_rate,
+            total=total,
+            item_ratio=item_ratio,
+            profit=profit,
+            item_id=np.arange(item_offset + 1, item_offset + rows + 1),
+        )
+        return frame, anomalies
+
+    def _frame(self, order_index: np.ndarray, **cols) -> pd.DataFrame:
+        """组装 DataCo 列；订单级字段按 order_index 展开到明细行"""
+
+        def per_row(values):
+            return values[order_index]
+
+        customer = per_row(cols["customer"])
+        location = self.customer_location[customer]
+        status_values = np.array(ORDER_STATUSES[0] + OPEN_STATUSES, dtype=object)
+        status = per_row(cols["status"])
+        status_text = status_values[status]
+        real = per_row(cols["real"])
+        scheduled = per_row(cols["scheduled"])
+        shipping_canceled = np.isin(status_text, ["CANCELED", "SUSPECTED_FRAUD"])
+        delivery = np.select(
+            [shipping_canceled, real > scheduled, real < scheduled],
+            ["Shipping canceled", "Late delivery", "Advance shipping"],
+            "Shipping on time",
+        )
+        order_location = per_row(cols["order_location"])
+        category = self.product_category[cols["product"]]
+        names = self.customer_names[customer]
+        customer_id = customer + 1
+        sales_per_customer = cols["total"]
+
+        def pick(table, column, index):
+            return np.array([entry[column] for entry in table], dtype=object)[index]
+
+        frame = pd.DataFrame(
+            {
+                "Type": np.array(PAYMENT_TYPES[0], dtype=object)[per_row(cols["payment"])],
+                "Days for shipping (real)": real,
+                "Days for shipment (scheduled)": scheduled,
+                "Benefit per order": cols["profit"],
+                "Sales per customer": sales_per_customer,
+                "Delivery Status": delivery,
+                "Late_delivery_risk": (real > scheduled).astype(int),
+                "Category Id": category + 2,
+                "Category Name": pick(CATEGORIES, 0, category),
+                "Customer City": pick(CUSTOMER_LOCATIONS, 2, location),
+                "Customer Country": pick(CUSTOMER_LOCATIONS, 0, location),
+                "Customer Email": "XXXXXXXXX",
+                "Customer Fname": FIRST_NAMES[names % len(FIRST_NAMES)],
+                "Customer Id": customer_id,
+                "Customer Lname": LAST_NAMES[names // len(FIRST_NAMES)],
+                "Customer Password": "XXXXXXXXX",
+                "Customer Segment": np.array(SEGMENTS[0], dtype=object)[self.customer_segment[customer]],
+                "Customer State": pick(CUSTOMER_LOCATIONS, 1, location),
+                "Customer Street": "Synthetic Street",
+                "Customer Zipcode": self.customer_zip[customer],
+                "Department Id": category // 2 + 2,
+                "Department Name": pick(CATEGORIES, 1, category),
+                "Latitude": 18.2 + location * 3.1,
+                "Longitude": -66.0 - location * 4.7,
+                "Market": pick(ORDER_LOCATIONS, 0, order_location),
+                "Order City": pick(ORDER_LOCATIONS, 3, order_location),
+                "Order Country": pick(ORDER_LOCATIONS, 2, order_location),
+                "Order Customer Id": customer_id,
+                "order date (DateOrders)": _format_datetimes(per_row(cols["order_time"])),
+                "Order Id": per_row(cols["order_id"]),
+                "Order Item Cardprod Id": cols["product"] + 1,
+                "Order Item Discount": cols["discount"],
+                "Order Item Discount Rate": cols["discount_rate"],
+                "Order Item Id": cols["item_id"],
+                "Order Item Product Price": cols["price"],
+                "Order Item Profit Ratio": cols["item_ratio"],
+                "Order Item Quantity": cols["quantity"],
+                "Sales": cols["sales"],
+                "Order Item Total": cols["total"],
+                "Order Profit Per Order": cols["profit"],
+                "Order Region": pick(ORDER_LOCATIONS, 1, order_location),
+                "Order State": pick(ORDER_LOCATIONS, 3, order_location),
+                "Order Status": status_text,
+                "Order Zipcode": np.nan,
+                "Product Card Id": cols["product"] + 1,
+                "Product Category Id": category + 2,
+                "Product Description": np.nan,
+                "Product Image": "http://images.example.com/product.jpg",
+                "Product Name": pick(CATEGORIES, 0, category) + " #" + (cols["product"] + 1).astype(str).astype(object),
+                "Product Price": cols["price"],
+                "Product Status": 0,
+                "shipping date (DateOrders)": _format_datetimes(per_row(cols["shipping_time"])),
+                "Shipping Mode": np.array(SHIPPING_MODES[0], dtype=object)[per_row(cols["mode"])],
+            }
+        )
+        return frame[DATACO_COLUMNS]
+
+
+def _csv_writer():
+    """返回 write(frame, f, header)：优先 pyarrow.csv，未安装时用 DataFrame.to_csv"""
+    try:
+        import pyarrow
+        import pyarrow.csv
+    except ImportError:
+        return lambda frame, f, header: frame.to_csv(f, header=header, index=False, float_format="%.10g")
+
+    def write(frame: pd.DataFrame, f, header: bool):
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        pyarrow.csv.write_csv(table, f, pyarrow.csv.WriteOptions(include_header=header))
+
+    return write
+
+
+def _format_datetimes(values: np.ndarray) -> np.ndarray:
+    """datetime64 -> 'M/D/YYYY H:MM'（原始数据集的格式）；先对去重后的时间格式化再按下标取回"""
+    codes, uniques = pd.factorize(values)
+    index = pd.DatetimeIndex(uniques)
+    text = (
+        index.month.astype(str)
+        + "/"
+        + index.day.astype(str)
+        + "/"
+        + index.year.astype(str)
+        + " "
+        + index.hour.astype(str)
+        + ":"
+        + pd.Index(index.minute).astype(str).str.zfill(2)
+    )
+    return np.asarray(text, dtype=object)[codes]
+
+
+def write_dataco_csv(
+    path: Path,
+    orders: int,
+    seed: int = 0,
+    rates: Optional[Dict[str, float]] = None,
+    chunk_orders: int = GENERATE_CHUNK_ORDERS,
+    **generator_kwargs,
+) -> SyntheticManifest:
+    """
+    生成 DataCo 格式 CSV，并把清单写入 manifest_path(path)
+
+    Returns:
+        注入异常清单
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generator = DataCoGenerator(orders, seed=seed, rates=rates, chunk_orders=chunk_orders, **generator_kwargs)
+    manifest = SyntheticManifest(str(path), orders, 0, seed, generator.rates, {name: [] for name in generator.rates})
+
+    write = _csv_writer()
+    with open(path, "wb") as f:
+        for chunk_no, (frame, anomalies) in enumerate(generator.chunks()):
+            write(frame, f, chunk_no == 0)
+            manifest.rows += len(frame)
+            manifest.booked_amounts.extend(anomalies.pop("booked_amounts"))
+            for name, ids in anomalies.items():
+                manifest.anomalies[name].extend(ids)
+
+    manifest.save(manifest_path(path))
+    return manifest
+
+
+def apply_finance_anomalies(finance_db_path: Path, manifest: SyntheticManifest) -> Dict[str, int]:
+    """
+    把清单中的业财差异写入已加载的财务库：删除 missing_ar 订单的应收，改写 amount_mismatch 订单的入账金额
+
+    Returns:
+        各类差异影响的应收行数
+    """
+    mismatches = list(zip(manifest.booked_amounts, manifest.anomalies.get("amount_mismatch", [])))
+    with sqlite3.connect(finance_db_path) as conn:
+        deleted = conn.executemany(
+            "DELETE FROM accounts_receivable WHERE order_id = ?",
+            ((order_id,) for order_id in manifest.anomalies.get("missing_ar", [])),
+        ).rowcount
+        updated = conn.executemany(
+            "UPDATE accounts_receivable SET invoice_amount = ? WHERE order_id = ?", mismatches
+        ).rowcount
+    return {"missing_ar": deleted, "amount_mismatch": updated}
+
+
+def write_erp_export_csv(
+    path: Path,
+    rows: int,
+    seed: int = 0,
+    rates: Optional[Dict[str, float]] = None,
+    chunk_rows: int = GENERATE_CHUNK_ORDERS * 5,
+) -> Dict[str, int]:
+    """
+    生成 scripts/run_real.py 的输入（transaction_id, amount, date, account_code, description）
+
+    负金额与缺失科目互不重叠，run_real 报告的异常数应等于两者之和。
+
+    Returns:
+        {"rows": 行数, "negative_amount": ..., "missing_account_code": ...}
+    """
+    rates = {**DEFAULT_EXPORT_ANOMALY_RATES, **(rates or {})}
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    counts = {"rows": rows, "negative_amount": 0, "missing_account_code": 0}
+    start = np.datetime64(DEFAULT_START_DATE, "D")
+
+    write = _csv_writer()
+    with open(path, "wb") as f:
+        for chunk_no, offset in enumerate(range(0, rows, chunk_rows)):
+            n = min(chunk_rows, rows - offset)
+            rng = np.random.default_rng([seed, 2, chunk_no])
+            u = rng.random(n)
+            negative = u < rates["negative_amount"]
+            missing = (u >= rates["negative_amount"]) & (u < rates["negative_amount"] + rates["missing_account_code"])
+            amount = np.round(rng.gamma(2.0, 150.0, n) + 0.01, 2)
+            account = rng.integers(0, len(EXPORT_ACCOUNTS), n)
+            days = start + rng.integers(0, DEFAULT_MONTHS * 30, n).astype("timedelta64[D]")
+            codes, uniques = pd.factorize(days)
+
+            frame = pd.DataFrame(
+                {
+                    "transaction_id": "TXN" + pd.Series(np.arange(offset + 1, offset + n + 1)).astype(str).str.zfill(9),
+                    "amount": np.where(negative, -amount, amount),
+                    "date": np.asarray(pd.DatetimeIndex(uniques).strftime("%Y-%m-%d"), dtype=object)[codes],
+                    "account_code": np.where(missing, None, EXPORT_ACCOUNTS[account].astype(object)),
+                    "description": EXPORT_DESCRIPTIONS[account],
+                }
+            )
+            write(frame, f, chunk_no == 0)
+            counts["negative_amount"] += int(negative.sum())
+            counts["missing_account_code"] += int(missing.sum())
+    return counts
@@ -0,0 +1,94 @@
+"""Shared fixtures: a tiny DataCo-shaped extract and ERP databases built from it"""
+
+import contextlib
+import io
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.data_engineering.init_erp_databases import ERPDatabaseInitializer
+
+
+def make_dataco_frame():
+    """三行 DataCo 格式的订单明细（订单 2 含两个明细行）"""
+    return pd.DataFrame(
+        {
+            "Order Id": [1, 2, 2],
+            "order date (DateOrders)": ["1/31/2018 22:56", "2/1/2018 08:00", "2/1/2018 08:00"],
+            "Customer Id": [10, 20, 20],
+            "Customer Segment": ["Consumer", "Corporate", "Corporate"],
+            "Customer Country": ["Puerto Rico", "EE. UU.", "EE. UU."],
+            "Customer City": ["Caguas", "Chicago", "Chicago"],
+            "Product Card Id": [100, 200, 100],
+            "Product Name": ["Smart watch", "Cleats", "Smart watch"],
+            "Category Name": ["Electronics", "Cleats", "Electronics"],
+            "Order Item Quantity": [1, 2, 3],
+            "Sales": [100.0, 50.0, 300.0],
+            "Order Item Discount": [5.0, 0.0, 10.0],
+            "Order Profit Per Order": [20.0, -10.0, 300.0],
+            "Order Status": ["COMPLETE", "Completed", "Cancelled"],
+            "Shipping Mode": ["Standard Class", "First Class", "First Class"],
+            "Days for shipment (scheduled)": [4, 1, 1],
+            "Delivery Status": ["Late delivery", "Shipping on time", "Shipping on time"],
+            "Late_delivery_risk": [1, 0, 0],
+        }
+    )
+
+
+def make_audit_frame():
+    """六个订单的 DataCo 格式明细，用于审计流程测试"""
+    return pd.DataFrame(
+        {
+            "Order Id": [101, 102, 103, 104, 105, 106],
+            "order date (DateOrders)": [
+                "1/5/2018 10:00",
+                "1/20/2018 11:00",
+                "2/3/2018 12:00",
+                "2/14/2018 09:30",
+                "3/1/2018 15:00",
+                "3/2/2018 16:00",
+            ],
+            "Customer Id": [1, 2, 3, 1, 2, 3],
+            "Customer Segment": ["Consumer", "Corporate", "Home Office", "Consumer", "Corporate", "Home Office"],
+            "Customer Country": ["EE. UU.", "Puerto Rico", "EE. UU.", "EE. UU.", "Puerto Rico", "EE. UU."],
+            "Customer City": ["Chicago", "Caguas", "Chicago", "Chicago", "Caguas", "Chicago"],
+            "Product Card Id": [1, 2, 3, 1, 2, 3],
+            "Product Name": ["Smart watch", "Cleats", "Tent", "Smart watch", "Cleats", "Tent"],
+            "Category Name": ["Electronics", "Cleats", "Camping", "Electronics", "Cleats", "Camping"],
+            "Order Item Quantity": [1, 2, 1, 3, 1, 2],
+            "Sales": [100.0, 250.0, 80.0, 300.0, 1500.0, 40.0],
+            "Order Item Discount": [0.0, 5.0, 0.0, 10.0, 0.0, 0.0],
+            "Order Profit Per Order": [20.0, -30.0, 10.0, 45.0, -1200.0, 5.0],
+            "Order Status": ["COMPLETE", "PENDING", "CLOSED", "COMPLETE", "PROCESSING", "CANCELED"],
+            "Shipping Mode": ["Standard Class"] * 6,
+            "Days for shipment (scheduled)": [4, 2, 2, 4, 1, 4],
+            "Delivery Status": ["Shipping on time"] * 6,
+            "Late_delivery_risk": [0, 0, 0, 1, 0, 0],
+        }
+    )
+
+
+@pytest.fixture
+def dataco_frame():
+    return make_dataco_frame()
+
+
+@pytest.fixture
+def erp_data_dir(tmp_path):
+    """
+    由 make_audit_frame 构建的三个 ERP 数据库，并注入业财差异：
+    - 订单 102 在财务侧缺失 AR（漏记收入）
+    - 订单 104 的 AR 金额与业务金额不符
+    """
+    initializer = ERPDatabaseInitializer(data_dir=tmp_path)
+    df = make_audit_frame()
+    with contextlib.redirect_stdout(io.StringIO()):
+        initializer.create_operations_db(df)
+        initializer.create_finance_db(df)
+        initializer.create_audit_db()
+
+    with sqlite3.connect(initializer.finance_db_path) as conn:
+        conn.execute("DELETE FROM accounts_receivable WHERE order_id = '102'")
+        conn.execute("UPDATE accounts_receivable SET invoice_amount = 290.0 WHERE order_id = '104'")
+    return tmp_path
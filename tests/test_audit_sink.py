@@ -0,0 +1,187 @@
+"""Tests for the buffered audit log sink"""
+
+import sqlite3
+
+import pytest
+
+from src.audit.audit_sink import AuditLogSink, ensure_audit_schema
+
+
+def _audit_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT entity_type, entity_id, action, notes, risk_level, status FROM audit_logs ORDER BY log_id"
+        ).fetchall()
+
+
+@pytest.mark.unit
+def test_buffering_flushes_all_rules_in_one_transaction(erp_data_dir):
+    db_path = erp_data_dir / "audit.db"
+    sink = AuditLogSink(db_path)
+
+    with sink.buffering():
+        sink.add(["101", "102"], "SC_TIMING_FRAUD", "CRITICAL", "Shipping Date < Order Date")
+        sink.add([105], "SC_NEGATIVE_MARGIN", "MEDIUM", "Profit < 0 on active order")
+        assert _audit_rows(db_path) == []
+
+    assert _audit_rows(db_path) == [
+        ("Order", "101", "SC_TIMING_FRAUD", "Shipping Date < Order Date", "CRITICAL", "Pending"),
+        ("Order", "102", "SC_TIMING_FRAUD", "Shipping Date < Order Date", "CRITICAL", "Pending"),
+        ("Order", "105", "SC_NEGATIVE_MARGIN", "Profit < 0 on active order", "MEDIUM", "Pending"),
+    ]
+    assert [(m.rows, m.batches) for m in sink.flushes] == [(3, 2)]
+    assert sink.metrics()["rows"] == 3
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.mark.unit
+def test_add_outside_buffering_writes_immediately_with_per_row_severity(erp_data_dir):
+    db_path = erp_data_dir / "audit.db"
+    sink = AuditLogSink(db_path)
+
+    sink.add(["201", "202"], "AMOUNT_ANOMALY", ["HIGH", "LOW"], "z-score")
+
+    assert [(row[1], row[4]) for row in _audit_rows(db_path)] == [("201", "HIGH"), ("202", "LOW")]
+    assert sink.metrics()["flushes"] == 1
+
+
+def _findings(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT entity_id, risk_level, first_seen_run, last_seen_run, seen_through_run "
+            "FROM audit_findings ORDER BY entity_id"
+        ).fetchall()
+
+
+@pytest.mark.unit
+def test_rerun_with_unchanged_findings_writes_no_rows(erp_data_dir):
+    db_path = erp_data_dir / "audit.db"
+    sink = AuditLogSink(db_path)
+
+    sink.add(["301", "302"], "SC_TIMING_FRAUD", "HIGH", "Shipping Date < Order Date")
+    first = sink.flushes[-1]
+    sink.add(["302", "301"], "SC_TIMING_FRAUD", "HIGH", "Shipping Date < Order Date")
+    second = sink.flushes[-1]
+
+    assert (first.written, first.rules_unchanged) == (2, 0)
+    assert (second.written, second.rules_unchanged) == (0, 1)
+    # 仍在当前集合中的行 last_seen_run 为空，有效值来自规则的 last_run
+    assert _findings(db_path) == [
+        ("301", "HIGH", first.run_id, None, second.run_id),
+        ("302", "HIGH", first.run_id, None, second.run_id),
+    ]
+    with sqlite3.connect(db_path) as conn:
+        runs = conn.execute("SELECT run_id, findings, rows_written, rules_unchanged FROM audit_runs ORDER BY run_at")
+        assert sorted(runs.fetchall()) == sorted([(first.run_id, 2, 2, 0), (second.run_id, 2, 0, 1)])
+
+
+@pytest.mark.unit
+def test_changed_finding_set_upserts_and_keeps_first_seen(erp_data_dir):
+    db_path = erp_data_dir / "audit.db"
+    sink = AuditLogSink(db_path)
+
+    sink.add(["301", "302"], "SC_TIMING_FRAUD", "HIGH", "Shipping Date < Order Date")
+    first = sink.flushes[-1]
+    sink.add(["301", "302"], "SC_TIMING_FRAUD", "HIGH", "Shipping Date < Order Date")
+    second = sink.flushes[-1]
+    # 302 升级为 CRITICAL，301 不再出现，303 为新发现
+    sink.add(["302", "303"], "SC_TIMING_FRAUD", "CRITICAL", "Shipping Date < Order Date")
+    third = sink.flushes[-1]
+
+    # 302 改写、303 插入、301 关闭
+    assert third.written == 3
+    assert _findings(db_path) == [
+        ("301", "HIGH", first.run_id, second.run_id, second.run_id),
+        ("302", "CRITICAL", first.run_id, None, third.run_id),
+        ("303", "CRITICAL", third.run_id, None, third.run_id),
+    ]
+
+
+@pytest.mark.unit
+def test_changed_finding_set_writes_only_changed_rows(erp_data_dir):
+    db_path = erp_data_dir / "audit.db"
+    sink = AuditLogSink(db_path)
+    orders = [str(order_id) for order_id in range(500, 591)]
+
+    sink.add(orders, "SC_NEGATIVE_MARGIN", "MEDIUM", "Profit < 0 on active order")
+    first = sink.flushes[-1]
+    sink.add(orders + ["591"], "SC_NEGATIVE_MARGIN", "MEDIUM", "Profit < 0 on active order")
+    second = sink.flushes[-1]
+
+    assert (first.written, second.written) == (91, 1)
+    findings = {row[0]: row[2:] for row in _findings(db_path)}
+    assert findings["500"] == (first.run_id, None, second.run_id)
+    assert findings["591"] == (second.run_id, None, second.run_id)
+
+
+@pytest.mark.unit
+def test_finding_dropped_after_consecutive_changes_keeps_last_seen(erp_data_dir):
+    db_path = erp_data_dir / "audit.db"
+    sink = AuditLogSink(db_path)
+
+    sink.add(["a", "b"], "AMOUNT_ANOMALY", "HIGH", "z-score")
+    sink.add(["a", "b", "c"], "AMOUNT_ANOMALY", "HIGH", "z-score")
+    second = sink.flushes[-1]
+    sink.add(["a", "c"], "AMOUNT_ANOMALY", "HIGH", "z-score")
+    third = sink.flushes[-1]
+
+    assert (second.written, third.written) == (1, 1)
+    assert {row[0]: row[4] for row in _findings(db_path)} == {
+        "a": third.run_id,
+        "b": second.run_id,
+        "c": third.run_id,
+    }
+
+
+@pytest.mark.unit
+def test_set_run_markers_are_migrated_to_open_findings(erp_data_dir):
+    db_path = erp_data_dir / "audit.db"
+    sink = AuditLogSink(db_path)
+    sink.add(["601", "602"], "AMOUNT_ANOMALY", "HIGH", "z-score")
+    first = sink.flushes[-1]
+    # 还原为版本 0 的格式：当前集合以 last_seen_run = set_run 标记，602 早已不再出现
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE audit_logs SET last_seen_run = first_seen_run")
+        conn.execute("UPDATE audit_rule_state SET set_run = 'r2', last_run = 'r3'")
+        conn.execute("UPDATE audit_logs SET first_seen_run = 'r1', last_seen_run = 'r2' WHERE entity_id = '601'")
+        conn.execute("PRAGMA user_version = 0")
+
+    with sqlite3.connect(db_path) as conn:
+        ensure_audit_schema(conn)
+
+    assert _findings(db_path) == [
+        ("601", "HIGH", "r1", None, "r3"),
+        ("602", "HIGH", first.run_id, first.run_id, first.run_id),
+    ]
+
+
+@pytest.mark.unit
+def test_legacy_audit_db_is_deduplicated_before_unique_key(tmp_path, capsys):
+    db_path = tmp_path / "audit.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE audit_logs (log_id INTEGER PRIMARY KEY AUTOINCREMENT, audit_type TEXT, "
+            "source_system TEXT, entity_type TEXT, entity_id TEXT, action TEXT, notes TEXT, risk_level TEXT, "
+            "status TEXT DEFAULT 'Pending')"
+        )
+        conn.executemany(
+            "INSERT INTO audit_logs (entity_type, entity_id, action, risk_level) VALUES ('Order', ?, 'AMOUNT_ANOMALY', ?)",
+            [("401", "LOW"), ("401", "HIGH"), ("402", "LOW")],
+        )
+
+    sink = AuditLogSink(db_path)
+    sink.add(["401", "402"], "AMOUNT_ANOMALY", "HIGH", "z-score")
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT log_id, entity_id, risk_level FROM audit_logs ORDER BY log_id").fetchall()
+    # 重复的 401 只保留最新一条（log_id 2），随后两条都被原地更新
+    assert rows == [(2, "401", "HIGH"), (3, "402", "HIGH")]
+    assert sink.flushes[-1].written == 2
+
+    # 被合并掉的历史行原样保存在归档表中，并打印合并的行数
+    with sqlite3.connect(db_path) as conn:
+        archived = conn.execute("SELECT log_id, entity_id, risk_level, archived_at FROM audit_logs_archive").fetchall()
+    assert [row[:3] for row in archived] == [(1, "401", "LOW")]
+    assert archived[0][3] is not None
+    assert "1 条重复的历史记录已移入 audit_logs_archive" in capsys.readouterr().out
@@ -0,0 +1,147 @@
+"""Tests for the shared SQLite connection pool"""
+
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+from src.data_engineering.connection_pool import SQLiteConnectionPool, get_connection_pool
+from src.data_engineering.db_connector import CROSS_DB_WORKERS, ERPDatabaseConnector
+
+
+@pytest.fixture
+def pool():
+    pool = SQLiteConnectionPool()
+    yield pool
+    pool.close_all()
+
+
+@pytest.mark.unit
+def test_connections_are_reused_per_thread_and_mode(pool, erp_data_dir):
+    db_path = erp_data_dir / "db_operations.db"
+    conn = pool.connection(db_path)
+
+    assert pool.connection(db_path) is conn
+    assert pool.connection(db_path, readonly=True) is not conn
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.connection(db_path)))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+@pytest.mark.unit
+def test_thread_exit_closes_its_connections(pool, erp_data_dir):
+    main = pool.connection(erp_data_dir / "audit.db")
+    opened = []
+
+    def worker():
+        opened.append(pool.connection(erp_data_dir / "db_operations.db", readonly=True))
+        opened.append(pool.connection(erp_data_dir / "db_finance.db", readonly=True))
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 只剩主线程仍在使用的连接
+    assert pool._all == {main}
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    assert main.execute("SELECT COUNT(*) FROM audit_logs").fetchone()[0] == 0
+
+
+@pytest.mark.unit
+def test_release_thread_closes_current_thread_connections(pool, erp_data_dir):
+    conn = pool.connection(erp_data_dir / "audit.db")
+    pool.release_thread()
+
+    assert not pool._all
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    # 释放后再次获取时重新打开
+    reopened = pool.connection(erp_data_dir / "audit.db")
+    assert reopened is not conn and pool._all == {reopened}
+    pool.release_thread()
+    pool.release_thread()  # 没有连接时为空操作
+
+
+@pytest.mark.unit
+def test_pragmas_and_query_only(pool, erp_data_dir):
+    conn = pool.connection(erp_data_dir / "audit.db", readonly=True)
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("DELETE FROM audit_logs")
+
+
+@pytest.mark.unit
+def test_close_returns_connection_and_rolls_back(pool, erp_data_dir):
+    conn = pool.connection(erp_data_dir / "audit.db")
+    conn.execute("INSERT INTO audit_logs (entity_id, action) VALUES ('1', 'TEST')")
+    conn.close()
+
+    assert pool.connection(erp_data_dir / "audit.db") is conn
+    assert conn.execute("SELECT COUNT(*) FROM audit_logs").fetchone()[0] == 0
+
+
+@pytest.mark.unit
+def test_connector_reuses_pooled_connection(erp_data_dir):
+    connector = ERPDatabaseConnector(data_dir=erp_data_dir)
+
+    with connector.get_connection("operations", readonly=True) as first:
+        pass
+    assert connector.get_table_count("operations", "sales_orders") == 6
+    assert "sales_orders" in connector.list_tables("operations")
+    with connector.get_connection("operations", readonly=True) as second:
+        assert second is first
+        assert second.row_factory is sqlite3.Row
+    assert first.row_factory is None
+
+
+@pytest.mark.unit
+def test_cross_db_query_parallel_matches_sequential(erp_data_dir):
+    connector = ERPDatabaseConnector(data_dir=erp_data_dir)
+    queries = (
+        "SELECT order_id, sales FROM sales_orders ORDER BY order_id",
+        "SELECT order_id, invoice_amount FROM accounts_receivable ORDER BY order_id",
+        "SELECT COUNT(*) AS n FROM audit_logs",
+    )
+
+    parallel = connector.cross_db_query(*queries)
+    sequential = connector.cross_db_query(*queries, parallel=False)
+
+    assert list(parallel) == ["operations", "finance", "audit"]
+    for db_name, df in sequential.items():
+        pd.testing.assert_frame_equal(parallel[db_name], df)
+
+
+@pytest.mark.unit
+def test_cross_db_query_timeout_interrupts_query(erp_data_dir):
+    connector = ERPDatabaseConnector(data_dir=erp_data_dir)
+    endless = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT MAX(i) FROM n"
+
+    with pytest.raises(TimeoutError):
+        connector.cross_db_query(endless, "SELECT 1", timeout=0.05)
+    # 超时后连接仍可继续使用
+    assert connector.get_table_count("operations", "sales_orders") == 6
+
+
+@pytest.mark.unit
+def test_repeated_cross_db_query_keeps_pool_bounded(erp_data_dir):
+    connector = ERPDatabaseConnector(data_dir=erp_data_dir)
+    pool = get_connection_pool()
+    before = len(pool._all)
+
+    for _ in range(100):
+        result = connector.cross_db_query("SELECT 1 AS x", "SELECT 1 AS x", "SELECT 1 AS x")
+    assert [df["x"].iloc[0] for df in result.values()] == [1, 1, 1]
+
+    # 常驻工作线程各自最多为三个数据库各开一个只读连接
+    assert len(pool._all) - before <= CROSS_DB_WORKERS * 3
+    assert sum(thread.name.startswith("cross-db") for thread in threading.enumerate()) <= CROSS_DB_WORKERS
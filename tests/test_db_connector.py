@@ -0,0 +1,67 @@
+"""Tests for the streaming / columnar result API of ERPDatabaseConnector"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_engineering.db_connector import ERPDatabaseConnector
+
+GL_QUERY = "SELECT entry_id, order_id, account_code, debit_amount, credit_amount FROM general_ledger ORDER BY entry_id"
+
+
+@pytest.fixture
+def connector(erp_data_dir):
+    return ERPDatabaseConnector(data_dir=erp_data_dir)
+
+
+@pytest.mark.unit
+def test_iter_query_matches_execute_query(connector):
+    assert list(connector.iter_query("finance", GL_QUERY, chunksize=4)) == connector.execute_query("finance", GL_QUERY)
+
+
+@pytest.mark.unit
+def test_iter_query_df_streams_bounded_chunks(connector):
+    chunks = list(connector.iter_query_df("finance", GL_QUERY, chunksize=5))
+
+    assert [len(chunk) for chunk in chunks] == [5, 5, 2]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True), connector.execute_query_df("finance", GL_QUERY), check_dtype=False
+    )
+
+
+@pytest.mark.unit
+def test_execute_query_columns_numpy(connector):
+    columns = connector.execute_query_columns(
+        "operations",
+        "SELECT order_id, order_quantity, NULLIF(order_quantity, 2) AS qty, sales FROM sales_orders ORDER BY order_id",
+    )
+
+    assert columns["order_id"].dtype == object
+    assert columns["order_id"].tolist() == ["101", "102", "103", "104", "105", "106"]
+    assert columns["order_quantity"].dtype == np.int64
+    assert columns["sales"].dtype == np.float64
+    # 含 NULL 的整数列转为 float64，NULL 为 NaN
+    np.testing.assert_array_equal(columns["qty"], [1.0, np.nan, 1.0, 3.0, 1.0, np.nan])
+
+
+@pytest.mark.unit
+def test_execute_query_columns_arrow(connector):
+    pytest.importorskip("pyarrow")
+
+    table = connector.execute_query_columns("finance", GL_QUERY, backend="arrow")
+
+    assert table.num_rows == 12
+    assert table.column("order_id").to_pylist()[:2] == ["101", "101"]
+    assert connector.execute_query_columns("finance", f"{GL_QUERY} LIMIT 0", backend="arrow").column_names == [
+        "entry_id",
+        "order_id",
+        "account_code",
+        "debit_amount",
+        "credit_amount",
+    ]
+
+
+@pytest.mark.unit
+def test_unknown_column_backend_raises(connector):
+    with pytest.raises(ValueError, match="未知的列式后端"):
+        list(connector.iter_query_columns("finance", GL_QUERY, backend="polars"))
@@ -1,6 +1,7 @@
 """E2E tests for run-real path"""
 
 import glob
+import json
 import subprocess
 
 import pytest
@@ -19,3 +20,83 @@ def test_run_real():
     # Check output files exist
     report_files = glob.glob("artifacts/reconciliation_report_*.json")
     assert len(report_files) > 0, "No report file generated"
+
+
+def _run_real_report(csv_path, output_dir, *extra):
+    result = subprocess.run(
+        ["python", "scripts/run_real.py", str(csv_path), "--output", str(output_dir), *extra],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, f"run-real failed: {result.stderr}"
+    (report_file,) = glob.glob(f"{output_dir}/reconciliation_report_*.json")
+    with open(report_file) as f:
+        report = json.load(f)
+    return {k: v for k, v in report.items() if k not in ("run_id", "timestamp")}
+
+
+@pytest.mark.e2e
+def test_run_real_report_contents(tmp_path):
+    """Single-pass scan reports the sample's negative amount and missing account"""
+    report = _run_real_report("data/sample_erp.csv", tmp_path)
+
+    assert report["rows_processed"] == 4
+    assert report["anomalies_found"] == 2
+    assert report["anomaly_list"] == [
+        {"row": 1, "type": "negative_amount", "value": -500.0},
+        {"row": 3, "type": "missing_account_code"},
+    ]
+
+
+@pytest.mark.e2e
+def test_run_real_workers_match_single_process(tmp_path):
+    """Byte-range workers and small chunks merge to the same report as one sequential pass"""
+    csv_path = tmp_path / "erp.csv"
+    lines = ["transaction_id,amount,date,account_code,description"]
+    for i in range(60):
+        amount = -1 if i % 7 == 0 else 5
+        account = "" if i % 5 == 0 else "1000"
+        lines.append(f'T{i},{amount},2024-01-01,{account},"Sales, Revenue"')
+    csv_path.write_text("\n".join(lines) + "\n")
+
+    expected = _run_real_report(csv_path, tmp_path / "serial")
+    assert expected["rows_processed"] == 60
+    assert expected["anomalies_found"] == 9 + 12
+    assert expected["anomaly_list"][:3] == [
+        {"row": 0, "type": "negative_amount", "value": -1.0},
+        {"row": 0, "type": "missing_account_code"},
+        {"row": 5, "type": "missing_account_code"},
+    ]
+    assert len(expected["anomaly_list"]) == 10
+
+    parallel = _run_real_report(csv_path, tmp_path / "parallel", "--workers", "3", "--chunksize", "7")
+    assert parallel == expected
+
+
+@pytest.mark.e2e
+def test_benchmark_suite_detects_injected_anomalies(tmp_path):
+    """Tiny-scale suite run: every step is timed and every injected anomaly is detected"""
+    output = tmp_path / "benchmark.json"
+    result = subprocess.run(
+        [
+            "python",
+            "scripts/benchmark_suite.py",
+            "--scales",
+            "2k",
+            "--work-dir",
+            str(tmp_path / "work"),
+            "--output",
+            str(output),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, f"benchmark suite failed: {result.stdout}{result.stderr}"
+
+    with open(output) as f:
+        (scale,) = json.load(f)["scales"]
+    assert scale["orders"] == 2000
+    assert scale["all_detected"], scale["checks"]
+    steps = {step["step"]: step for step in scale["steps"]}
+    assert {"initialize", "reconcile_operations_finance", "evaluate_all_rules", "run_real"} <= set(steps)
+    assert all(step["wall_s"] > 0 and step["peak_rss_mb"] >= step["start_rss_mb"] for step in steps.values())
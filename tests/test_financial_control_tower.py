@@ -0,0 +1,199 @@
+"""Tests for FinancialControlTower audit stages"""
+
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+from src.audit.financial_control_tower import AuditPeriod, FinancialControlTower
+from src.data_engineering.connection_pool import get_connection_pool
+
+
+@pytest.fixture
+def tower(erp_data_dir):
+    return FinancialControlTower(data_dir=erp_data_dir)
+
+
+@pytest.mark.unit
+def test_sql_reconciliation_matches_pandas(tower):
+    by_pandas = tower._reconcile_with_pandas()
+    by_sql = tower._reconcile_with_sql()
+
+    assert (by_sql.ops_count, by_sql.fin_count, by_sql.matched_count) == (
+        by_pandas.ops_count,
+        by_pandas.fin_count,
+        by_pandas.matched_count,
+    )
+    pd.testing.assert_frame_equal(by_sql.missing_in_fin, by_pandas.missing_in_fin)
+    pd.testing.assert_frame_equal(by_sql.amount_mismatch, by_pandas.amount_mismatch)
+    assert by_sql.missing_in_fin["order_id"].tolist() == ["102"]
+    assert by_sql.amount_mismatch["order_id"].tolist() == ["104"]
+
+
+@pytest.mark.unit
+def test_reconcile_logs_exceptions_for_selected_engine(tower, erp_data_dir):
+    tower.reconcile_operations_finance(engine="sql")
+
+    with sqlite3.connect(erp_data_dir / "audit.db") as conn:
+        rows = conn.execute("SELECT entity_id, action FROM audit_logs ORDER BY entity_id").fetchall()
+    assert rows == [("102", "RECON_MISSING_AR"), ("104", "RECON_AMOUNT_MISMATCH")]
+
+
+@pytest.mark.unit
+def test_unknown_recon_engine_rejected(tower):
+    with pytest.raises(ValueError):
+        tower.reconcile_operations_finance(engine="spark")
+
+
+def _audit_rows(data_dir):
+    with sqlite3.connect(data_dir / "audit.db") as conn:
+        return conn.execute(
+            "SELECT entity_id, action, risk_level FROM audit_logs ORDER BY action, entity_id"
+        ).fetchall()
+
+
+def _console_lines(out):
+    lines = [line for line in out.splitlines() if line and "审计日期" not in line and "并行完成" not in line]
+    return [re.sub(r"\(\d+\.\d+s\)", "(…s)", line) for line in lines]
+
+
+@pytest.mark.unit
+def test_parallel_audit_matches_sequential(tower, erp_data_dir, capsys):
+    tower.run_full_audit(recon_engine="sql")
+    sequential_out = capsys.readouterr().out
+    sequential_rows = _audit_rows(erp_data_dir)
+    with sqlite3.connect(erp_data_dir / "audit.db") as conn:
+        conn.execute("DELETE FROM audit_logs")
+
+    tower.run_full_audit(recon_engine="sql", parallel=True)
+    parallel_out = capsys.readouterr().out
+
+    assert _audit_rows(erp_data_dir) == sequential_rows
+    # 阶段输出按固定顺序回放，除审计日期、耗时行与耗时数值外与串行模式一致
+    assert _console_lines(parallel_out) == _console_lines(sequential_out)
+    assert parallel_out.index("[Process 1]") < parallel_out.index("[Process 2]") < parallel_out.index("[Process 3]")
+
+
+@pytest.mark.unit
+def test_repeated_parallel_audits_release_stage_connections(tower, capsys):
+    pool = get_connection_pool()
+    tower.run_full_audit(recon_engine="sql", parallel=True)
+    before = set(pool._all)
+
+    for _ in range(5):
+        tower.run_full_audit(recon_engine="sql", parallel=True)
+    capsys.readouterr()
+
+    # 阶段线程的只读连接在阶段结束时关闭，只剩主线程的连接
+    assert set(pool._all) == before
+    assert not any(thread.name.startswith("audit-stage") for thread in threading.enumerate())
+
+
+@pytest.mark.unit
+def test_audit_findings_are_graded_per_order(tower, erp_data_dir):
+    tower.reconcile_operations_finance(engine="sql")
+    tower.audit_supply_chain_risks()
+
+    # 102 亏损 $30 -> MEDIUM；105 亏损 $1,200 -> CRITICAL；104 金额差异 $10 -> MEDIUM
+    assert _audit_rows(erp_data_dir) == [
+        ("104", "RECON_AMOUNT_MISMATCH", "MEDIUM"),
+        ("102", "RECON_MISSING_AR", "HIGH"),
+        ("102", "SC_NEGATIVE_MARGIN", "MEDIUM"),
+        ("105", "SC_NEGATIVE_MARGIN", "CRITICAL"),
+    ]
+
+
+@pytest.mark.unit
+def test_reconciliation_findings_keep_constant_levels(tower, erp_data_dir):
+    # 金额恰在 $1,000 / $100 两侧：对账风险不按金额升级，一律 HIGH / MEDIUM
+    with sqlite3.connect(erp_data_dir / "db_operations.db") as conn:
+        conn.executemany("UPDATE sales_orders SET sales = ? WHERE order_id = ?", [(1000.0, "101"), (999.99, "102")])
+    with sqlite3.connect(erp_data_dir / "db_finance.db") as conn:
+        conn.execute("DELETE FROM accounts_receivable WHERE order_id = '101'")
+        conn.executemany(
+            "UPDATE accounts_receivable SET invoice_amount = ? WHERE order_id = ?", [(180.0, "103"), (200.01, "104")]
+        )
+
+    result = tower.reconcile_operations_finance(engine="sql")
+
+    assert sorted(result.missing_in_fin["expected_revenue"]) == [999.99, 1000.0]
+    assert sorted(result.amount_mismatch["diff"].round(2)) == [99.99, 100.0]
+    assert _audit_rows(erp_data_dir) == [
+        ("103", "RECON_AMOUNT_MISMATCH", "MEDIUM"),
+        ("104", "RECON_AMOUNT_MISMATCH", "MEDIUM"),
+        ("101", "RECON_MISSING_AR", "HIGH"),
+        ("102", "RECON_MISSING_AR", "HIGH"),
+    ]
+
+
+@pytest.mark.unit
+def test_snapshot_cache_reuses_audit_inputs(tower, erp_data_dir):
+    pytest.importorskip("pyarrow")
+    cached = FinancialControlTower(data_dir=erp_data_dir, snapshot_cache=True)
+    cached.snapshots.clear()
+
+    cached.run_full_audit()
+    expected = _audit_rows(erp_data_dir)
+    with sqlite3.connect(erp_data_dir / "audit.db") as conn:
+        conn.execute("DELETE FROM audit_logs")
+    cached.run_full_audit()
+
+    # 第一次写入 recon_ops / recon_fin / supply_chain 三个快照，第二次全部命中
+    assert (cached.snapshots.hits, cached.snapshots.misses) == (3, 3)
+    assert _audit_rows(erp_data_dir) == expected
+    pd.testing.assert_frame_equal(
+        cached._reconcile_with_pandas().missing_in_fin, tower._reconcile_with_pandas().missing_in_fin
+    )
+
+
+@pytest.mark.unit
+def test_snapshot_counts_are_reported_per_run(erp_data_dir, capsys):
+    pytest.importorskip("pyarrow")
+    cached = FinancialControlTower(data_dir=erp_data_dir, snapshot_cache=True)
+    cached.snapshots.clear()
+
+    counts = []
+    for month in (1, 1, 2):
+        cached.run_monthly_close(month=month, year=2018)
+        counts.append(re.search(r"审计输入快照: 命中 (\d+) / 重建 (\d+)", capsys.readouterr().out).groups())
+
+    # 月结默认用 SQL 对账，只缓存供应链输入；每次只报告本次运行的命中 / 重建数，而不是累计值
+    assert counts == [("0", "1"), ("1", "0"), ("0", "1")]
+
+
+@pytest.mark.unit
+def test_period_reconciliation_engines_agree(tower):
+    february = AuditPeriod(2018, 2)
+    by_pandas = tower._reconcile_with_pandas(february)
+    by_sql = tower._reconcile_with_sql(february)
+
+    assert (by_sql.ops_count, by_sql.fin_count, by_sql.matched_count) == (2, 2, 2)
+    assert (by_pandas.ops_count, by_pandas.fin_count, by_pandas.matched_count) == (2, 2, 2)
+    assert by_sql.missing_in_fin.empty and by_pandas.missing_in_fin.empty
+    pd.testing.assert_frame_equal(by_sql.amount_mismatch, by_pandas.amount_mismatch)
+    assert by_sql.amount_mismatch["order_id"].tolist() == ["104"]
+
+
+@pytest.mark.unit
+def test_monthly_close_audits_only_that_period(tower, erp_data_dir, capsys):
+    assert tower.run_monthly_close(month=1, year=2018) == AuditPeriod(2018, 1)
+    out = capsys.readouterr().out
+
+    # 一月只有订单 101 / 102：102 漏记收入且负毛利；二、三月的 104 / 105 不在本期
+    assert _audit_rows(erp_data_dir) == [("102", "RECON_MISSING_AR", "HIGH"), ("102", "SC_NEGATIVE_MARGIN", "MEDIUM")]
+    assert "会计期间: 2018-01" in out
+    assert "P&L - 2018-01" in out
+
+
+@pytest.mark.unit
+def test_monthly_close_defaults_to_latest_period(tower, capsys):
+    assert tower.latest_period() == AuditPeriod(2018, 3)
+    assert tower.run_monthly_close() == AuditPeriod(2018, 3)
+    assert tower._resolve_period(month=2, year=None) == AuditPeriod(2018, 2)
+    assert tower._resolve_period(month=None, year=2018) == AuditPeriod(2018, 3)
+    with pytest.raises(ValueError):
+        tower.run_monthly_close(month=13, year=2018)
+    with pytest.raises(ValueError):
+        tower.run_monthly_close(year=2016)
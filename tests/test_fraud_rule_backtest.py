@@ -0,0 +1,103 @@
+"""Tests for the partitioned fraud rule backtest"""
+
+import sqlite3
+
+import pytest
+
+from fraud_rule_backtest import BacktestPartition, FraudRuleBacktester, evaluate_partition, month_partitions
+from fraud_rule_metrics import FraudRuleType
+
+GRID = {
+    FraudRuleType.TIMING_FRAUD: (-14, -7, 0),
+    FraudRuleType.NEGATIVE_MARGIN: (-1000, 0),
+}
+
+
+@pytest.fixture
+def backtester(erp_data_dir):
+    """与 test_fraud_rule_metrics 相同的物流异常：101 早发 16 天（欺诈），103 早发 2 天，104 无发货"""
+    with sqlite3.connect(erp_data_dir / "db_operations.db") as conn:
+        conn.executemany(
+            "INSERT INTO shipping_logs (order_id, shipping_date) VALUES (?, ?)",
+            [("101", "2017-12-20"), ("103", "2018-02-01")],
+        )
+        conn.execute("DELETE FROM shipping_logs WHERE order_id = '104'")
+    return FraudRuleBacktester(data_dir=erp_data_dir, grid=GRID, workers=1)
+
+
+@pytest.mark.unit
+def test_month_partitions_clip_to_range():
+    assert month_partitions("2017-12-15", "2018-02-10") == [
+        BacktestPartition("2017-12", "2017-12-15", "2017-12-31"),
+        BacktestPartition("2018-01", "2018-01-01", "2018-01-31"),
+        BacktestPartition("2018-02", "2018-02-01", "2018-02-10"),
+    ]
+
+
+@pytest.mark.unit
+def test_backtest_partitions_full_history(backtester):
+    results = backtester.run()
+
+    assert results["period"].unique().tolist() == ["2018-01", "2018-02", "2018-03"]
+    assert len(results) == 3 * 5
+    # 各分区之和等于整段评估：阈值 0 即默认规则
+    timing = results[(results["rule_type"] == "timing_fraud") & (results["threshold_value"] == 0)]
+    cells = timing[["true_positives", "false_positives", "true_negatives", "false_negatives"]].sum().tolist()
+    assert cells == [1, 1, 4, 0]
+
+
+@pytest.mark.unit
+def test_partition_matches_single_rule_evaluation(backtester):
+    partition = BacktestPartition("2018-01", "2018-01-01", "2018-01-31")
+    rows = {
+        (rule, threshold): cells
+        for _, rule, threshold, *cells in evaluate_partition(backtester.data_dir, partition, GRID)
+    }
+
+    context = backtester.manager.load_evaluation_context(partition.start_date, partition.end_date)
+    expected = {m.rule_type.value: m for m in backtester.manager.evaluate_rules(context, list(GRID))}
+    for rule, metrics in expected.items():
+        threshold = backtester.manager.thresholds[FraudRuleType(rule)].threshold_value
+        tn, fn, fp, tp = rows[(rule, threshold)]
+        assert (tp, fp, tn, fn) == (
+            metrics.true_positives,
+            metrics.false_positives,
+            metrics.true_negatives,
+            metrics.false_negatives,
+        )
+
+
+@pytest.mark.unit
+def test_process_pool_matches_serial_run(backtester):
+    serial = backtester.run("2018-01-01", "2018-03-31")
+    backtester.workers = 2
+
+    assert backtester.run("2018-01-01", "2018-03-31").equals(serial)
+
+
+@pytest.mark.unit
+def test_precision_recall_curves(backtester):
+    curves = backtester.precision_recall_curves(backtester.run())
+
+    assert sorted(curves) == ["negative_margin", "timing_fraud"]
+    timing = curves["timing_fraud"].set_index("threshold_value")
+    assert timing.index.tolist() == [-14.0, -7.0, 0.0]
+    # 阈值放宽：召回不降，精度不升
+    assert timing["recall"].is_monotonic_increasing
+    assert timing["precision"].is_monotonic_decreasing
+    assert timing.loc[-14.0, ["precision", "recall"]].tolist() == [1.0, 1.0]
+    assert timing.loc[0.0, "precision"] == 0.5
+
+
+@pytest.mark.unit
+def test_save_writes_all_rows_in_one_batch(backtester, erp_data_dir):
+    results = backtester.run()
+
+    assert backtester.save(results, notes="backtest test") == len(results)
+    with sqlite3.connect(erp_data_dir / "audit.db") as conn:
+        rows = conn.execute(
+            "SELECT evaluation_period, rule_type, threshold_config FROM fraud_rule_metrics WHERE notes = 'backtest test'"
+        ).fetchall()
+    assert len(rows) == len(results)
+    assert rows[0][:2] == ("2018-01", "timing_fraud")
+    assert '"threshold_value": -14.0' in rows[0][2]
@@ -0,0 +1,252 @@
+"""Tests for fraud rule evaluation"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fraud_rule_metrics import (
+    CustomerFrequencyCounter,
+    FraudRuleManager,
+    FraudRuleType,
+    SegmentZScoreDetector,
+    confusion_matrices,
+    grouped_rule_metrics,
+)
+
+
+@pytest.fixture
+def manager(erp_data_dir):
+    """
+    在审计样例上注入物流异常：
+    - 订单 101 追加一条早于下单 16 天的发货记录（确认欺诈）
+    - 订单 103 追加一条早于下单 2 天的发货记录（可疑）
+    - 订单 104 没有发货记录
+    """
+    with sqlite3.connect(erp_data_dir / "db_operations.db") as conn:
+        conn.executemany(
+            "INSERT INTO shipping_logs (order_id, shipping_date) VALUES (?, ?)",
+            [("101", "2017-12-20"), ("103", "2018-02-01")],
+        )
+        conn.execute("DELETE FROM shipping_logs WHERE order_id = '104'")
+    return FraudRuleManager(data_dir=erp_data_dir)
+
+
+def _cells(metrics):
+    return metrics.true_positives, metrics.false_positives, metrics.true_negatives, metrics.false_negatives
+
+
+@pytest.mark.unit
+def test_confusion_matrices_counts_every_rule_in_one_pass():
+    triggered = np.array([[True, True, False, False], [True, False, False, True]])
+    is_fraud = np.array([[True, False, False, True], [True, True, False, False]])
+    scope = np.array([[True, True, True, True], [True, True, False, True]])
+
+    # 列顺序 TN, FN, FP, TP
+    assert confusion_matrices(triggered, is_fraud).tolist() == [[1, 1, 1, 1], [1, 1, 1, 1]]
+    assert confusion_matrices(triggered, is_fraud, scope).tolist() == [[1, 1, 1, 1], [0, 1, 1, 1]]
+
+
+@pytest.mark.unit
+def test_confusion_matrices_by_group_skips_ungrouped_rows():
+    triggered = np.array([True, True, False, False, True])
+    is_fraud = np.array([True, False, False, True, True])
+    groups = np.array([0, 1, 1, 0, -1])
+
+    assert confusion_matrices(triggered, is_fraud, groups=groups).tolist() == [[[0, 1, 0, 1], [1, 0, 1, 0]]]
+    assert confusion_matrices(triggered, is_fraud, groups=groups, n_groups=3)[0, 2].tolist() == [0, 0, 0, 0]
+
+
+@pytest.mark.unit
+def test_grouped_rule_metrics_by_label():
+    metrics = grouped_rule_metrics(
+        FraudRuleType.NEGATIVE_MARGIN,
+        "2018",
+        triggered=np.array([True, False, True]),
+        is_fraud=np.array([True, False, False]),
+        groups=["EE. UU.", None, "EE. UU."],
+    )
+
+    assert list(metrics) == ["EE. UU."]
+    assert _cells(metrics["EE. UU."]) == (1, 1, 0, 0)
+
+
+@pytest.mark.unit
+def test_evaluate_all_rules_uses_one_context(manager, monkeypatch):
+    loads = []
+    load = manager.load_evaluation_context
+    monkeypatch.setattr(manager, "load_evaluation_context", lambda *args: loads.append(args) or load(*args))
+
+    results = {m.rule_type: m for m in manager.evaluate_all_rules()}
+
+    assert len(loads) == 1
+    assert list(results) == [
+        FraudRuleType.TIMING_FRAUD,
+        FraudRuleType.NEGATIVE_MARGIN,
+        FraudRuleType.AMOUNT_ANOMALY,
+        FraudRuleType.FREQUENCY_ANOMALY,
+    ]
+    # 时间欺诈逐发货记录：订单 101/102/103/105 共 6 条记录，订单 104 无发货不参与
+    assert _cells(results[FraudRuleType.TIMING_FRAUD]) == (1, 1, 4, 0)
+    # 负毛利逐订单：101-105（106 已取消），多条发货记录不重复计数
+    assert _cells(results[FraudRuleType.NEGATIVE_MARGIN]) == (1, 1, 3, 0)
+    # 每个分段最多两个订单，Z-score 不可能达到 3
+    assert _cells(results[FraudRuleType.AMOUNT_ANOMALY]) == (0, 0, 5, 0)
+    assert _cells(results[FraudRuleType.FREQUENCY_ANOMALY]) == (0, 0, 5, 0)
+
+
+@pytest.mark.unit
+def test_evaluation_window_and_rule_selection(manager):
+    context = manager.load_evaluation_context("2018-02-01", "2018-02-28")
+
+    assert sorted(context.rows["order_id"].unique()) == ["103", "104"]
+    results = manager.evaluate_rules(context, [FraudRuleType.NEGATIVE_MARGIN, FraudRuleType.CUSTOMER_RISK])
+    assert [m.rule_type for m in results] == [FraudRuleType.NEGATIVE_MARGIN]
+    assert results[0].evaluation_period == "2018-02-01 to 2018-02-28"
+    assert _cells(results[0]) == (0, 0, 2, 0)
+
+
+@pytest.mark.unit
+def test_single_rule_evaluation_matches_shared_context(manager):
+    shared = {m.rule_type: _cells(m) for m in manager.evaluate_all_rules()}
+
+    assert _cells(manager.evaluate_timing_fraud_rule()) == shared[FraudRuleType.TIMING_FRAUD]
+    assert _cells(manager.evaluate_negative_margin_rule()) == shared[FraudRuleType.NEGATIVE_MARGIN]
+
+
+@pytest.mark.unit
+def test_evaluate_rules_by_group(manager):
+    context = manager.load_evaluation_context()
+
+    by_month = manager.evaluate_rules_by_group(context, "month")
+    assert list(by_month) == ["2018-01", "2018-02", "2018-03"]
+    assert [_cells(m) for m in by_month["2018-01"]] == [(1, 0, 2, 0), (0, 1, 1, 0), (0, 0, 2, 0), (0, 0, 2, 0)]
+    assert [_cells(m) for m in by_month["2018-02"]] == [(0, 1, 1, 0), (0, 0, 2, 0), (0, 0, 2, 0), (0, 0, 2, 0)]
+
+    by_region = manager.evaluate_rules_by_group(context, "region", [FraudRuleType.NEGATIVE_MARGIN])
+    assert {region: _cells(m[0]) for region, m in by_region.items()} == {
+        "EE. UU.": (0, 0, 3, 0),
+        "Puerto Rico": (1, 1, 0, 0),
+    }
+
+    with pytest.raises(ValueError, match="未知的分组维度"):
+        manager.evaluate_rules_by_group(context, "weekday")
+
+
+def _amount_orders():
+    """分段 (Cleats, Consumer) 的 20 个常规金额加一个离群值，另有一个只有两单的分段"""
+    sales = [100.0 + (i % 5) for i in range(20)] + [400.0]
+    return pd.DataFrame(
+        {
+            "order_id": [str(i) for i in range(21)] + ["90", "91"],
+            "category_name": ["Cleats"] * 21 + ["Tent", "Tent"],
+            "customer_segment": ["Consumer"] * 21 + ["Corporate", "Corporate"],
+            "sales": sales + [50.0, 5000.0],
+        }
+    )
+
+
+@pytest.mark.unit
+def test_segment_detector_streaming_matches_batch_statistics():
+    orders = _amount_orders()
+    detector = SegmentZScoreDetector(FraudRuleManager.DEFAULT_THRESHOLDS[FraudRuleType.AMOUNT_ANOMALY])
+
+    for start in range(0, len(orders), 4):
+        detector.update(orders.iloc[start : start + 4])
+
+    expected = orders.groupby(["category_name", "customer_segment"])["sales"].agg(["count", "mean", "var"])
+    assert detector.count == len(orders)
+    np.testing.assert_allclose(detector.stats["count"].sort_index(), expected["count"])
+    np.testing.assert_allclose(detector.stats["mean"].sort_index(), expected["mean"])
+    np.testing.assert_allclose(detector.variance().sort_index(), expected["var"])
+
+    cleats = orders["sales"].iloc[:21]
+    z_scores = detector.score(orders)
+    np.testing.assert_allclose(z_scores[:21], (cleats - cleats.mean()) / cleats.std())
+    # 两单的分段可以计算 Z-score，但绝对值不会超过 1
+    assert np.abs(z_scores[21:]).max() < 1
+
+
+@pytest.mark.unit
+def test_segment_detector_flags_outlier_with_severity():
+    threshold = FraudRuleManager.DEFAULT_THRESHOLDS[FraudRuleType.AMOUNT_ANOMALY]
+    detector = SegmentZScoreDetector(threshold, min_count=3)
+
+    anomalies = detector.detect(_amount_orders())
+
+    assert anomalies["order_id"].tolist() == ["20"]
+    z_score = anomalies["z_score"].iloc[0]
+    assert 4 < z_score < 5
+    assert anomalies["severity"].tolist() == [threshold.get_severity(z_score)] == ["HIGH"]
+    assert np.isnan(detector.score(_amount_orders().tail(2))).all()
+
+
+@pytest.mark.unit
+def test_detect_amount_anomalies_streams_orders_in_chunks(manager):
+    with sqlite3.connect(manager.db_ops) as conn:
+        conn.executemany(
+            "INSERT INTO sales_orders (order_id, order_date, category_name, customer_segment, sales, order_status)"
+            " VALUES (?, '2018-03-05', 'Cleats', 'Corporate', ?, 'COMPLETE')",
+            [(f"7{i:02d}", 250.0 + i % 3) for i in range(20)] + [("799", 5000.0)],
+        )
+
+    anomalies = manager.detect_amount_anomalies(chunksize=4)
+
+    assert anomalies["order_id"].tolist() == ["799"]
+    assert anomalies["severity"].tolist() == ["HIGH"]
+    assert manager.detect_amount_anomalies("2019-01-01", "2019-12-31").empty
+    with sqlite3.connect(manager.db_audit) as conn:
+        rows = conn.execute("SELECT entity_type, entity_id, action, risk_level FROM audit_logs").fetchall()
+    assert rows == [("Order", "799", "AMOUNT_ANOMALY", "HIGH")]
+
+
+def _frequency_orders(days_and_counts, customer="1"):
+    return pd.DataFrame(
+        [{"customer_id": customer, "order_date": day} for day, count in days_and_counts for _ in range(count)]
+    )
+
+
+@pytest.mark.unit
+def test_frequency_counter_sliding_windows_are_incremental():
+    threshold = FraudRuleManager.DEFAULT_THRESHOLDS[FraudRuleType.FREQUENCY_ANOMALY]
+    orders = pd.concat(
+        [
+            _frequency_orders([("2018-01-01", 4), ("2018-01-02", 5), ("2018-01-04", 3)]),
+            _frequency_orders([("2018-01-02", 1)], customer="2"),
+        ],
+        ignore_index=True,
+    )
+
+    batch = CustomerFrequencyCounter(threshold, window_days=3, prune=False)
+    batch.update(orders)
+    incremental = CustomerFrequencyCounter(threshold, window_days=3)
+    windows = [incremental.update(orders[orders["order_date"] == day]) for day in sorted(orders["order_date"].unique())]
+
+    # 窗口 [d-2, d]：1/1 -> 4，1/2 -> 9，1/4 -> 5 + 3
+    assert batch.order_counts(orders).tolist() == [4] * 4 + [9] * 5 + [8] * 3 + [1]
+    assert pd.concat(windows)[["customer_id", "window_end", "order_count"]].values.tolist() == [
+        ["1", "2018-01-01", 4],
+        ["1", "2018-01-02", 9],
+        ["2", "2018-01-02", 1],
+        ["1", "2018-01-04", 8],
+    ]
+    # 1/4 之后只保留 1/2 起的桶
+    assert incremental.counts.tolist() == [5, 3, 1]
+
+
+@pytest.mark.unit
+def test_detect_frequency_anomalies_logs_customers_to_audit_db(manager, erp_data_dir):
+    with sqlite3.connect(manager.db_ops) as conn:
+        conn.executemany(
+            "INSERT INTO sales_orders (order_id, order_date, customer_id, order_status) VALUES (?, ?, ?, 'COMPLETE')",
+            [(f"8{i:02d}", "2018-03-10", "2") for i in range(16)]
+            + [(f"9{i:02d}", "2018-03-11", "3") for i in range(9)],
+        )
+
+    anomalies = manager.detect_frequency_anomalies(chunksize=5)
+
+    assert anomalies.values.tolist() == [["2", "2018-03-10", 16, "MEDIUM"]]
+    with sqlite3.connect(erp_data_dir / "audit.db") as conn:
+        rows = conn.execute("SELECT entity_type, entity_id, action, risk_level, notes FROM audit_logs").fetchall()
+    assert rows == [("Customer", "2", "FREQUENCY_ANOMALY", "MEDIUM", "1 天内（截至 2018-03-10）下单 16 笔")]
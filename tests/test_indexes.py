@@ -0,0 +1,74 @@
+"""Tests for managed index provisioning and query-plan checks"""
+
+import contextlib
+import io
+import sqlite3
+
+import pytest
+
+from fraud_rule_metrics import RULE_QUERIES, build_context_query, build_rule_query
+from src.audit.financial_control_tower import AUDIT_QUERIES
+from src.data_engineering.indexes import (
+    IndexSpec,
+    explain_report,
+    full_scans,
+    missing_indexes,
+)
+from src.data_engineering.init_erp_databases import ERPDatabaseInitializer
+
+
+@pytest.mark.unit
+def test_partial_index_ddl():
+    spec = IndexSpec("idx_demo", "operations", "sales_orders", ("order_date", "order_id"), where="sales > 0")
+
+    assert spec.ddl == "CREATE INDEX IF NOT EXISTS idx_demo ON sales_orders(order_date, order_id) WHERE sales > 0"
+
+
+@pytest.mark.unit
+def test_full_scans_ignores_index_scans():
+    plan = [
+        "SCAN o USING COVERING INDEX idx_sales_orders_open",
+        "SEARCH a USING INDEX idx_accounts_receivable_open (order_id=?)",
+        "SCAN shipping_logs",
+    ]
+
+    assert full_scans(plan) == ["SCAN shipping_logs"]
+
+
+@pytest.mark.unit
+def test_bulk_load_creates_managed_indexes(erp_data_dir):
+    initializer = ERPDatabaseInitializer(data_dir=erp_data_dir)
+
+    for db_path, database in [(initializer.ops_db_path, "operations"), (initializer.finance_db_path, "finance")]:
+        with sqlite3.connect(db_path) as conn:
+            assert missing_indexes(conn, database) == []
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert initializer.verify_databases() is True
+
+
+@pytest.mark.unit
+def test_verify_databases_reports_missing_index(erp_data_dir):
+    initializer = ERPDatabaseInitializer(data_dir=erp_data_dir)
+    with sqlite3.connect(initializer.ops_db_path) as conn:
+        conn.execute("DROP INDEX idx_shipping_logs_order")
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert initializer.verify_databases() is False
+    assert "❌ 索引 idx_shipping_logs_order" in out.getvalue()
+
+
+@pytest.mark.unit
+def test_audit_queries_avoid_full_table_scans(erp_data_dir):
+    queries = {name: (sql, ()) for name, (_, sql) in AUDIT_QUERIES.items()}
+    for rule_type in RULE_QUERIES:
+        queries[rule_type.value] = build_rule_query(rule_type)
+        queries[f"{rule_type.value}_window"] = build_rule_query(rule_type, "2023-01-01", "2023-12-31")
+    queries["rule_context"] = build_context_query()
+    queries["rule_context_window"] = build_context_query("2023-01-01", "2023-12-31")
+
+    with sqlite3.connect(erp_data_dir / "db_operations.db") as conn:
+        conn.execute("ATTACH DATABASE ? AS fin", (str(erp_data_dir / "db_finance.db"),))
+        report = explain_report(conn, queries)
+
+    assert {name: entry["full_scans"] for name, entry in report.items() if entry["full_scans"]} == {}
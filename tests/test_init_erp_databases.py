@@ -0,0 +1,300 @@
+"""Tests for ERPDatabaseInitializer columnar load path"""
+
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.data_engineering.init_erp_databases import ERPDatabaseInitializer
+from tests.conftest import make_dataco_frame
+
+
+@pytest.fixture
+def initializer(tmp_path):
+    return ERPDatabaseInitializer(data_dir=tmp_path)
+
+
+@pytest.mark.unit
+def test_sales_orders_frame_derives_date_parts(initializer):
+    orders = initializer._build_sales_orders_frame(make_dataco_frame())
+
+    assert orders["order_id"].tolist() == ["1", "2", "2"]
+    assert orders["order_date"].tolist() == ["2018-01-31", "2018-02-01", "2018-02-01"]
+    assert orders[["order_year", "order_month", "order_day"]].iloc[0].tolist() == [2018, 1, 31]
+    assert orders["customer_name"].isna().all()
+    assert orders["days_for_shipment_real"].isna().all()
+
+
+@pytest.mark.unit
+def test_unparseable_dates_become_null(initializer):
+    df = make_dataco_frame()
+    df.loc[1, "order date (DateOrders)"] = "not a date"
+    orders = initializer._build_sales_orders_frame(df)
+
+    assert orders["order_date"].tolist() == ["2018-01-31", None, "2018-02-01"]
+    assert pd.isna(orders["order_year"].iloc[1])
+
+
+@pytest.mark.unit
+def test_shipping_logs_read_source_shipping_date(initializer):
+    # 没有发货日期列时沿用订单日期
+    logs = initializer._build_shipping_logs_frame(make_dataco_frame())
+    assert logs["shipping_date"].tolist() == ["2018-01-31", "2018-02-01", "2018-02-01"]
+    assert logs["days_for_shipment_real"].isna().all()
+
+    df = make_dataco_frame().assign(
+        **{
+            "shipping date (DateOrders)": ["2/3/2018 10:00", "1/30/2018 09:00", "2/4/2018 12:00"],
+            "Days for shipping (real)": [3, -2, 3],
+        }
+    )
+    initializer.create_operations_db(df)
+
+    with sqlite3.connect(initializer.ops_db_path) as conn:
+        rows = conn.execute("SELECT order_id, shipping_date, days_for_shipment_real FROM shipping_logs ORDER BY log_id")
+        assert rows.fetchall() == [("1", "2018-02-03", 3), ("2", "2018-01-30", -2), ("2", "2018-02-04", 3)]
+
+
+@pytest.mark.unit
+def test_general_ledger_interleaves_revenue_and_cogs(initializer):
+    ledger = initializer._build_general_ledger_frame(make_dataco_frame())
+
+    # 订单 1: 收入 + 成本；订单 2 第一行: 收入 + 成本(60)；第二行: 成本为 0，只有收入
+    assert ledger["account_code"].tolist() == ["4000", "5000", "4000", "5000", "4000"]
+    assert ledger["debit_amount"].tolist() == [0.0, 80.0, 0.0, 60.0, 0.0]
+    assert ledger["credit_amount"].tolist() == [100.0, 0.0, 50.0, 0.0, 300.0]
+    assert ledger["description"].iloc[1] == "COGS for Order 1"
+
+
+@pytest.mark.unit
+def test_accounts_receivable_payment_status(initializer):
+    ar = initializer._build_accounts_receivable_frame(make_dataco_frame())
+
+    assert ar["payment_status"].tolist() == ["Outstanding", "Paid", "Cancelled"]
+    assert ar["paid_amount"].tolist() == [0.0, 50.0, 0.0]
+    assert ar["outstanding_amount"].tolist() == [100.0, 0.0, 0.0]
+    assert ar["due_date"].tolist() == ["2018-03-02", "2018-03-03", "2018-03-03"]
+
+
+@pytest.mark.unit
+def test_create_databases_round_trip(initializer):
+    df = make_dataco_frame()
+    initializer.create_operations_db(df)
+    initializer.create_finance_db(df)
+
+    with sqlite3.connect(initializer.ops_db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sales_orders").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM shipping_logs").fetchone()[0] == 3
+        price = conn.execute("SELECT product_price FROM products WHERE product_id = '100'").fetchone()[0]
+        assert price == pytest.approx(200.0)
+    with sqlite3.connect(initializer.finance_db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM general_ledger").fetchone()[0] == 5
+        row = conn.execute("SELECT invoice_amount, payment_status FROM accounts_receivable WHERE order_id = '2'")
+        assert row.fetchone() == (300.0, "Cancelled")
+
+
+@pytest.mark.unit
+def test_streaming_load_matches_in_memory_load(tmp_path):
+    raw_dir = tmp_path / "stream" / "raw"
+    raw_dir.mkdir(parents=True)
+    make_dataco_frame().to_csv(raw_dir / "DataCo.csv", index=False)
+
+    in_memory = ERPDatabaseInitializer(data_dir=tmp_path / "stream")
+    df = in_memory.load_raw_data()
+    in_memory.ops_db_path = tmp_path / "ops_full.db"
+    in_memory.finance_db_path = tmp_path / "fin_full.db"
+    in_memory.create_operations_db(df)
+    in_memory.create_finance_db(df)
+
+    streaming = ERPDatabaseInitializer(data_dir=tmp_path / "stream")
+    streaming.create_databases_streaming(chunksize=2)
+
+    queries = {
+        "ops": "SELECT order_id, order_date, customer_id, sales, profit, order_status FROM sales_orders ORDER BY order_id",
+        "ops_logs": "SELECT order_id, shipping_date, shipping_mode FROM shipping_logs ORDER BY log_id",
+        "ops_products": "SELECT product_id, product_name, product_price FROM products ORDER BY product_id",
+        "fin": "SELECT entry_id, order_id, account_code, debit_amount, credit_amount FROM general_ledger",
+        "fin_ar": "SELECT order_id, invoice_amount, payment_status FROM accounts_receivable ORDER BY order_id",
+    }
+    for key, sql in queries.items():
+        full_db = in_memory.ops_db_path if key.startswith("ops") else in_memory.finance_db_path
+        stream_db = streaming.ops_db_path if key.startswith("ops") else streaming.finance_db_path
+        with sqlite3.connect(full_db) as full, sqlite3.connect(stream_db) as stream:
+            assert full.execute(sql).fetchall() == stream.execute(sql).fetchall(), key
+
+
+@pytest.mark.unit
+def test_streaming_load_coerces_malformed_numbers(tmp_path):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    df = make_dataco_frame().astype({"Sales": object})
+    df.loc[0, "Sales"] = "1,200.50"
+    df.to_csv(raw_dir / "DataCo.csv", index=False)
+
+    initializer = ERPDatabaseInitializer(data_dir=tmp_path)
+    initializer.create_databases_streaming(chunksize=2)
+
+    # 与内存加载一致：无法解析的金额记为 0，其余行照常写入
+    with sqlite3.connect(initializer.ops_db_path) as conn:
+        rows = conn.execute("SELECT order_id, sales FROM sales_orders ORDER BY order_id").fetchall()
+    in_memory = initializer._build_sales_orders_frame(initializer.load_raw_data()).drop_duplicates(
+        "order_id", keep="last"
+    )
+    assert rows == list(in_memory[["order_id", "sales"]].itertuples(index=False, name=None))
+    assert rows[0] == ("1", 0.0)
+
+
+@pytest.mark.unit
+def test_failed_streaming_load_rolls_back(tmp_path, monkeypatch):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    make_dataco_frame().to_csv(raw_dir / "DataCo.csv", index=False)
+    initializer = ERPDatabaseInitializer(data_dir=tmp_path)
+    initializer.create_databases_streaming(chunksize=2)
+
+    def snapshot():
+        with sqlite3.connect(initializer.ops_db_path) as ops, sqlite3.connect(initializer.finance_db_path) as fin:
+            return [
+                conn.execute(sql).fetchall()
+                for conn, sql in (
+                    (ops, "SELECT type, name FROM sqlite_master WHERE type IN ('index', 'trigger') ORDER BY name"),
+                    (ops, "SELECT * FROM sales_orders ORDER BY order_id"),
+                    (ops, "SELECT * FROM shipping_logs ORDER BY log_id"),
+                    (ops, "SELECT * FROM sales_monthly_summary"),
+                    (fin, "SELECT type, name FROM sqlite_master WHERE type = 'index' ORDER BY name"),
+                    (fin, "SELECT * FROM general_ledger ORDER BY entry_id"),
+                )
+            ]
+
+    before = snapshot()
+    assert before[0] and before[4]
+
+    # 第二个数据块写入总账时失败
+    build = initializer._build_general_ledger_frame
+    calls = []
+
+    def failing_build(chunk):
+        calls.append(len(chunk))
+        if len(calls) == 2:
+            raise RuntimeError("boom")
+        return build(chunk)
+
+    monkeypatch.setattr(initializer, "_build_general_ledger_frame", failing_build)
+    with pytest.raises(RuntimeError, match="boom"):
+        initializer.create_databases_streaming(chunksize=1)
+
+    assert snapshot() == before
+
+
+@pytest.mark.unit
+def test_incremental_load_upserts_only_changed_orders(tmp_path):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    csv_path = raw_dir / "DataCo.csv"
+    df = make_dataco_frame()
+    df.to_csv(csv_path, index=False)
+
+    initializer = ERPDatabaseInitializer(data_dir=tmp_path)
+    first = initializer.load_incremental(chunksize=2)
+    assert first["changed_orders"] == 2
+
+    # 源文件未变化：直接跳过
+    assert initializer.load_incremental(chunksize=2)["changed_orders"] == 0
+
+    # 订单 1 状态变化 + 新增订单 3
+    df.loc[0, "Order Status"] = "Completed"
+    new_order = df.iloc[[0]].assign(**{"Order Id": 3, "Sales": 42.0})
+    pd.concat([df, new_order]).to_csv(csv_path, index=False)
+
+    delta = initializer.load_incremental(chunksize=2)
+    assert delta["changed_orders"] == 2
+    assert delta["shipping_logs"] == 2
+
+    with sqlite3.connect(initializer.ops_db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM shipping_logs").fetchone()[0] == 4
+        assert conn.execute("SELECT COUNT(*) FROM etl_order_state").fetchone()[0] == 3
+    with sqlite3.connect(initializer.finance_db_path) as conn:
+        rows = conn.execute("SELECT order_id, payment_status FROM accounts_receivable ORDER BY order_id").fetchall()
+        assert rows == [("1", "Paid"), ("2", "Cancelled"), ("3", "Paid")]
+        assert conn.execute("SELECT COUNT(*) FROM general_ledger WHERE order_id = '1'").fetchone()[0] == 2
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("streaming", [True, False])
+def test_full_load_seeds_incremental_state(tmp_path, streaming):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    csv_path = raw_dir / "DataCo.csv"
+    df = make_dataco_frame()
+    df.to_csv(csv_path, index=False)
+
+    initializer = ERPDatabaseInitializer(data_dir=tmp_path)
+    initializer.initialize(streaming=streaming, chunksize=2)
+    with sqlite3.connect(initializer.ops_db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM etl_order_state").fetchone()[0] == 2
+        assert conn.execute("SELECT source_name, row_count FROM etl_watermarks").fetchall() == [("DataCo.csv", 3)]
+
+    # 内容未变、只更新了修改时间：不应有订单被视为变化
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert initializer.load_incremental(chunksize=3)["changed_orders"] == 0
+
+    df.loc[0, "Order Status"] = "Completed"
+    df.to_csv(csv_path, index=False)
+    delta = initializer.load_incremental(chunksize=2)
+    assert (delta["changed_orders"], delta["shipping_logs"]) == (1, 1)
+
+
+def _write_processed_parquet(data_dir):
+    """模拟 scripts/preprocess.py 的产出：日期已解析、按订单日期排序、每个行组一行"""
+    df = make_dataco_frame()
+    df["order date (DateOrders)"] = pd.to_datetime(df["order date (DateOrders)"])
+    processed_dir = data_dir / "processed"
+    processed_dir.mkdir(parents=True)
+    df.sort_values("order date (DateOrders)").to_parquet(processed_dir / "processed_DataCo.parquet", row_group_size=1)
+
+
+@pytest.mark.unit
+def test_parquet_source_matches_csv_load(tmp_path):
+    pytest.importorskip("pyarrow")
+    raw_dir = tmp_path / "csv" / "raw"
+    raw_dir.mkdir(parents=True)
+    make_dataco_frame().to_csv(raw_dir / "DataCo.csv", index=False)
+    from_csv = ERPDatabaseInitializer(data_dir=tmp_path / "csv")
+    from_csv.create_databases_streaming(chunksize=2)
+
+    _write_processed_parquet(tmp_path / "parquet")
+    from_parquet = ERPDatabaseInitializer(data_dir=tmp_path / "parquet", source_format="parquet")
+    from_parquet.create_databases_streaming(chunksize=2)
+
+    sql = (
+        "SELECT order_id, order_date, order_year, customer_id, sales, order_status FROM sales_orders ORDER BY order_id"
+    )
+    with sqlite3.connect(from_csv.ops_db_path) as csv_db, sqlite3.connect(from_parquet.ops_db_path) as parquet_db:
+        assert parquet_db.execute(sql).fetchall() == csv_db.execute(sql).fetchall()
+
+
+@pytest.mark.unit
+def test_load_with_order_date_window(tmp_path):
+    pytest.importorskip("pyarrow")
+    _write_processed_parquet(tmp_path)
+    initializer = ERPDatabaseInitializer(data_dir=tmp_path, source_format="parquet")
+
+    source, columns = initializer.open_parquet_source()
+    assert source.date_column == "order date (DateOrders)"
+    assert "Shipping Mode" in columns
+    assert source.row_groups("2018-02-01", "2018-02-28") == [1, 2]
+
+    assert initializer.load_raw_data(end_date="2018-01-31")["Order Id"].tolist() == [1]
+    initializer.create_databases_streaming(start_date="2018-02-01")
+    with sqlite3.connect(initializer.ops_db_path) as conn:
+        assert conn.execute("SELECT DISTINCT order_id FROM sales_orders").fetchall() == [("2",)]
+        # 只加载了窗口内的订单：记录其摘要，但不写整个源文件的水位
+        assert conn.execute("SELECT order_id FROM etl_order_state").fetchall() == [("2",)]
+        assert conn.execute("SELECT COUNT(*) FROM etl_watermarks").fetchone()[0] == 0
+
+    with pytest.raises(ValueError, match="增量加载不支持日期窗口"):
+        initializer.initialize(incremental=True, start_date="2018-01-01")
+    with pytest.raises(ValueError, match="未知的源文件格式"):
+        ERPDatabaseInitializer(data_dir=tmp_path, source_format="orc")
@@ -0,0 +1,66 @@
+"""Tests for processed Parquet reads and chunked row dedup"""
+
+import pandas as pd
+import pytest
+
+from src.data_engineering.processed_data import ParquetSource, RowDigestSet
+
+
+@pytest.mark.unit
+def test_row_digest_set_dedups_within_and_across_chunks():
+    seen = RowDigestSet()
+    first = pd.DataFrame({"order_id": [1, 2, 1], "sales": [10.0, 20.0, 10.0]})
+    # 第二块中 order_id 因缺失值被推断为 float，重复行仍应识别
+    second = pd.DataFrame({"order_id": [2.0, 3.0, None], "sales": [20.0, 30.0, 5.0]})
+
+    assert seen.add(first).tolist() == [True, True, False]
+    assert seen.add(second).tolist() == [False, True, True]
+    assert len(seen) == 4
+    assert (seen.digests[1:] > seen.digests[:-1]).all()
+
+
+@pytest.fixture
+def orders_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "orders.parquet"
+    pd.DataFrame(
+        {
+            "order_id": ["1", "2", "3", "4", "5", "6"],
+            "order_date": pd.to_datetime(
+                ["2018-01-05", "2018-01-20", "2018-02-03", "2018-02-27", "2018-03-01", "2018-03-31"]
+            ),
+            "sales": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+            "notes": ["a", "b", "c", "d", "e", "f"],
+        }
+    ).to_parquet(path, row_group_size=2)
+    return path
+
+
+@pytest.mark.unit
+def test_parquet_source_skips_row_groups_outside_window(orders_parquet):
+    source = ParquetSource(orders_parquet, date_column="order_date")
+
+    assert source.num_rows == 6
+    assert source.row_groups() == [0, 1, 2]
+    assert source.row_groups("2018-02-01", "2018-02-28") == [1]
+    assert source.row_groups("2018-02-27", "2018-03-01") == [1, 2]
+    assert source.row_groups("2019-01-01") == []
+
+    # 日期列不在所选列中时只用于过滤
+    df = source.read(["order_id", "sales"], "2018-01-20", "2018-02-27")
+    assert df.columns.tolist() == ["order_id", "sales"]
+    assert df["order_id"].tolist() == ["2", "3", "4"]
+    assert source.read(["order_id"], "2019-01-01").columns.tolist() == ["order_id"]
+
+
+@pytest.mark.unit
+def test_parquet_source_batches_and_text_dates(tmp_path, orders_parquet):
+    source = ParquetSource(orders_parquet, date_column="order_date")
+    assert [len(batch) for batch in source.iter_batches(batch_size=1)] == [1] * 6
+
+    # 文本日期列的统计值是字典序：不跳过行组，但仍逐行过滤
+    text_path = tmp_path / "text_dates.parquet"
+    pd.DataFrame({"order_date": ["1/31/2018 22:56", "12/1/2017 08:00"], "sales": [1.0, 2.0]}).to_parquet(text_path)
+    text_source = ParquetSource(text_path, date_column="order_date")
+    assert text_source.row_groups("2018-01-01") == [0]
+    assert text_source.read(["sales"], "2018-01-01")["sales"].tolist() == [1.0]
@@ -0,0 +1,124 @@
+"""Tests for per-stage run profiling"""
+
+import contextlib
+import io
+import json
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+from src.audit.financial_control_tower import FinancialControlTower
+from src.data_engineering.init_erp_databases import ERPDatabaseInitializer
+from src.data_engineering.profiling import (
+    ProfiledConnection,
+    ProfileOptions,
+    RunProfiler,
+    profile_stage,
+    record_rows,
+)
+from tests.conftest import make_dataco_frame
+
+
+@pytest.mark.unit
+def test_stages_record_sql_and_rows():
+    conn = sqlite3.connect(":memory:", factory=ProfiledConnection, check_same_thread=False)
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    profiler = RunProfiler("unit")
+
+    with profiler.run():
+        with profiler.stage("load"):
+            conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(100)])
+            with profile_stage("fix"):
+                conn.execute("UPDATE   t\n SET a = a + 1 WHERE a < 10")
+                record_rows(read=7)
+        with profiler.stage("read"):
+            cursor = conn.execute("SELECT a FROM t")
+            assert len(pd.read_sql("SELECT a FROM t WHERE a > ?", conn, params=(50,))) == 49
+        # 阶段结束后 fetch 的行仍计入发出语句的阶段
+        assert len(cursor.fetchall()) == 100
+        worker = threading.Thread(target=profiler.wrap("worker", lambda: conn.execute("SELECT 1").fetchone()))
+        worker.start()
+        worker.join()
+    # 不在阶段内的语句不记录
+    conn.execute("SELECT COUNT(*) FROM t").fetchone()
+
+    stages = {stage["name"]: stage for stage in profiler.to_dict()["stages"]}
+    assert list(stages) == ["load", "load/fix", "read", "worker"]
+    assert (stages["load"]["rows_written"], stages["load"]["rows_read"], stages["load"]["sql_calls"]) == (110, 7, 2)
+    assert stages["load/fix"]["depth"] == 1
+    assert stages["load/fix"]["statements"] == [
+        pytest.approx(
+            {
+                "sql": "UPDATE t SET a = a + 1 WHERE a < 10",
+                "calls": 1,
+                "seconds": stages["load/fix"]["sql_s"],
+                "max_seconds": stages["load/fix"]["sql_s"],
+                "rows_read": 0,
+                "rows_written": 10,
+            }
+        )
+    ]
+    read = {s["sql"]: s for s in stages["read"]["statements"]}
+    assert read["SELECT a FROM t"]["rows_read"] == 100
+    assert read["SELECT a FROM t WHERE a > ?"]["rows_read"] == 49
+    assert stages["worker"]["thread"] != threading.current_thread().name
+    assert profiler.to_dict()["totals"]["sql_calls"] == 5
+    assert profiler.write() is None
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("parallel", [False, True], ids=["sequential", "parallel"])
+def test_full_audit_writes_profile(erp_data_dir, tmp_path, parallel):
+    options = ProfileOptions(tmp_path / "profiles", cprofile=not parallel, tracemalloc=True)
+    tower = FinancialControlTower(data_dir=erp_data_dir, profile=options)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tower.run_full_audit(recon_engine="sql", parallel=parallel)
+
+    path = tower.last_profile.path
+    assert str(path) in output.getvalue()
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert report["context"]["parallel"] is parallel
+    stages = {stage["name"]: stage for stage in report["stages"]}
+    assert list(stages) == [
+        "reconcile_operations_finance",
+        "audit_supply_chain_risks",
+        "generate_financial_statements",
+        "audit_log_flush",
+    ]
+    assert all(stage["wall_s"] > 0 and stage["python_peak_mb"] > 0 for stage in stages.values())
+    assert stages["reconcile_operations_finance"]["rows_read"] > 0
+    assert any("accounts_receivable" in s["sql"] for s in stages["reconcile_operations_finance"]["statements"])
+
+    with sqlite3.connect(erp_data_dir / "audit.db") as conn:
+        findings = conn.execute("SELECT COUNT(*) FROM audit_logs").fetchone()[0]
+    assert stages["audit_log_flush"]["rows_written"] >= findings > 0
+    assert report["totals"]["rows_written"] == stages["audit_log_flush"]["rows_written"]
+
+    if not parallel:
+        assert stages["audit_supply_chain_risks"]["cprofile_top"]
+        assert (path.parent / stages["audit_supply_chain_risks"]["cprofile_file"]).exists()
+
+
+@pytest.mark.unit
+def test_initialize_profiles_nested_load_stages(tmp_path):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    make_dataco_frame().to_csv(raw_dir / "DataCo.csv", index=False)
+
+    initializer = ERPDatabaseInitializer(data_dir=tmp_path, profile=ProfileOptions(output_dir=None))
+    with contextlib.redirect_stdout(io.StringIO()):
+        initializer.initialize(streaming=True, chunksize=2)
+
+    stages = {stage.name: stage for stage in initializer.last_profile.stages}
+    load = stages["create_databases_streaming"]
+    assert {"create_databases_streaming/build_summary_tables", "create_audit_db", "verify_databases"} <= set(stages)
+    assert "create_databases_streaming/build_indexes(finance)" in stages
+    # 3 行 CSV（另有汇总重算时 fetch 的 1 行、写水位时查询 MAX(order_date) 的 1 行）；物流每行一条、总账每行两笔
+    assert load.rows_read - stages["create_databases_streaming/build_summary_tables"].rows_read == 3 + 1
+    (shipping,) = [stats for sql, stats in load.statements.items() if sql.startswith("INSERT INTO shipping_logs")]
+    assert shipping.rows_written == 3
+    assert load.rows_written >= 3 + 6
+    assert initializer.last_profile.path is None
@@ -0,0 +1,33 @@
+"""Tests for vectorized severity classification"""
+
+import numpy as np
+import pytest
+
+from fraud_rule_metrics import FraudRuleManager
+from src.audit.severity import SeverityScale
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("threshold", FraudRuleManager.DEFAULT_THRESHOLDS.values(), ids=lambda t: t.rule_type.value)
+def test_classify_matches_scalar_get_severity(threshold):
+    values = np.concatenate([np.linspace(-1500, 1500, 601), np.arange(-10, 60, 0.5), [float("inf"), float("-inf")]])
+
+    assert threshold.classify(values).tolist() == [threshold.get_severity(v) for v in values]
+
+
+@pytest.mark.unit
+def test_scale_uses_default_outside_ranges_and_for_nan():
+    scale = SeverityScale({"HIGH": (10, 20), "MEDIUM": (0, 5)}, default="NONE")
+
+    assert scale.classify([-1, 0, 4.9, 5, 10, 19.99, 20, np.nan]).tolist() == [
+        "NONE",
+        "MEDIUM",
+        "MEDIUM",
+        "NONE",
+        "HIGH",
+        "HIGH",
+        "NONE",
+        "NONE",
+    ]
+    with pytest.raises(ValueError):
+        SeverityScale({})
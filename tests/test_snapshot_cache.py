@@ -0,0 +1,74 @@
+"""Tests for the columnar audit-input snapshot cache"""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.data_engineering.snapshot_cache import SnapshotCache  # noqa: E402
+
+QUERY = "SELECT order_id, order_date, sales FROM sales_orders ORDER BY order_id"
+
+
+@pytest.fixture
+def ops_db(erp_data_dir):
+    return erp_data_dir / "db_operations.db"
+
+
+def _loader(db_path, calls):
+    def load():
+        calls.append(db_path)
+        with sqlite3.connect(db_path) as conn:
+            df = pd.read_sql(QUERY, conn)
+        df["order_date"] = pd.to_datetime(df["order_date"])
+        return df
+
+    return load
+
+
+@pytest.mark.unit
+def test_snapshot_round_trips_typed_columns(tmp_path, ops_db):
+    cache = SnapshotCache(tmp_path / "cache")
+    calls = []
+
+    first = cache.get_or_load("orders", [ops_db], QUERY, _loader(ops_db, calls))
+    second = cache.get_or_load("orders", [ops_db], QUERY, _loader(ops_db, calls))
+
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    pd.testing.assert_frame_equal(second, first)
+    assert pd.api.types.is_datetime64_any_dtype(second["order_date"])
+    assert (tmp_path / "cache" / "orders.arrow").exists()
+
+
+@pytest.mark.unit
+def test_snapshot_invalidated_by_source_write(tmp_path, ops_db):
+    cache = SnapshotCache(tmp_path / "cache")
+    calls = []
+    cache.get_or_load("orders", [ops_db], QUERY, _loader(ops_db, calls))
+
+    with sqlite3.connect(ops_db) as conn:
+        conn.execute("INSERT INTO sales_orders (order_id, order_date, sales) VALUES ('999', '2018-04-01', 1.0)")
+
+    refreshed = cache.get_or_load("orders", [ops_db], QUERY, _loader(ops_db, calls))
+    assert len(calls) == 2
+    assert refreshed["order_id"].iloc[-1] == "999"
+
+
+@pytest.mark.unit
+def test_snapshot_keyed_on_query_and_tolerates_corruption(tmp_path, ops_db):
+    cache = SnapshotCache(tmp_path / "cache")
+    calls = []
+    cache.get_or_load("orders", [ops_db], QUERY, _loader(ops_db, calls))
+
+    cache.get_or_load("orders", [ops_db], QUERY + " DESC", _loader(ops_db, calls))
+    assert len(calls) == 2
+
+    cache.path("orders").write_bytes(b"not an arrow file")
+    assert cache.get_or_load("orders", [ops_db], QUERY, _loader(ops_db, calls)) is not None
+    assert len(calls) == 3
+
+    cache.clear()
+    assert not list((tmp_path / "cache").glob("*.arrow"))
@@ -0,0 +1,90 @@
+"""Tests for the trigger-maintained monthly sales summary"""
+
+import contextlib
+import io
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.audit.financial_control_tower import FinancialControlTower, build_audit_query
+from src.data_engineering import init_erp_databases
+from src.data_engineering.indexes import explain_query
+from src.data_engineering.init_erp_databases import SUMMARY_REBUILD_RATIO, ERPDatabaseInitializer
+from src.data_engineering.summary_tables import missing_summary_objects, rebuild_summary_tables
+from tests.conftest import make_dataco_frame
+
+SUMMARY_ROWS = "SELECT * FROM sales_monthly_summary ORDER BY 1, 2, 3, 4, 5"
+
+
+def _assert_summary_matches_rebuild(conn):
+    maintained = conn.execute(SUMMARY_ROWS).fetchall()
+    rebuild_summary_tables(conn)
+    rebuilt = conn.execute(SUMMARY_ROWS).fetchall()
+    assert [row[:6] for row in maintained] == [row[:6] for row in rebuilt]
+    assert [row[6:] for row in maintained] == [pytest.approx(row[6:]) for row in rebuilt]
+
+
+@pytest.mark.unit
+def test_triggers_track_inserts_updates_and_deletes(erp_data_dir):
+    with sqlite3.connect(erp_data_dir / "db_operations.db") as conn:
+        assert missing_summary_objects(conn) == []
+        # 取消订单 101、103 改国家、删除 104、恢复已取消的 106、新增一单（无日期）
+        conn.execute("UPDATE sales_orders SET order_status = 'CANCELED' WHERE order_id = '101'")
+        conn.execute("UPDATE sales_orders SET customer_country = 'México' WHERE order_id = '103'")
+        conn.execute("DELETE FROM sales_orders WHERE order_id = '104'")
+        conn.execute("UPDATE sales_orders SET order_status = 'COMPLETE' WHERE order_id = '106'")
+        conn.execute(
+            "INSERT INTO sales_orders (order_id, customer_country, sales, profit, order_status) "
+            "VALUES ('107', 'México', 12.5, 2.5, 'PENDING')"
+        )
+
+        _assert_summary_matches_rebuild(conn)
+        # 订单 101 是其所在组的唯一订单：组被删除而不是留下 0 行
+        assert conn.execute("SELECT COUNT(*) FROM sales_monthly_summary WHERE orders <= 0").fetchone()[0] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("rebuild_ratio", [SUMMARY_REBUILD_RATIO, float("inf")], ids=["rebuild", "triggers"])
+def test_incremental_load_maintains_summary(tmp_path, monkeypatch, rebuild_ratio):
+    monkeypatch.setattr(init_erp_databases, "SUMMARY_REBUILD_RATIO", rebuild_ratio)
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    csv_path = raw_dir / "DataCo.csv"
+    df = make_dataco_frame()
+    df.to_csv(csv_path, index=False)
+
+    initializer = ERPDatabaseInitializer(data_dir=tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        initializer.load_incremental(chunksize=2)
+        df.loc[0, "Sales"] = 150.0
+        new_order = df.iloc[[0]].assign(**{"Order Id": 3, "Customer Country": "México"})
+        pd.concat([df, new_order]).to_csv(csv_path, index=False)
+        initializer.load_incremental(chunksize=2)
+
+    with sqlite3.connect(initializer.ops_db_path) as conn:
+        revenue = dict(conn.execute("SELECT customer_country, revenue FROM sales_monthly_summary").fetchall())
+        assert revenue["Puerto Rico"] == pytest.approx(150.0)
+        assert revenue["México"] == pytest.approx(150.0)
+        _assert_summary_matches_rebuild(conn)
+
+
+@pytest.mark.unit
+def test_reports_read_summary_and_match_order_scan(erp_data_dir):
+    with sqlite3.connect(erp_data_dir / "db_operations.db") as conn:
+        for name in ("pnl_monthly", "top_regions"):
+            summary = pd.read_sql(build_audit_query(name)[0], conn)
+            orders = pd.read_sql(build_audit_query(f"{name}_orders")[0], conn)
+            pd.testing.assert_frame_equal(summary, orders, check_dtype=False)
+            assert not any("sales_orders" in step for step in explain_query(conn, build_audit_query(name)[0]))
+
+        conn.execute("DROP TRIGGER trg_sales_orders_summary_update")
+        conn.execute("UPDATE sales_orders SET sales = 9999.0 WHERE order_id = '105'")
+        assert missing_summary_objects(conn) == ["trg_sales_orders_summary_update"]
+
+    # 触发器缺失时汇总可能过期：报表退回按订单明细聚合
+    tower = FinancialControlTower(data_dir=erp_data_dir)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tower.generate_financial_statements()
+    assert "9,999.00" in output.getvalue()
@@ -0,0 +1,121 @@
+"""Tests for the synthetic DataCo generator and its injected anomalies"""
+
+import contextlib
+import io
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fraud_rule_metrics import FraudRuleManager
+from src.audit.financial_control_tower import FinancialControlTower
+from src.data_engineering.init_erp_databases import ERPDatabaseInitializer
+from src.data_engineering.synthetic_data import (
+    DATACO_COLUMNS,
+    SyntheticManifest,
+    apply_finance_anomalies,
+    manifest_path,
+    parse_scale,
+    write_dataco_csv,
+)
+
+# 提高比例，让小规模数据中每类异常都有足够样本
+RATES = {
+    "missing_ar": 0.02,
+    "amount_mismatch": 0.02,
+    "timing_fraud": 0.02,
+    "negative_margin": 0.03,
+    "frequency_spike": 0.03,
+}
+
+
+@pytest.fixture
+def synthetic_csv(tmp_path):
+    csv_path = tmp_path / "raw" / "DataCo.csv"
+    manifest = write_dataco_csv(csv_path, 3000, seed=7, rates=RATES, chunk_orders=1000)
+    return csv_path, manifest
+
+
+@pytest.mark.unit
+def test_generated_csv_matches_dataco_schema(synthetic_csv):
+    csv_path, manifest = synthetic_csv
+    df = pd.read_csv(csv_path)
+
+    assert list(df.columns) == DATACO_COLUMNS
+    assert len(df) == manifest.rows
+    assert sorted(df["Order Id"].unique()) == list(range(1, 3001))
+    assert df["Order Item Id"].is_unique
+    # 同一订单的明细共享订单级字段
+    per_order = df.groupby("Order Id")[["order date (DateOrders)", "Customer Id", "Order Status"]].nunique()
+    assert (per_order == 1).all().all()
+    assert SyntheticManifest.load(manifest_path(csv_path)) == manifest
+
+    # 相同 seed 与分块大小生成相同的数据
+    again = write_dataco_csv(csv_path.with_name("again.csv"), 3000, seed=7, rates=RATES, chunk_orders=1000)
+    pd.testing.assert_frame_equal(pd.read_csv(csv_path.with_name("again.csv")), df)
+    assert again.anomalies == manifest.anomalies
+
+
+@pytest.mark.unit
+def test_injected_anomalies_are_disjoint_and_shaped(synthetic_csv):
+    csv_path, manifest = synthetic_csv
+    df = pd.read_csv(csv_path)
+    order_ids = {name: set(map(int, ids)) for name, ids in manifest.anomalies.items() if name != "frequency_spike"}
+
+    assert all(len(ids) > 0 for ids in manifest.anomalies.values())
+    assert sum(map(len, order_ids.values())) == len(set().union(*order_ids.values()))
+    assert len(manifest.booked_amounts) == len(manifest.anomalies["amount_mismatch"])
+
+    injected = df["Order Id"].isin(set().union(*order_ids.values()))
+    assert not df.loc[injected, "Order Status"].isin(["CANCELED", "SUSPECTED_FRAUD"]).any()
+
+    shipped = pd.to_datetime(df["shipping date (DateOrders)"], format="%m/%d/%Y %H:%M")
+    ordered = pd.to_datetime(df["order date (DateOrders)"], format="%m/%d/%Y %H:%M")
+    early = df["Order Id"].isin(order_ids["timing_fraud"])
+    assert (shipped[early] < ordered[early]).all()
+    assert (shipped[~early] >= ordered[~early]).all()
+
+    losing = df["Order Id"].isin(order_ids["negative_margin"])
+    assert (df.loc[losing, "Order Profit Per Order"] < 0).all()
+    assert (df.loc[~losing, "Order Profit Per Order"] >= 0).all()
+
+    daily = df.drop_duplicates("Order Id").groupby(["Customer Id", ordered.dt.date]).size()
+    spiking = {str(customer) for customer, _ in daily[daily > 10].index}
+    assert spiking == set(manifest.anomalies["frequency_spike"])
+
+
+@pytest.mark.unit
+def test_audit_detects_exactly_the_injected_anomalies(synthetic_csv):
+    csv_path, manifest = synthetic_csv
+    data_dir = csv_path.parent.parent
+    with contextlib.redirect_stdout(io.StringIO()):
+        ERPDatabaseInitializer(data_dir=data_dir).initialize(streaming=True, chunksize=2000)
+        applied = apply_finance_anomalies(data_dir / "db_finance.db", manifest)
+        tower = FinancialControlTower(data_dir=data_dir)
+        result = tower.reconcile_operations_finance()
+        tower.audit_supply_chain_risks()
+    assert applied == {name: len(manifest.anomalies[name]) for name in ("missing_ar", "amount_mismatch")}
+
+    assert set(result.missing_in_fin["order_id"]) == set(manifest.anomalies["missing_ar"])
+    assert set(result.amount_mismatch["order_id"]) == set(manifest.anomalies["amount_mismatch"])
+    booked = dict(zip(manifest.anomalies["amount_mismatch"], manifest.booked_amounts))
+    np.testing.assert_allclose(result.amount_mismatch["booked_revenue"], result.amount_mismatch["order_id"].map(booked))
+
+    with sqlite3.connect(data_dir / "audit.db") as conn:
+        for action, name in (("SC_TIMING_FRAUD", "timing_fraud"), ("SC_NEGATIVE_MARGIN", "negative_margin")):
+            flagged = {row[0] for row in conn.execute("SELECT entity_id FROM audit_logs WHERE action = ?", (action,))}
+            assert flagged == set(manifest.anomalies[name])
+
+    anomalies = FraudRuleManager(data_dir=data_dir).detect_frequency_anomalies(log_to_audit=False)
+    assert set(anomalies["customer_id"].astype(str)) == set(manifest.anomalies["frequency_spike"])
+
+
+@pytest.mark.unit
+def test_parse_scale():
+    assert parse_scale("10k") == 10_000
+    assert parse_scale("1M") == 1_000_000
+    assert parse_scale("2.5k") == 2_500
+    assert parse_scale("5000") == 5_000
+    with pytest.raises(ValueError):
+        parse_scale("lots")